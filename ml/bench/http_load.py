@@ -0,0 +1,91 @@
+"""
+TriageAI — HTTP Load Generator
+================================
+Closed-loop load generator for the ML API: `concurrency` threads each keep one
+keep-alive connection open and send POST /api/ml/classify back-to-back for
+`duration` seconds. Reports throughput, latency percentiles and status codes.
+"""
+
+import json
+import time
+import threading
+import http.client
+
+
+def percentiles(values: list[float]) -> dict:
+    """p50/p95/p99/max/mean of `values` (unsorted), in the same unit."""
+    if not values:
+        return {'p50': 0.0, 'p95': 0.0, 'p99': 0.0, 'max': 0.0, 'mean': 0.0}
+    s = sorted(values)
+    n = len(s)
+    return {
+        'p50': s[int(0.50 * (n - 1))],
+        'p95': s[int(0.95 * (n - 1))],
+        'p99': s[int(0.99 * (n - 1))],
+        'max': s[-1],
+        'mean': sum(s) / n,
+    }
+
+
+def run_load(
+    host: str,
+    port: int,
+    payloads: list[dict],
+    concurrency: int = 16,
+    duration: float = 10.0,
+    path: str = '/api/ml/classify',
+) -> dict:
+    """Drive `path` with `concurrency` closed-loop clients for `duration` seconds."""
+    bodies = [json.dumps(p).encode() for p in payloads]
+    headers = {'Content-Type': 'application/json'}
+    latencies_ms: list[float] = []
+    status_counts: dict[str, int] = {}
+    lock = threading.Lock()
+    start_barrier = threading.Barrier(concurrency + 1)
+    deadline = [0.0]
+
+    def client(offset: int):
+        conn = http.client.HTTPConnection(host, port, timeout=30)
+        local_lat, local_status = [], {}
+        i = offset
+        start_barrier.wait()
+        while time.perf_counter() < deadline[0]:
+            body = bodies[i % len(bodies)]
+            i += concurrency
+            t0 = time.perf_counter()
+            try:
+                conn.request('POST', path, body=body, headers=headers)
+                resp = conn.getresponse()
+                resp.read()
+                status = str(resp.status)
+            except (OSError, http.client.HTTPException):
+                status = 'connection_error'
+                conn.close()
+                conn = http.client.HTTPConnection(host, port, timeout=30)
+            local_lat.append((time.perf_counter() - t0) * 1000.0)
+            local_status[status] = local_status.get(status, 0) + 1
+        conn.close()
+        with lock:
+            latencies_ms.extend(local_lat)
+            for k, v in local_status.items():
+                status_counts[k] = status_counts.get(k, 0) + v
+
+    threads = [threading.Thread(target=client, args=(k,), daemon=True) for k in range(concurrency)]
+    for t in threads:
+        t.start()
+    deadline[0] = time.perf_counter() + duration
+    started = time.perf_counter()
+    start_barrier.wait()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    total = len(latencies_ms)
+    return {
+        'concurrency': concurrency,
+        'duration_s': elapsed,
+        'requests': total,
+        'requests_per_s': total / elapsed if elapsed else 0.0,
+        'status_counts': status_counts,
+        'latency_ms': percentiles(latencies_ms),
+    }
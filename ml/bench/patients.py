@@ -0,0 +1,53 @@
+"""
+TriageAI — Synthetic Patient Generator
+========================================
+Draws benchmark patients from the empirical distributions in
+smart_triage_dataset_1200-1.csv. Each field is sampled independently from
+its observed values, so vitals, gender mix, symptom sets and condition sets
+follow the training data without replaying real rows verbatim.
+"""
+
+import os
+import csv
+import random
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(os.path.dirname(BENCH_DIR))
+CSV_PATH = os.path.join(PROJECT_DIR, 'smart_triage_dataset_1200-1.csv')
+
+
+def _split(value: str) -> list[str]:
+    return [v.strip() for v in value.split(',') if v.strip()]
+
+
+class PatientGenerator:
+    """Seeded sampler over the per-column empirical distributions of the triage CSV."""
+
+    def __init__(self, csv_path: str = CSV_PATH, seed: int = 42):
+        self.rng = random.Random(seed)
+        with open(csv_path, newline='') as f:
+            rows = list(csv.DictReader(f))
+
+        self.ages = [int(r['Age']) for r in rows]
+        self.genders = [r['Gender'] for r in rows]
+        self.bps = [int(r['Blood_Pressure_Systolic']) for r in rows]
+        self.hrs = [int(r['Heart_Rate']) for r in rows]
+        self.temps = [float(r['Temperature_F']) for r in rows]
+        self.symptom_sets = [_split(r['Symptoms']) for r in rows]
+        self.condition_sets = [_split(r['Pre_Existing_Conditions']) for r in rows]
+
+    def patient(self) -> dict:
+        """One patient dict with the `classify()` argument names."""
+        rng = self.rng
+        return {
+            'age': rng.choice(self.ages),
+            'gender': rng.choice(self.genders),
+            'symptoms': list(rng.choice(self.symptom_sets)),
+            'blood_pressure_systolic': rng.choice(self.bps),
+            'heart_rate': rng.choice(self.hrs),
+            'temperature_f': rng.choice(self.temps),
+            'pre_existing_conditions': list(rng.choice(self.condition_sets)),
+        }
+
+    def patients(self, n: int) -> list[dict]:
+        return [self.patient() for _ in range(n)]
@@ -0,0 +1,485 @@
+"""
+TriageAI — Inference Benchmark Suite
+======================================
+Measures how fast the ML layer actually is and writes machine-readable JSON so
+runs can be compared across model, encoder and serving changes.
+
+Benchmarks:
+  cold_start   fresh interpreter: import inference + first classify() (lazy model load),
+               peak RSS, and a full one-shot `predict.py` round trip
+  single       single-row classify latency (p50/p95/p99), uncached and cache-hit
+  batch        classify_batch throughput at batch sizes 1 … 10,000
+  explain      cost of explain=True: single-row latency with and without
+               explanations, and extra ms per row in 100-row batches
+  memory       peak RSS of the benchmark process after the in-process runs
+  workers      RSS / PSS / private memory of N persistent `predict.py --worker`
+               processes after each has scored a batch — private MB per worker is
+               what each additional worker costs once the forests are shared
+  http         POST /api/ml/classify throughput against a local server
+               (Flask dev server or the gunicorn front end in serve.py)
+
+Usage:
+  python ml/bench/run.py                                  Run everything
+  python ml/bench/run.py --only cold_start,single         Subset of benchmarks
+  python ml/bench/run.py --http-server gunicorn           Load-test serve.py instead of server.py
+  python ml/bench/run.py --compare results/baseline.json  Flag regressions vs. an earlier run
+  ML_SHARED_FORESTS=0 python ml/bench/run.py --only workers   Per-process sklearn copies, for contrast
+
+Import-time profile and the startup budget gate for the serving path: ml/bench/startup.py.
+
+Results go to ml/bench/results/bench-<timestamp>.json unless --out is given.
+With --compare the exit status is 1 if any tracked metric regressed by more
+than --threshold (default 10%).
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import platform
+import argparse
+import resource
+import tempfile
+import subprocess
+import statistics
+import urllib.request
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ML_DIR = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+sys.path.insert(0, ML_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+# Synthetic patients are neither patient history nor live traffic: servers and subprocesses
+# inherit a scratch history store and scratch drift sketches, never the deployed model's
+os.environ.setdefault('ML_HISTORY_DB', os.path.join(tempfile.gettempdir(), 'triageai-bench-history.db'))
+os.environ.setdefault('ML_DRIFT_DIR', os.path.join(tempfile.gettempdir(), 'triageai-bench-drift'))
+
+from patients import PatientGenerator
+from http_load import run_load, percentiles
+
+ALL_BENCHMARKS = ('cold_start', 'single', 'batch', 'explain', 'memory', 'workers', 'http')
+BATCH_SIZES = (1, 10, 100, 1000, 10000)
+
+# Runs in a fresh interpreter; prints one JSON line of timings
+COLD_START_SNIPPET = r'''
+import sys, time, json, resource, warnings
+warnings.filterwarnings('ignore')
+sys.path.insert(0, sys.argv[1])
+t0 = time.perf_counter()
+import inference
+t1 = time.perf_counter()
+inference.classify(age=45, gender='Male', symptoms=['Chest Pain'], blood_pressure_systolic=130,
+                   heart_rate=90, temperature_f=98.6, pre_existing_conditions=['None'])
+t2 = time.perf_counter()
+print(json.dumps({
+    'import_s': t1 - t0,
+    'first_classify_s': t2 - t1,
+    'maxrss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'sklearn_imported': 'sklearn' in sys.modules,
+    'pandas_imported': 'pandas' in sys.modules,
+}))
+'''
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+# ─────────────────────────────── BENCHMARKS ───────────────────────────────
+
+def bench_cold_start(repeats: int) -> dict:
+    runs = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, '-c', COLD_START_SNIPPET, ML_DIR],
+            capture_output=True, text=True, check=True,
+        )
+        run = json.loads(proc.stdout.strip().splitlines()[-1])
+        run['process_s'] = time.perf_counter() - t0
+        runs.append(run)
+
+    patient = json.dumps(PatientGenerator(seed=7).patient())
+    roundtrips = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        subprocess.run(
+            [sys.executable, '-W', 'ignore', os.path.join(ML_DIR, 'predict.py')],
+            input=patient, capture_output=True, text=True, check=True,
+        )
+        roundtrips.append(time.perf_counter() - t0)
+
+    def median(key):
+        return statistics.median(r[key] for r in runs)
+
+    return {
+        'repeats': repeats,
+        'import_s': median('import_s'),
+        'first_classify_s': median('first_classify_s'),
+        'process_s': median('process_s'),
+        'maxrss_mb': median('maxrss_mb'),
+        'sklearn_imported': runs[0]['sklearn_imported'],
+        'pandas_imported': runs[0]['pandas_imported'],
+        'predict_py_roundtrip_s': statistics.median(roundtrips),
+    }
+
+
+def bench_single(inference, gen: PatientGenerator, iterations: int) -> dict:
+    patients = gen.patients(iterations)
+    for p in patients[:50]:
+        inference.classify_batch([p], use_cache=False)
+
+    uncached = []
+    for p in patients:
+        t0 = time.perf_counter()
+        inference.classify_batch([p], use_cache=False)
+        uncached.append((time.perf_counter() - t0) * 1000.0)
+
+    hot = patients[0]
+    inference.classify(**hot)
+    cached = []
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        inference.classify(**hot)
+        cached.append((time.perf_counter() - t0) * 1000.0)
+
+    return {
+        'iterations': iterations,
+        'uncached_ms': percentiles(uncached),
+        'cache_hit_ms': percentiles(cached),
+    }
+
+
+def bench_batch(inference, gen: PatientGenerator, sizes: tuple, min_rows: int) -> dict:
+    results = {}
+    for size in sizes:
+        records = gen.patients(size)
+        inference.classify_batch(records, use_cache=False)
+        repeats = max(3, min_rows // size)
+        timings = []
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            inference.classify_batch(records, use_cache=False)
+            timings.append(time.perf_counter() - t0)
+        best = min(timings)
+        results[str(size)] = {
+            'repeats': repeats,
+            'batch_ms_median': statistics.median(timings) * 1000.0,
+            'batch_ms_best': best * 1000.0,
+            'rows_per_s': size / statistics.median(timings),
+        }
+    return results
+
+
+def bench_explain(inference, gen: PatientGenerator, iterations: int, batch_size: int = 100) -> dict:
+    patients = gen.patients(iterations)
+    for p in patients[:50]:
+        inference.classify_batch([p], use_cache=False, explain=True)
+
+    # Interleaved so both sides see the same patients and machine state
+    plain, explained = [], []
+    for p in patients:
+        t0 = time.perf_counter()
+        inference.classify_batch([p], use_cache=False)
+        t1 = time.perf_counter()
+        inference.classify_batch([p], use_cache=False, explain=True)
+        t2 = time.perf_counter()
+        plain.append((t1 - t0) * 1000.0)
+        explained.append((t2 - t1) * 1000.0)
+
+    records = gen.patients(batch_size)
+    batch = {}
+    for explain in (False, True):
+        timings = []
+        for _ in range(max(3, iterations // batch_size)):
+            t0 = time.perf_counter()
+            inference.classify_batch(records, use_cache=False, explain=explain)
+            timings.append(time.perf_counter() - t0)
+        batch[explain] = statistics.median(timings) * 1000.0
+
+    return {
+        'iterations': iterations,
+        'plain_ms': percentiles(plain),
+        'explain_ms': percentiles(explained),
+        'single_overhead_p50_ms': statistics.median(explained) - statistics.median(plain),
+        'batch_size': batch_size,
+        'batch_overhead_ms_per_row': (batch[True] - batch[False]) / batch_size,
+    }
+
+
+def smaps_rollup_mb(pid: int) -> dict:
+    """Rss / Pss / private / shared memory of a process, in MB (Linux /proc/<pid>/smaps_rollup)."""
+    kb = {}
+    with open(f'/proc/{pid}/smaps_rollup', 'r') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                kb[parts[0].rstrip(':')] = int(parts[1])
+    return {
+        'rss_mb': kb.get('Rss', 0) / 1024,
+        'pss_mb': kb.get('Pss', 0) / 1024,
+        'private_mb': (kb.get('Private_Clean', 0) + kb.get('Private_Dirty', 0)) / 1024,
+        'shared_mb': (kb.get('Shared_Clean', 0) + kb.get('Shared_Dirty', 0)) / 1024,
+    }
+
+
+def bench_workers(gen: PatientGenerator, count: int) -> dict:
+    workers = [
+        subprocess.Popen(
+            [sys.executable, '-W', 'ignore', os.path.join(ML_DIR, 'predict.py'), '--worker'],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, cwd=ML_DIR,
+        )
+        for _ in range(count)
+    ]
+    try:
+        sources = set()
+        for proc in workers:
+            ready = json.loads(proc.stdout.readline())
+            sources.update(ready['models'].values())
+        for proc in workers:
+            for i, patient in enumerate(gen.patients(100)):
+                proc.stdin.write(json.dumps({'id': i, **patient}) + '\n')
+            proc.stdin.flush()
+        for proc in workers:
+            for _ in range(100):
+                proc.stdout.readline()
+        samples = [smaps_rollup_mb(proc.pid) for proc in workers]
+    finally:
+        for proc in workers:
+            proc.stdin.close()
+        for proc in workers:
+            try:
+                proc.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+    result = {key: statistics.mean(s[key] for s in samples) for key in samples[0]}
+    result.update({
+        'workers': count,
+        'total_pss_mb': sum(s['pss_mb'] for s in samples),
+        'model_states': sorted(sources),
+        'shared_forests': os.environ.get('ML_SHARED_FORESTS', '1') == '1',
+    })
+    return result
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(kind: str, port: int) -> subprocess.Popen:
+    env = dict(os.environ, ML_PORT=str(port), ML_HOST='127.0.0.1')
+    if kind == 'gunicorn':
+        cmd = [sys.executable, os.path.join(ML_DIR, 'serve.py')]
+    else:
+        cmd = [sys.executable, '-c',
+               f'import server; server.app.run(host="127.0.0.1", port={port}, threaded=True)']
+    proc = subprocess.Popen(cmd, cwd=ML_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f'{kind} server exited with code {proc.returncode}')
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/api/ml/health', timeout=1).read()
+            return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError(f'{kind} server did not become healthy within 60s')
+
+
+def bench_http(gen: PatientGenerator, kind: str, concurrency: int, duration: float) -> dict:
+    port = free_port()
+    proc = start_server(kind, port)
+    try:
+        payloads = gen.patients(2000)
+        run_load('127.0.0.1', port, payloads, concurrency=concurrency, duration=min(2.0, duration))  # warmup
+        result = run_load('127.0.0.1', port, payloads, concurrency=concurrency, duration=duration)
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+    result['server'] = kind
+    return result
+
+
+# ─────────────────────────────── COMPARISON ───────────────────────────────
+
+def tracked_metrics(results: dict) -> dict:
+    """Flatten the metrics we gate on to {name: (value, higher_is_better)}."""
+    r = results.get('results', {})
+    metrics = {}
+    if 'cold_start' in r:
+        metrics['cold_start.import_s'] = (r['cold_start']['import_s'], False)
+        metrics['cold_start.predict_py_roundtrip_s'] = (r['cold_start']['predict_py_roundtrip_s'], False)
+        metrics['cold_start.maxrss_mb'] = (r['cold_start']['maxrss_mb'], False)
+    if 'single' in r:
+        metrics['single.uncached_p50_ms'] = (r['single']['uncached_ms']['p50'], False)
+        metrics['single.uncached_p99_ms'] = (r['single']['uncached_ms']['p99'], False)
+    for size, b in r.get('batch', {}).items():
+        metrics[f'batch.{size}.rows_per_s'] = (b['rows_per_s'], True)
+    if 'explain' in r:
+        metrics['explain.single_overhead_p50_ms'] = (r['explain']['single_overhead_p50_ms'], False)
+        metrics['explain.batch_overhead_ms_per_row'] = (r['explain']['batch_overhead_ms_per_row'], False)
+    if 'memory' in r:
+        metrics['memory.peak_rss_mb'] = (r['memory']['peak_rss_mb'], False)
+    if 'workers' in r:
+        metrics['workers.private_mb'] = (r['workers']['private_mb'], False)
+        metrics['workers.pss_mb'] = (r['workers']['pss_mb'], False)
+    if 'http' in r:
+        metrics['http.requests_per_s'] = (r['http']['requests_per_s'], True)
+        metrics['http.p99_ms'] = (r['http']['latency_ms']['p99'], False)
+    return metrics
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    cur, base = tracked_metrics(current), tracked_metrics(baseline)
+    regressions = []
+    print("\n📊 Comparison vs. baseline")
+    for name, (value, higher_is_better) in cur.items():
+        if name not in base or base[name][0] == 0:
+            continue
+        old = base[name][0]
+        change = (value - old) / old
+        worse = -change if higher_is_better else change
+        flag = '❌' if worse > threshold else '✓'
+        print(f"   {flag} {name:40s} {old:12.4f} → {value:12.4f} ({change * 100:+.1f}%)")
+        if worse > threshold:
+            regressions.append(name)
+    return regressions
+
+
+# ─────────────────────────────── MAIN ───────────────────────────────
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ML_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='TriageAI ML inference benchmarks')
+    parser.add_argument('--only', default=','.join(ALL_BENCHMARKS),
+                        help=f'comma-separated subset of {",".join(ALL_BENCHMARKS)}')
+    parser.add_argument('--out', help='output JSON path')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--cold-repeats', type=int, default=3)
+    parser.add_argument('--single-iterations', type=int, default=1000)
+    parser.add_argument('--batch-sizes', default=','.join(str(s) for s in BATCH_SIZES))
+    parser.add_argument('--batch-min-rows', type=int, default=20000,
+                        help='repeat each batch size until at least this many rows were scored')
+    parser.add_argument('--workers', type=int, default=4, help='persistent predict.py workers to measure')
+    parser.add_argument('--http-server', choices=('flask', 'gunicorn'), default='flask')
+    parser.add_argument('--http-concurrency', type=int, default=16)
+    parser.add_argument('--http-duration', type=float, default=10.0)
+    parser.add_argument('--compare', help='baseline results JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10, help='allowed relative regression')
+    args = parser.parse_args(argv)
+
+    selected = [b.strip() for b in args.only.split(',') if b.strip()]
+    unknown = set(selected) - set(ALL_BENCHMARKS)
+    if unknown:
+        parser.error(f'unknown benchmarks: {sorted(unknown)}')
+
+    gen = PatientGenerator(seed=args.seed)
+    results = {}
+
+    print("=" * 70)
+    print("  TriageAI — ML Inference Benchmarks")
+    print("=" * 70)
+
+    if 'cold_start' in selected:
+        print("\n🧊 Cold start...")
+        results['cold_start'] = bench_cold_start(args.cold_repeats)
+        cs = results['cold_start']
+        print(f"   import {cs['import_s']:.3f}s | first classify {cs['first_classify_s'] * 1000:.1f}ms | "
+              f"predict.py round trip {cs['predict_py_roundtrip_s']:.3f}s | RSS {cs['maxrss_mb']:.0f} MB")
+
+    inference = None
+    if {'single', 'batch', 'explain', 'memory'} & set(selected):
+        import warnings
+        warnings.filterwarnings('ignore')
+        import inference
+
+    if 'single' in selected:
+        print("\n⏱  Single-row latency...")
+        results['single'] = bench_single(inference, gen, args.single_iterations)
+        u, c = results['single']['uncached_ms'], results['single']['cache_hit_ms']
+        print(f"   uncached p50 {u['p50']:.3f}ms p95 {u['p95']:.3f}ms p99 {u['p99']:.3f}ms | cache hit p50 {c['p50']:.3f}ms")
+
+    if 'batch' in selected:
+        print("\n📦 Batch throughput...")
+        sizes = tuple(int(s) for s in args.batch_sizes.split(','))
+        results['batch'] = bench_batch(inference, gen, sizes, args.batch_min_rows)
+        for size, b in results['batch'].items():
+            print(f"   {size:>6s} rows: {b['batch_ms_median']:9.2f} ms/batch → {b['rows_per_s']:10.0f} rows/s")
+
+    if 'explain' in selected:
+        print("\n🔍 Explanation overhead...")
+        results['explain'] = bench_explain(inference, gen, args.single_iterations)
+        e = results['explain']
+        print(f"   single row p50 {e['plain_ms']['p50']:.3f}ms → {e['explain_ms']['p50']:.3f}ms explained "
+              f"(+{e['single_overhead_p50_ms']:.3f}ms) | {e['batch_size']}-row batches "
+              f"+{e['batch_overhead_ms_per_row']:.3f}ms/row")
+
+    if 'memory' in selected:
+        results['memory'] = {'peak_rss_mb': peak_rss_mb()}
+        print(f"\n💾 Peak RSS (bench process): {results['memory']['peak_rss_mb']:.0f} MB")
+
+    if 'workers' in selected:
+        print(f"\n👥 {args.workers} persistent workers...")
+        results['workers'] = bench_workers(gen, args.workers)
+        w = results['workers']
+        print(f"   per worker: RSS {w['rss_mb']:.0f} MB | PSS {w['pss_mb']:.0f} MB | private {w['private_mb']:.0f} MB | "
+              f"shared {w['shared_mb']:.0f} MB | total PSS {w['total_pss_mb']:.0f} MB")
+
+    if 'http' in selected:
+        print(f"\n🌐 HTTP load ({args.http_server}, {args.http_concurrency} clients, {args.http_duration:.0f}s)...")
+        results['http'] = bench_http(gen, args.http_server, args.http_concurrency, args.http_duration)
+        h = results['http']
+        print(f"   {h['requests_per_s']:.0f} req/s | p50 {h['latency_ms']['p50']:.1f}ms "
+              f"p99 {h['latency_ms']['p99']:.1f}ms | {h['status_counts']}")
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'git_commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'seed': args.seed,
+            'benchmarks': selected,
+        },
+        'results': results,
+    }
+
+    out = args.out or os.path.join(RESULTS_DIR, f'bench-{time.strftime("%Y%m%d-%H%M%S")}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✓ Results written to {out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} metric(s) regressed by more than {args.threshold * 100:.0f}%")
+            return 1
+        print("\n✅ No regressions")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
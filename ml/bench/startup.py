@@ -0,0 +1,157 @@
+"""
+TriageAI — Startup Budget Check
+=================================
+Import-time profile of the serving entry points, and a pass/fail gate on cold
+start, so a stray top-level import (pandas, sklearn, ...) fails a check
+instead of quietly slowing every /api/triage request that spawns predict.py.
+
+For each module in ENTRY_POINTS a fresh interpreter runs
+`python -X importtime -c "import <module>"`. The profile charges each
+module's own import time to its top-level package, so nothing is counted
+twice, and lists any HEAVY_MODULES that were loaded. Then cold one-shot
+`predict.py` round trips are timed: interpreter start, imports, model load
+and one classification. That is the cost the triage route pays, within its
+5 s timeout, whenever no persistent worker is free.
+
+Fails (exit status 1) when:
+  - an entry point's median import time exceeds its budget in ENTRY_POINTS
+  - the median predict.py round trip exceeds ROUNDTRIP_BUDGET_S
+  - the serving path imports any of HEAVY_MODULES
+
+Usage:
+  npm run check:startup                          same as below, from the repo root
+  python ml/bench/startup.py                     profile + check
+  python ml/bench/startup.py --top 25            longer profile
+  python ml/bench/startup.py --out startup.json  also write the report as JSON
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+import statistics
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ML_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from patients import PatientGenerator
+
+# Module → median import budget (ms) on the serving path
+ENTRY_POINTS = {'predict': 400, 'server': 800}
+ROUNDTRIP_BUDGET_S = 1.5
+# Only ever imported on demand: training / offline code paths and the sklearn artifact fallback
+HEAVY_MODULES = ('pandas', 'sklearn', 'scipy', 'joblib', 'pyarrow', 'matplotlib')
+
+# Synthetic patients are neither patient history nor live traffic: the one-shot runs
+# write to a scratch history store and scratch drift sketches
+os.environ.setdefault('ML_HISTORY_DB', os.path.join(tempfile.gettempdir(), 'triageai-bench-history.db'))
+os.environ.setdefault('ML_DRIFT_DIR', os.path.join(tempfile.gettempdir(), 'triageai-bench-drift'))
+
+
+def import_profile(module: str) -> dict:
+    """One `-X importtime` run of `import <module>` in a fresh interpreter."""
+    code = f'import sys; sys.path.insert(0, {ML_DIR!r}); import {module}'
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                          capture_output=True, text=True, check=True)
+    total_us, packages, loaded = 0, {}, set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        name = name.strip()
+        package = name.split('.')[0]
+        packages[package] = packages.get(package, 0) + int(self_us)
+        loaded.add(package)
+        if name == module:
+            total_us = int(cumulative_us)
+    return {
+        'import_ms': total_us / 1000,
+        'packages_ms': {p: us / 1000 for p, us in sorted(packages.items(), key=lambda kv: -kv[1])},
+        'heavy_modules': sorted(loaded & set(HEAVY_MODULES)),
+    }
+
+
+def predict_roundtrips(repeats: int) -> list[float]:
+    """Wall time of cold one-shot `predict.py` runs, as the triage route spawns them."""
+    patient = json.dumps(PatientGenerator(seed=7).patient())
+    timings = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        proc = subprocess.run([sys.executable, os.path.join(ML_DIR, 'predict.py')],
+                              input=patient, capture_output=True, text=True)
+        timings.append(time.perf_counter() - t0)
+        if proc.returncode != 0:
+            raise RuntimeError(f'predict.py failed: {proc.stdout.strip() or proc.stderr.strip()}')
+    return timings
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='TriageAI serving import profile and startup budget check')
+    parser.add_argument('--repeats', type=int, default=5, help='fresh interpreters per measurement')
+    parser.add_argument('--top', type=int, default=12, help='packages listed per entry point')
+    parser.add_argument('--roundtrip-budget', type=float, default=ROUNDTRIP_BUDGET_S,
+                        help='median predict.py round trip budget (seconds)')
+    parser.add_argument('--out', help='write the report to this JSON path')
+    args = parser.parse_args(argv)
+
+    print("=" * 70)
+    print("  TriageAI — Startup Budget")
+    print("=" * 70)
+
+    report, failures = {'imports': {}}, []
+    for module, budget_ms in ENTRY_POINTS.items():
+        try:
+            runs = [import_profile(module) for _ in range(args.repeats)]
+        except subprocess.CalledProcessError as e:
+            print(f"\n⚠️  import {module} failed — skipped:\n{e.stderr.strip().splitlines()[-1]}")
+            continue
+        median_ms = statistics.median(r['import_ms'] for r in runs)
+        profile = runs[len(runs) // 2]
+        report['imports'][module] = {
+            'import_ms': median_ms,
+            'budget_ms': budget_ms,
+            'packages_ms': profile['packages_ms'],
+            'heavy_modules': profile['heavy_modules'],
+        }
+
+        ok = median_ms <= budget_ms and not profile['heavy_modules']
+        print(f"\n{'✓' if ok else '❌'} import {module}: {median_ms:.0f} ms (budget {budget_ms} ms)")
+        for package, ms in list(profile['packages_ms'].items())[:args.top]:
+            print(f"      {package:28s} {ms:8.1f} ms")
+        if median_ms > budget_ms:
+            failures.append(f'import {module} took {median_ms:.0f} ms (budget {budget_ms} ms)')
+        if profile['heavy_modules']:
+            failures.append(f'import {module} loads {", ".join(profile["heavy_modules"])}')
+            print(f"   ❌ heavy modules on the serving path: {profile['heavy_modules']}")
+
+    timings = predict_roundtrips(args.repeats)
+    roundtrip_s = statistics.median(timings)
+    report['predict_py_roundtrip_s'] = {'median': roundtrip_s, 'max': max(timings), 'budget': args.roundtrip_budget}
+    ok = roundtrip_s <= args.roundtrip_budget
+    print(f"\n{'✓' if ok else '❌'} predict.py round trip: median {roundtrip_s:.3f}s, max {max(timings):.3f}s "
+          f"(budget {args.roundtrip_budget:.1f}s)")
+    if not ok:
+        failures.append(f'predict.py round trip took {roundtrip_s:.3f}s (budget {args.roundtrip_budget:.1f}s)')
+
+    report['failures'] = failures
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✓ Report written to {args.out}")
+
+    if failures:
+        print(f"\n❌ {len(failures)} startup budget violation(s):")
+        for failure in failures:
+            print(f"   - {failure}")
+        return 1
+    print("\n✅ Within the startup budget")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
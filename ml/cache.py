@@ -0,0 +1,144 @@
+"""
+TriageAI — Prediction Cache
+=============================
+Bounded, thread-safe LRU cache for classification results.
+
+Entries are keyed on the encoded feature row (its raw float32 bytes), which is
+the canonical form of a patient: symptom/condition order, duplicate 'None'
+entries and int-vs-float vitals all collapse to the same key, while anything
+that changes the model input changes the key.
+
+Configuration (environment):
+  ML_CACHE_SIZE   max entries, 0 disables the cache      (default 4096)
+  ML_CACHE_TTL    seconds an entry stays valid, 0 = ∞    (default 300)
+"""
+
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+DEFAULT_CACHE_SIZE = int(os.environ.get('ML_CACHE_SIZE', 4096))
+DEFAULT_CACHE_TTL = float(os.environ.get('ML_CACHE_TTL', 300))
+
+# How often (seconds) the artifact fingerprint is re-checked on lookup
+FINGERPRINT_CHECK_INTERVAL = 1.0
+
+
+def artifact_fingerprint(model_dir: str) -> str:
+    """Hash the name, size and mtime of every file under `model_dir`."""
+    h = hashlib.sha1()
+    for root, dirs, files in os.walk(model_dir):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            h.update(f'{os.path.relpath(path, model_dir)}:{st.st_size}:{st.st_mtime_ns};'.encode())
+    return h.hexdigest()
+
+
+class PredictionCache:
+    """
+    LRU cache with optional TTL that empties itself when the model artifacts change.
+
+    `get`/`put` take a bytes key; values are result dicts and are copied on the
+    way out so callers can't mutate cached entries.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE, ttl: float = DEFAULT_CACHE_TTL, model_dir: str | None = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.model_dir = model_dir
+        self._data: OrderedDict[bytes, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self._fingerprint = artifact_fingerprint(model_dir) if model_dir else None
+        self._next_check = time.monotonic() + FINGERPRINT_CHECK_INTERVAL
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0
+
+    def _check_artifacts(self, now: float) -> None:
+        """Clear the cache if anything under model_dir changed since the last check. Lock held."""
+        if self.model_dir is None or now < self._next_check:
+            return
+        self._next_check = now + FINGERPRINT_CHECK_INTERVAL
+        fingerprint = artifact_fingerprint(self.model_dir)
+        if fingerprint != self._fingerprint:
+            self._fingerprint = fingerprint
+            self._data.clear()
+            self.invalidations += 1
+
+    def get(self, key: bytes) -> dict | None:
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            self._check_artifacts(now)
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            stored_at, value = entry
+            if self.ttl > 0 and now - stored_at > self.ttl:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+        return _copy_result(value)
+
+    def put(self, key: bytes, value: dict) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic(), _copy_result(value))
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            if self.model_dir:
+                self._fingerprint = artifact_fingerprint(self.model_dir)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+            }
+
+
+def _copy_result(value):
+    """
+    Deep copy of a JSON-shaped result (dicts, lists, scalars) — nested parts such
+    as `explanation` and `models_unavailable` must not be shared with callers.
+    Cheaper than copy.deepcopy (no memo bookkeeping), which matters on the cache-hit path.
+    """
+    if isinstance(value, dict):
+        return {k: _copy_result(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy_result(v) for v in value]
+    return value
@@ -0,0 +1,354 @@
+"""
+TriageAI — Input Drift Monitor
+================================
+Tracks how live classify() traffic compares with the data the models were
+trained on.
+
+train_model.py saves a reference profile next to the models
+(`drift_profile.json`): decile bin edges and counts for each vital sign, how
+often each symptom / condition / gender appears, and the class mix of each
+target. Serving keeps fixed-size count sketches in exactly that layout:
+
+  rows                      requests seen
+  <vital>                   histogram over the reference decile edges
+  symptoms / conditions /   mentions per known term (one column sum of the
+  gender                    already-encoded feature matrix per batch)
+  unknown                   rows with an unrecognized term, and term count, per kind
+  predicted_<task>          predicted-class counts
+
+Updating a sketch is a handful of vectorized adds per batch. Each worker
+process owns its sketches — no cross-process locking — in a small .npy file
+under ML_DRIFT_DIR (default /dev/shm/triageai-drift/<model version>/), one
+file per worker per time window (ML_DRIFT_WINDOW_S, default 1 h). A report
+sums every worker's files for the requested windows, so any worker can
+answer for the whole node; windows older than ML_DRIFT_KEEP are deleted, and
+a reload deletes the directories of versions that are no longer live
+(prune_versions).
+
+Each distribution is compared with the reference via PSI and KL(live ‖ ref):
+PSI < 0.1 'ok', < 0.25 'warning', otherwise 'drift'; fewer than
+ML_DRIFT_MIN_ROWS live rows report 'insufficient_data'. ML_DRIFT=0 turns the
+monitor off.
+"""
+
+import os
+import glob
+import time
+import shutil
+import tempfile
+import threading
+
+import numpy as np
+
+PROFILE_NAME = 'drift_profile.json'
+VITALS = ('Age', 'Blood_Pressure_Systolic', 'Heart_Rate', 'Temperature_F')
+GROUPS = ('symptoms', 'conditions', 'gender')
+UNKNOWN_KINDS = ('symptoms', 'conditions', 'gender')
+DECILES = np.linspace(0.1, 0.9, 9)
+
+ENABLED = os.environ.get('ML_DRIFT', '1') == '1'
+DRIFT_DIR = os.environ.get('ML_DRIFT_DIR') or os.path.join(
+    '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(), 'triageai-drift'
+)
+WINDOW_S = int(os.environ.get('ML_DRIFT_WINDOW_S', '3600'))
+KEEP_WINDOWS = int(os.environ.get('ML_DRIFT_KEEP', '168'))       # a week of hourly windows
+MIN_ROWS = int(os.environ.get('ML_DRIFT_MIN_ROWS', '200'))
+
+PSI_WARNING, PSI_DRIFT = 0.1, 0.25
+UNKNOWN_WARNING = 0.05    # share of rows with an unrecognized term
+EPSILON = 1e-4            # floor for empty bins so PSI / KL stay finite
+PROFILE_CHUNK_ROWS = 50_000
+
+
+# ─────────────────────────────── REFERENCE PROFILE ───────────────────────────────
+def build_profile(X, encoder, targets: dict) -> dict:
+    """
+    Reference profile of an encoded training matrix.
+
+    Args:
+        X: (n × n_features) training matrix (may be a memmap; read in chunks)
+        encoder: the FeatureEncoder that produced X
+        targets: {task: (class labels, integer codes per row)}
+    """
+    col = encoder._col
+    n = X.shape[0]
+    vitals = {}
+    for name in VITALS:
+        values = np.asarray(X[:, col[name]], dtype=np.float64)
+        edges = np.unique(np.quantile(values, DECILES))
+        counts = np.bincount(np.searchsorted(edges, values, side='right'), minlength=len(edges) + 1)
+        vitals[name] = {'edges': edges.tolist(), 'counts': counts.tolist()}
+
+    vocabularies = _vocabularies(encoder)
+    groups = {g: np.zeros(len(vocab), dtype=np.int64) for g, vocab in vocabularies.items()}
+    for start in range(0, n, PROFILE_CHUNK_ROWS):
+        chunk = X[start:start + PROFILE_CHUNK_ROWS]
+        for g, vocab in vocabularies.items():
+            groups[g] += chunk[:, list(vocab.values())].sum(axis=0).astype(np.int64)
+
+    return {
+        'rows': int(n),
+        'vitals': vitals,
+        'groups': {g: dict(zip(vocabularies[g], counts.tolist())) for g, counts in groups.items()},
+        'classes': {
+            task: dict(zip((str(c) for c in labels), np.bincount(y, minlength=len(labels)).tolist()))
+            for task, (labels, y) in targets.items()
+        },
+    }
+
+
+def _vocabularies(encoder) -> dict[str, dict[str, int]]:
+    """{group: {canonical term: feature column}} for the encoder's indicator columns."""
+    return {'symptoms': encoder.symptoms.exact, 'conditions': encoder.conditions.exact, 'gender': encoder.genders.exact}
+
+
+# ─────────────────────────────── SKETCHES ───────────────────────────────
+class SketchLayout:
+    """Where each count lives in a worker's flat sketch array, derived from profile + encoder."""
+
+    def __init__(self, profile: dict, encoder):
+        self.slices = {}
+        offset = 1   # [0] = rows
+
+        def take(name: str, size: int) -> slice:
+            nonlocal offset
+            self.slices[name] = slice(offset, offset + size)
+            offset += size
+            return self.slices[name]
+
+        col = encoder._col
+        self.vitals = []
+        for name, ref in profile['vitals'].items():
+            edges = np.asarray(ref['edges'], dtype=np.float64)
+            self.vitals.append((name, col[name], edges, take(name, len(edges) + 1)))
+
+        # Terms seen in training first, then any the encoder learned since (incremental runs)
+        vocabularies = _vocabularies(encoder)
+        self.terms = {}
+        positions, columns = [], []   # sketch slot ← feature column, for every indicator the encoder has
+        for g in GROUPS:
+            terms = list(profile['groups'].get(g, {}))
+            terms += [t for t in vocabularies[g] if t not in profile['groups'].get(g, {})]
+            self.terms[g] = terms
+            sl = take(g, len(terms))
+            for i, term in enumerate(terms):
+                if term in vocabularies[g]:
+                    positions.append(sl.start + i)
+                    columns.append(vocabularies[g][term])
+        self.term_positions = np.asarray(positions, dtype=np.intp)
+        self.term_columns = np.asarray(columns, dtype=np.intp)
+
+        self.unknown = take('unknown', 2 * len(UNKNOWN_KINDS))
+        self.classes = {}
+        for task, counts in profile['classes'].items():
+            labels = list(counts)
+            self.classes[task] = (labels, {label: i for i, label in enumerate(labels)}, take(f'predicted_{task}', len(labels)))
+        self.size = offset
+
+
+def prune_versions(live_version: str | None, drift_dir: str = DRIFT_DIR) -> list[str]:
+    """
+    Delete the sketch directories of every model version but `live_version`;
+    returns the versions removed. A worker still finishing on an old version
+    keeps writing to its already-open (now unlinked) sketch until it reloads.
+    """
+    try:
+        entries = os.listdir(drift_dir)
+    except OSError:
+        return []
+    removed = []
+    for name in entries:
+        path = os.path.join(drift_dir, name)
+        if name != str(live_version) and os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+            removed.append(name)
+    return removed
+
+
+class DriftMonitor:
+    """Per-process sketch writer and node-wide report reader for one model version."""
+
+    # Result key holding each task's predicted class
+    RESULT_KEYS = {'risk': 'risk_level', 'dept': 'department'}
+
+    def __init__(self, profile: dict, encoder, version: str | None, drift_dir: str = DRIFT_DIR):
+        self.profile = profile
+        self.layout = SketchLayout(profile, encoder)
+        self.dir = os.path.join(drift_dir, str(version))
+        self._lock = threading.Lock()
+        self._key = None        # (pid, window) the open sketch belongs to
+        self._sketch = None
+        self._local = {}        # window → in-memory sketch when the directory is not writable
+
+    # ── writing ──
+    def _current(self) -> np.ndarray:
+        window = int(time.time() // WINDOW_S)
+        key = (os.getpid(), window)
+        if key != self._key:
+            self._sketch = self._open(*key)
+            self._key = key
+        return self._sketch
+
+    def _open(self, pid: int, window: int) -> np.ndarray:
+        path = os.path.join(self.dir, f'{pid}-{window}.npy')
+        try:
+            os.makedirs(self.dir, exist_ok=True)
+            if os.path.exists(path):
+                sketch = np.load(path, mmap_mode='r+')
+                if sketch.shape == (self.layout.size,):
+                    return sketch.view(np.ndarray)
+            sketch = np.lib.format.open_memmap(path, mode='w+', dtype=np.float64, shape=(self.layout.size,))
+            # Plain ndarray view of the mapping: in-place adds skip np.memmap's per-operation overhead
+            return sketch.view(np.ndarray)
+        except (OSError, ValueError):
+            return self._local.setdefault(window, np.zeros(self.layout.size))
+
+    def observe(self, X: np.ndarray, unknown: list[dict], results: list[dict]) -> None:
+        """Add one scored batch: its feature matrix, unknown terms and results."""
+        layout = self.layout
+        # Every histogram / class-mix hit as one sketch slot, counted in a single bincount
+        slots = [np.searchsorted(edges, X[:, col], side='right') + sl.start for _, col, edges, sl in layout.vitals]
+        for task, (_, index, sl) in layout.classes.items():
+            key = self.RESULT_KEYS.get(task)
+            slots.append(np.fromiter((sl.start + index[r[key]] for r in results if r.get(key) in index), dtype=np.intp))
+        delta = np.bincount(np.concatenate(slots), minlength=layout.size).astype(np.float64)
+        delta[0] = X.shape[0]
+        delta[layout.term_positions] = X[:, layout.term_columns].sum(axis=0)
+        if any(unknown):
+            base = layout.unknown.start
+            for terms in unknown:
+                for kind, found in terms.items():
+                    k = UNKNOWN_KINDS.index(kind)
+                    delta[base + 2 * k] += 1
+                    delta[base + 2 * k + 1] += len(found)
+
+        with self._lock:
+            sketch = self._current()
+            sketch += delta
+
+    # ── reading ──
+    def merged(self, windows: int = 24) -> tuple[np.ndarray, int]:
+        """Sum of every worker's sketches over the last `windows` windows, and the number of files merged."""
+        now = int(time.time() // WINDOW_S)
+        total = np.zeros(self.layout.size)
+        files = 0
+        for path in glob.glob(os.path.join(self.dir, '*-*.npy')):
+            try:
+                window = int(os.path.basename(path)[:-4].split('-')[1])
+                if window <= now - KEEP_WINDOWS:
+                    os.unlink(path)
+                    continue
+                if window <= now - windows:
+                    continue
+                sketch = np.load(path, mmap_mode='r')
+            except (OSError, ValueError, IndexError):
+                continue
+            if sketch.shape == total.shape:
+                total += sketch
+                files += 1
+        for window, sketch in self._local.items():
+            if window > now - windows:
+                total += sketch
+                files += 1
+        return total, files
+
+    def report(self, windows: int = 24) -> dict:
+        """PSI / KL of the live distributions against the reference profile."""
+        live, files = self.merged(windows)
+        layout, profile = self.layout, self.profile
+        rows = int(live[0])
+        enough = rows >= MIN_ROWS
+
+        def judge(entry: dict) -> dict:
+            entry['status'] = _status(entry['psi']) if enough else 'insufficient_data'
+            return entry
+
+        features = {}
+        for name, _, edges, sl in layout.vitals:
+            ref = np.asarray(profile['vitals'][name]['counts'], dtype=np.float64)
+            features[name] = judge({
+                **divergence(live[sl], ref),
+                'edges': edges.tolist(),
+                'reference': _shares(ref).tolist(),
+                'live': _shares(live[sl]).tolist(),
+            })
+        for g in GROUPS:
+            terms = layout.terms[g]
+            ref = np.asarray([profile['groups'].get(g, {}).get(t, 0) for t in terms], dtype=np.float64)
+            counts = live[layout.slices[g]]
+            # Per-row prevalence, largest moves first
+            ref_rate = ref / max(profile['rows'], 1)
+            live_rate = counts / max(rows, 1)
+            order = np.argsort(-np.abs(live_rate - ref_rate), kind='stable')[:5]
+            features[g] = judge({
+                **divergence(counts, ref),
+                'top_changes': [
+                    {'term': terms[i], 'reference': float(ref_rate[i]), 'live': float(live_rate[i])} for i in order
+                ],
+            })
+
+        predicted = {}
+        for task, (labels, _, sl) in layout.classes.items():
+            ref = np.asarray([profile['classes'][task][label] for label in labels], dtype=np.float64)
+            if live[sl].sum() == 0:
+                continue   # model not serving (e.g. department model missing)
+            predicted[task] = judge({
+                **divergence(live[sl], ref),
+                'reference': dict(zip(labels, _shares(ref).tolist())),
+                'live': dict(zip(labels, _shares(live[sl]).tolist())),
+            })
+
+        unknown = {}
+        counts = live[layout.unknown]
+        for k, kind in enumerate(UNKNOWN_KINDS):
+            share = counts[2 * k] / rows if rows else 0.0
+            unknown[kind] = {
+                'rows_share': float(share),
+                'terms_per_row': float(counts[2 * k + 1] / rows) if rows else 0.0,
+                'status': ('warning' if share > UNKNOWN_WARNING else 'ok') if enough else 'insufficient_data',
+            }
+
+        statuses = [e['status'] for e in (*features.values(), *predicted.values(), *unknown.values())]
+        return {
+            'status': _worst(statuses) if enough else 'insufficient_data',
+            'rows': rows,
+            'reference_rows': profile['rows'],
+            'windows': windows,
+            'window_seconds': WINDOW_S,
+            'sketches_merged': files,
+            'features': features,
+            'predicted': predicted,
+            'unknown_terms': unknown,
+        }
+
+    def psi(self, windows: int = 24) -> dict:
+        """{distribution: PSI} — the flat view exported as a metrics gauge."""
+        report = self.report(windows)
+        values = {name: e['psi'] for name, e in report['features'].items()}
+        values.update({f'predicted_{task}': e['psi'] for task, e in report['predicted'].items()})
+        return values
+
+
+# ─────────────────────────────── DIVERGENCE ───────────────────────────────
+def _shares(counts: np.ndarray) -> np.ndarray:
+    total = counts.sum()
+    return counts / total if total else np.zeros_like(counts, dtype=np.float64)
+
+
+def divergence(live: np.ndarray, reference: np.ndarray) -> dict:
+    """PSI and KL(live ‖ reference) between two count vectors over the same bins."""
+    p = np.maximum(_shares(np.asarray(live, dtype=np.float64)), EPSILON)
+    q = np.maximum(_shares(np.asarray(reference, dtype=np.float64)), EPSILON)
+    return {
+        'psi': float(np.sum((p - q) * np.log(p / q))),
+        'kl': float(np.sum(p * np.log(p / q))),
+    }
+
+
+def _status(psi: float) -> str:
+    return 'drift' if psi >= PSI_DRIFT else 'warning' if psi >= PSI_WARNING else 'ok'
+
+
+def _worst(statuses: list[str]) -> str:
+    order = ('ok', 'warning', 'drift')
+    return max((s for s in statuses if s in order), key=order.index, default='ok')
@@ -0,0 +1,254 @@
+"""
+TriageAI — Feature Encoder
+============================
+Turns raw patient records into the model's feature matrix.
+
+A single `FeatureEncoder` is built at training time, saved next to the models as
+`feature_encoder.json`, and loaded by inference — so both sides share one
+definition of the columns, vocabularies and bins and cannot drift apart.
+
+Encoding is table-driven:
+  - symptom / condition / gender tokens map to column indices through a
+    VocabularyIndex (vocabulary.py): canonical names, aliases and case/whitespace
+    folding, one dict lookup per token
+  - age, BP and heart-rate buckets use np.searchsorted on the pd.cut() bin edges
+  - output is written into a preallocated float32 row or matrix
+"""
+
+import json
+import numpy as np
+
+from vocabulary import VocabularyIndex, SYMPTOM_ALIASES, CONDITION_ALIASES, GENDER_ALIASES, canonicalize, fold
+
+# Right-closed bin edges used by pd.cut() in the original pipeline:
+#   age (0,12] (12,30] (30,50] (50,70] (70,100]  → 0..4
+#   bp  (0,90] (90,120] (120,140] (140,200]     → 0..3
+#   hr  (0,60] (60,80] (80,100] (100,200]       → 0..3
+DEFAULT_BINS = {
+    'age_group': [12, 30, 50, 70],
+    'bp_category': [90, 120, 140],
+    'hr_category': [60, 80, 100],
+}
+FEVER_THRESHOLD_F = 100.4
+
+NUMERIC_COLUMNS = ['Age', 'Blood_Pressure_Systolic', 'Heart_Rate', 'Temperature_F']
+DERIVED_COLUMNS = ['age_group', 'bp_category', 'hr_category', 'has_fever', 'symptom_count', 'condition_count']
+
+
+def symptom_column(name: str) -> str:
+    return f'symptom_{name.lower().replace(" ", "_")}'
+
+
+def condition_column(name: str) -> str:
+    return f'cond_{name.lower().replace(" ", "_")}'
+
+
+def gender_column(name: str) -> str:
+    return f'gender_{name}'
+
+
+def clean_conditions(conditions: list[str]) -> list[str]:
+    """Drop the 'None' placeholder the intake form sends for no conditions."""
+    return [c for c in conditions if c.lower() != 'none']
+
+
+def _vocabulary(tokens, aliases: dict, known: VocabularyIndex | None = None) -> list[str]:
+    """
+    Sorted distinct classes among `tokens`, after rewriting aliases to their
+    canonical class. Spellings that differ only in case or spacing count once;
+    tokens `known` already maps are skipped.
+    """
+    by_fold = {}
+    for token in canonicalize(tokens, aliases):
+        if known is not None and known.column(token) is not None:
+            continue
+        key = fold(token)
+        by_fold[key] = min(by_fold.get(key, token), token)
+    return sorted(by_fold.values())
+
+
+def _unknown_terms(*groups) -> dict:
+    """{kind: [terms]} for the non-blank terms whose column lookup came back None."""
+    found = {}
+    for kind, terms, columns in groups:
+        missed = [t for t, j in zip(terms, columns) if j is None and str(t).strip()]
+        if missed:
+            found[kind] = missed
+    return found
+
+
+class FeatureEncoder:
+    """
+    Encodes patient records (dicts with the `classify()` argument names) into
+    float32 feature rows whose column order is `feature_columns`.
+    """
+
+    def __init__(
+        self,
+        feature_columns: list[str],
+        symptom_classes: list[str],
+        condition_classes: list[str],
+        gender_classes: list[str],
+        bins: dict | None = None,
+    ):
+        self.feature_columns = list(feature_columns)
+        self.symptom_classes = list(symptom_classes)
+        self.condition_classes = list(condition_classes)
+        self.gender_classes = list(gender_classes)
+        self.bins = {k: list(v) for k, v in (bins or DEFAULT_BINS).items()}
+
+        col = {name: i for i, name in enumerate(self.feature_columns)}
+        missing = [c for c in NUMERIC_COLUMNS + DERIVED_COLUMNS if c not in col]
+        if missing:
+            raise ValueError(f'feature_columns is missing required columns: {missing}')
+
+        self._col = col
+        self.symptoms = VocabularyIndex({s: col[symptom_column(s)] for s in self.symptom_classes}, SYMPTOM_ALIASES)
+        self.conditions = VocabularyIndex({c: col[condition_column(c)] for c in self.condition_classes}, CONDITION_ALIASES)
+        self.genders = VocabularyIndex({g: col[gender_column(g)] for g in self.gender_classes}, GENDER_ALIASES)
+
+        self._age_bins = np.asarray(self.bins['age_group'], dtype=np.float64)
+        self._bp_bins = np.asarray(self.bins['bp_category'], dtype=np.float64)
+        self._hr_bins = np.asarray(self.bins['hr_category'], dtype=np.float64)
+
+    @property
+    def n_features(self) -> int:
+        return len(self.feature_columns)
+
+    # ─────────────────────────────── CONSTRUCTION ───────────────────────────────
+
+    @classmethod
+    def fit(cls, symptom_lists, condition_lists, genders) -> 'FeatureEncoder':
+        """
+        Build an encoder from training data (vocabularies are sorted, as
+        MultiLabelBinarizer does). Known aliases are folded into their canonical
+        class first, so the data cannot introduce a duplicate column for one.
+        """
+        symptom_classes = _vocabulary((s for row in symptom_lists for s in row), SYMPTOM_ALIASES)
+        condition_classes = _vocabulary((c for row in condition_lists for c in row), CONDITION_ALIASES)
+        gender_classes = _vocabulary(genders, GENDER_ALIASES)
+
+        feature_columns = (
+            NUMERIC_COLUMNS
+            + DERIVED_COLUMNS
+            + [gender_column(g) for g in gender_classes]
+            + [symptom_column(s) for s in symptom_classes]
+            + [condition_column(c) for c in condition_classes]
+        )
+        return cls(feature_columns, symptom_classes, condition_classes, gender_classes)
+
+    def extend(self, symptom_lists, condition_lists, genders) -> 'FeatureEncoder':
+        """
+        Copy of this encoder with any unseen symptoms / conditions / genders added
+        as new columns at the end. Existing column indices do not move, so models
+        trained on the old columns still read the right features.
+        """
+        new_symptoms = _vocabulary((s for row in symptom_lists for s in row), SYMPTOM_ALIASES, self.symptoms)
+        new_conditions = _vocabulary((c for row in condition_lists for c in row), CONDITION_ALIASES, self.conditions)
+        new_genders = _vocabulary(genders, GENDER_ALIASES, self.genders)
+        return FeatureEncoder(
+            self.feature_columns
+            + [gender_column(g) for g in new_genders]
+            + [symptom_column(s) for s in new_symptoms]
+            + [condition_column(c) for c in new_conditions],
+            self.symptom_classes + new_symptoms,
+            self.condition_classes + new_conditions,
+            self.gender_classes + new_genders,
+            self.bins,
+        )
+
+    @classmethod
+    def from_metadata(cls, meta: dict) -> 'FeatureEncoder':
+        """Rebuild the encoder from `feature_metadata.json` (for artifacts trained before the encoder existed)."""
+        gender_prefix = len('gender_')
+        return cls(
+            meta['feature_columns'],
+            meta['symptom_classes'],
+            meta['condition_classes'],
+            [g[gender_prefix:] for g in meta['gender_categories']],
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            'feature_columns': self.feature_columns,
+            'symptom_classes': self.symptom_classes,
+            'condition_classes': self.condition_classes,
+            'gender_classes': self.gender_classes,
+            'bins': self.bins,
+        }
+
+    def save(self, path: str) -> None:
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path: str) -> 'FeatureEncoder':
+        with open(path, 'r') as f:
+            return cls(**json.load(f))
+
+    # ─────────────────────────────── ENCODING ───────────────────────────────
+
+    def transform(self, records: list[dict], out: np.ndarray | None = None, unknown: list | None = None) -> np.ndarray:
+        """
+        Encode a batch of records into an (n × n_features) float32 matrix.
+
+        If `out` is given it must be a float32 array of at least that shape;
+        it is zeroed and filled in place, so hot paths can reuse one buffer.
+        If `unknown` is a list, one dict per record is appended to it naming the
+        terms no vocabulary recognized ({'symptoms': [...], ...}; {} if none).
+        """
+        n = len(records)
+        if out is None:
+            X = np.zeros((n, self.n_features), dtype=np.float32)
+        else:
+            X = out[:n]
+            X.fill(0)
+
+        col = self._col
+        age = np.fromiter((r['age'] for r in records), dtype=np.float64, count=n)
+        bp = np.fromiter((r['blood_pressure_systolic'] for r in records), dtype=np.float64, count=n)
+        hr = np.fromiter((r['heart_rate'] for r in records), dtype=np.float64, count=n)
+        temp = np.fromiter((r['temperature_f'] for r in records), dtype=np.float64, count=n)
+
+        X[:, col['Age']] = age
+        X[:, col['Blood_Pressure_Systolic']] = bp
+        X[:, col['Heart_Rate']] = hr
+        X[:, col['Temperature_F']] = temp
+        X[:, col['age_group']] = np.searchsorted(self._age_bins, age, side='left')
+        X[:, col['bp_category']] = np.searchsorted(self._bp_bins, bp, side='left')
+        X[:, col['hr_category']] = np.searchsorted(self._hr_bins, hr, side='left')
+        X[:, col['has_fever']] = temp > FEVER_THRESHOLD_F
+
+        symptom_col = self.symptoms.column
+        condition_col = self.conditions.column
+        gender_col = self.genders.column
+
+        symptom_lists = [r['symptoms'] for r in records]
+        condition_lists = [clean_conditions(r['pre_existing_conditions']) for r in records]
+        X[:, col['symptom_count']] = np.fromiter(map(len, symptom_lists), dtype=np.float32, count=n)
+        X[:, col['condition_count']] = np.fromiter(map(len, condition_lists), dtype=np.float32, count=n)
+
+        # Collect (row, column) pairs for every known token, then set them in one fancy-index write
+        rows, cols = [], []
+        for i, r in enumerate(records):
+            gender = gender_col(r['gender'])
+            symptoms = [symptom_col(t) for t in symptom_lists[i]]
+            conditions = [condition_col(t) for t in condition_lists[i]]
+            for j in (gender, *symptoms, *conditions):
+                if j is not None:
+                    rows.append(i)
+                    cols.append(j)
+            if unknown is not None:
+                unknown.append(_unknown_terms(
+                    ('gender', [r['gender']], [gender]),
+                    ('symptoms', symptom_lists[i], symptoms),
+                    ('conditions', condition_lists[i], conditions),
+                ))
+
+        if rows:
+            X[rows, cols] = 1.0
+        return X
+
+    def transform_one(self, record: dict, out: np.ndarray | None = None) -> np.ndarray:
+        """Encode a single record into a (1 × n_features) float32 row."""
+        return self.transform([record], out=out)
@@ -0,0 +1,303 @@
+"""
+TriageAI — Compiled Forest Format
+===================================
+Flattens a fitted sklearn RandomForestClassifier into a handful of plain NumPy
+arrays and evaluates them with vectorized NumPy — no sklearn import, no pickle.
+
+On-disk layout (one directory per model, every array a memory-mappable .npy):
+
+  <name>_forest/
+    meta.json       n_trees, n_features, n_classes, max_depth, format_version
+    roots.npy       int32   (n_trees,)   index of each tree's root node
+    feature.npy     int32   (n_nodes,)   split feature (0 for leaves)
+    threshold.npy   float64 (n_nodes,)   split threshold (+inf for leaves)
+    children.npy    int32   (n_nodes, 2) [left, right] child (leaves point to themselves)
+    value.npy       float64 (n_nodes, n_classes)  normalized class distribution per leaf
+    classes.npy     str     (n_classes,) decoded class labels, in predict_proba column order
+
+All trees share one node array; leaves loop back to themselves, so a step is
+always `node = children[node, x[feature[node]] > threshold[node]]` and every
+(sample, tree) pair can be advanced at once with a few np.take calls.
+
+`contributions()` walks the same paths and credits each split's change in
+class distribution to its feature — an exact additive explanation of
+`predict_proba` used by `classify(explain=True)`.
+
+Usage:
+  python forest.py           Export every sklearn forest found in ml/models
+"""
+
+import os
+import json
+import numpy as np
+
+FORMAT_VERSION = 1
+ARRAYS = ('roots', 'feature', 'threshold', 'children', 'value', 'classes')
+
+# Rows per traversal chunk — bounds the (rows × trees) index matrices to a few MB
+CHUNK_ROWS = 1024
+
+
+def compile_forest(model, class_labels) -> tuple[dict, dict]:
+    """
+    Flatten a fitted RandomForestClassifier into the compiled arrays.
+
+    Args:
+        model: fitted sklearn RandomForestClassifier (single output)
+        class_labels: decoded label for each column of model.predict_proba
+
+    Returns:
+        (arrays keyed like ARRAYS, meta dict)
+    """
+    features, thresholds, children, values, roots = [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for est in model.estimators_:
+        tree = est.tree_
+        n = tree.node_count
+        node_ids = np.arange(n, dtype=np.int32)
+        is_leaf = tree.children_left == -1
+
+        # sklearn >= 1.4 stores per-node class fractions and returns them as-is;
+        # older versions store weighted counts and normalize inside predict_proba.
+        value = tree.value[:, 0, :].astype(np.float64)
+        if np.allclose(value.sum(axis=1), 1.0):
+            normalizer = 1.0
+        else:
+            normalizer = value.sum(axis=1, keepdims=True)
+            normalizer[normalizer == 0.0] = 1.0
+
+        features.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+        thresholds.append(np.where(is_leaf, np.inf, tree.threshold).astype(np.float64))
+        left = np.where(is_leaf, node_ids, tree.children_left)
+        right = np.where(is_leaf, node_ids, tree.children_right)
+        children.append(np.stack([left, right], axis=1).astype(np.int32) + offset)
+        values.append(value / normalizer)
+        roots.append(offset)
+
+        offset += n
+        max_depth = max(max_depth, int(tree.max_depth))
+
+    arrays = {
+        'roots': np.asarray(roots, dtype=np.int32),
+        'feature': np.concatenate(features),
+        'threshold': np.concatenate(thresholds),
+        'children': np.concatenate(children),
+        'value': np.concatenate(values),
+        'classes': np.asarray([str(c) for c in class_labels]),
+    }
+    meta = {
+        'format_version': FORMAT_VERSION,
+        'n_trees': len(roots),
+        'n_nodes': int(offset),
+        'n_features': int(model.n_features_in_),
+        'n_classes': len(class_labels),
+        'max_depth': max_depth,
+    }
+    return arrays, meta
+
+
+def export_forest(model, class_labels, path: str) -> dict:
+    """
+    Write a fitted RandomForestClassifier to `path` in the compiled format.
+
+    Args:
+        model: fitted sklearn RandomForestClassifier (single output)
+        class_labels: decoded label for each column of model.predict_proba
+        path: output directory (created if missing)
+
+    Returns:
+        the meta dict written to meta.json
+    """
+    os.makedirs(path, exist_ok=True)
+    arrays, meta = compile_forest(model, class_labels)
+
+    # Each file is written aside and renamed into place, so a server that has the
+    # previous version memory-mapped keeps reading its (now unlinked) old inode.
+    for name, arr in arrays.items():
+        target = os.path.join(path, f'{name}.npy')
+        with open(target + '.tmp', 'wb') as f:
+            np.save(f, arr, allow_pickle=False)
+        os.replace(target + '.tmp', target)
+
+    target = os.path.join(path, 'meta.json')
+    with open(target + '.tmp', 'w') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(target + '.tmp', target)
+    return meta
+
+
+class CompiledForest:
+    """
+    Pure-NumPy evaluator for the compiled format.
+
+    `predict_proba` matches RandomForestClassifier.predict_proba: per-tree leaf
+    distributions are accumulated in tree order and divided by the tree count.
+    """
+
+    def __init__(self, arrays: dict, meta: dict):
+        self.meta = meta
+        self.roots = arrays['roots']
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.children = arrays['children']
+        self.value = arrays['value']
+        self.classes_ = arrays['classes']
+        self.n_trees = int(meta['n_trees'])
+        self.n_features_in_ = int(meta['n_features'])
+        self.max_depth = int(meta['max_depth'])
+        self._steps = None   # per-node attribution arrays, built on the first `contributions` call
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> 'CompiledForest':
+        """Load a compiled forest; with `mmap` the node arrays are memory-mapped read-only."""
+        with open(os.path.join(path, 'meta.json'), 'r') as f:
+            meta = json.load(f)
+        if meta.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f'Unsupported compiled forest format: {meta.get("format_version")}')
+
+        mode = 'r' if mmap else None
+        arrays = {
+            name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode=None if name == 'classes' else mode)
+            for name in ARRAYS
+        }
+        return cls(arrays, meta)
+
+    @classmethod
+    def from_sklearn(cls, model, class_labels) -> 'CompiledForest':
+        """Compile a fitted RandomForestClassifier in memory, without writing it out."""
+        return cls(*compile_forest(model, class_labels))
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        return os.path.exists(os.path.join(path, 'meta.json'))
+
+    def apply(self, X: np.ndarray) -> np.ndarray:
+        """Return the (n_samples × n_trees) leaf index reached by each sample in each tree."""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n, n_features = X.shape
+        flat_x = X.ravel()
+        children = self.children.ravel()
+
+        # One entry per (sample, tree) pair, sample-major
+        leaves = np.tile(self.roots, n)
+        pending = np.arange(leaves.size)
+        node = leaves
+        x_offset = np.repeat(np.arange(n) * n_features, self.n_trees)
+
+        for _ in range(self.max_depth):
+            go_right = flat_x.take(x_offset + self.feature.take(node)) > self.threshold.take(node)
+            node = children.take(2 * node + go_right)
+            leaves[pending] = node
+
+            # Drop pairs that reached a leaf so deeper levels only touch live paths
+            live = children.take(2 * node) != node
+            if not live.all():
+                pending, node, x_offset = pending[live], node[live], x_offset[live]
+                if pending.size == 0:
+                    break
+
+        return leaves.reshape(n, self.n_trees)
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f'Expected X with {self.n_features_in_} features, got shape {X.shape}')
+
+        out = np.empty((X.shape[0], self.value.shape[1]), dtype=np.float64)
+        for start in range(0, X.shape[0], CHUNK_ROWS):
+            leaves = self.apply(X[start:start + CHUNK_ROWS])
+            # Reducing over the (non-contiguous) tree axis adds trees in order, like sklearn
+            out[start:start + CHUNK_ROWS] = self.value[leaves].sum(axis=1) / self.n_trees
+        return out
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.classes_.take(self.predict_proba(X).argmax(axis=1))
+
+    def _step_arrays(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        (gain, split) per node: how much entering the node moves the class
+        distribution, `value[node] - value[parent]`, and the parent's split
+        feature that the move is credited to. Roots gain nothing.
+        """
+        if self._steps is None:
+            n_nodes = self.value.shape[0]
+            parent = np.arange(n_nodes)
+            internal = np.flatnonzero(self.children[:, 0] != parent)
+            parent[self.children[internal, 0]] = internal
+            parent[self.children[internal, 1]] = internal
+            gain = self.value - self.value[parent]
+            self._steps = (gain, np.asarray(self.feature)[parent])
+        return self._steps
+
+    def contributions(self, X: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Exact per-feature decomposition of `predict_proba` (path attribution).
+
+        Every split on a sample's path moves the class distribution from the
+        parent's to the child's; that move is credited to the split feature.
+        Summed over the path it telescopes to leaf − root, so
+
+            bias + contributions.sum(axis=1) == predict_proba(X)
+
+        up to floating-point rounding.
+
+        Returns:
+            bias: (n_classes,) mean root distribution — the prediction before any split
+            contributions: (n_samples × n_features × n_classes) float64
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f'Expected X with {self.n_features_in_} features, got shape {X.shape}')
+
+        gain, split = self._step_arrays()
+        n_features, n_classes = self.n_features_in_, self.value.shape[1]
+        class_ids = np.arange(n_classes)
+        children = self.children.ravel()
+
+        out = np.zeros((X.shape[0], n_features * n_classes), dtype=np.float64)
+        for start in range(0, X.shape[0], CHUNK_ROWS):
+            chunk = X[start:start + CHUNK_ROWS]
+            n = chunk.shape[0]
+            flat_x = chunk.ravel()
+            size = n * n_features * n_classes
+
+            # Same walk as `apply`, sample-major (sample, tree) pairs
+            node = np.tile(self.roots, n)
+            row = np.repeat(np.arange(n), self.n_trees)
+            acc = np.zeros(size, dtype=np.float64)
+            for _ in range(self.max_depth):
+                go_right = flat_x.take(row * n_features + self.feature.take(node)) > self.threshold.take(node)
+                node = children.take(2 * node + go_right)
+
+                # Credit each pair's step to (row, split feature, class) in one scatter-add
+                cell = (row * n_features + split.take(node))[:, None] * n_classes + class_ids
+                acc += np.bincount(cell.ravel(), weights=gain[node].ravel(), minlength=size)
+
+                live = children.take(2 * node) != node
+                if not live.all():
+                    node, row = node[live], row[live]
+                    if node.size == 0:
+                        break
+            out[start:start + n] = acc.reshape(n, -1)
+
+        bias = self.value[self.roots].sum(axis=0) / self.n_trees
+        return bias, (out / self.n_trees).reshape(X.shape[0], n_features, n_classes)
+
+
+# ─────────────────────────────── CLI EXPORT ───────────────────────────────
+if __name__ == '__main__':
+    import joblib
+
+    MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+
+    print("\n🌲 Compiling forests...\n")
+    for name in ('risk', 'dept'):
+        model_path = os.path.join(MODEL_DIR, f'{name}_classifier.joblib')
+        if not os.path.exists(model_path):
+            print(f"   ⚠ {name}_classifier.joblib not found — skipped")
+            continue
+        model = joblib.load(model_path)
+        le = joblib.load(os.path.join(MODEL_DIR, f'{name}_label_encoder.joblib'))
+        meta = export_forest(model, le.classes_[model.classes_], os.path.join(MODEL_DIR, f'{name}_forest'))
+        print(f"   ✓ {name}_forest/ — {meta['n_trees']} trees, {meta['n_nodes']} nodes, depth {meta['max_depth']}")
@@ -0,0 +1,246 @@
+"""
+TriageAI — Patient History Store
+==================================
+Append-only record of every classification the service makes, in an embedded
+SQLite database (ML_HISTORY_DB, default ml/history.db; WAL mode, so every
+worker process can write while others read).
+
+  classifications   one row per classified patient: inputs, predictions,
+                    model version; indexed on (patient_id, id)
+  patients          per-patient running totals (count, first/last seen,
+                    latest risk)
+  aggregates        running counts and confidence sums by risk level and
+                    by department, and the number of distinct patients
+
+SQLite triggers update `patients` and `aggregates` in the same transaction
+as each insert, so the stats never need a table scan:
+
+  trend(patient_id)   the patient's latest N classifications via the index — O(log n + N)
+  stats()             totals by risk level and department — O(number of classes)
+
+Rows are never updated or deleted. A failed write is counted
+(ml_history_rows_total{result="failed"}) and never fails the classification.
+Recording is opt-in (ML_HISTORY=1): the serving entry points, server.py and
+predict.py, turn it on unless ML_HISTORY=0; importing inference anywhere else
+(its self-test, rescore, benchmarks, notebooks) records nothing.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+
+from metrics import history_rows_total
+
+ENABLED = os.environ.get('ML_HISTORY', '0') == '1'
+DB_PATH = os.environ.get('ML_HISTORY_DB') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'history.db')
+TREND_LIMIT = 20
+MAX_TREND_LIMIT = 500
+
+# Same scale and window as analyzeTrend() in src/lib/triage-engine.ts
+RISK_SCORES = {'Low': 1, 'Medium': 2, 'High': 3}
+RECENT_RECORDS = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS classifications (
+    id                      INTEGER PRIMARY KEY,
+    patient_id              TEXT,
+    created_at              REAL NOT NULL,
+    age                     REAL,
+    gender                  TEXT,
+    symptoms                TEXT,           -- JSON array
+    pre_existing_conditions TEXT,           -- JSON array
+    blood_pressure_systolic REAL,
+    heart_rate              REAL,
+    temperature_f           REAL,
+    risk_level              TEXT NOT NULL,
+    risk_confidence         REAL,
+    department              TEXT,
+    department_confidence   REAL,
+    model_version           TEXT
+);
+CREATE INDEX IF NOT EXISTS classifications_patient ON classifications (patient_id, id);
+
+CREATE TABLE IF NOT EXISTS patients (
+    patient_id  TEXT PRIMARY KEY,
+    count       INTEGER NOT NULL,
+    first_at    REAL NOT NULL,
+    last_at     REAL NOT NULL,
+    last_risk   TEXT
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS aggregates (
+    kind            TEXT NOT NULL,          -- 'risk' | 'dept' | 'patients'
+    key             TEXT NOT NULL,
+    count           INTEGER NOT NULL,
+    confidence_sum  REAL NOT NULL,
+    PRIMARY KEY (kind, key)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS classifications_totals AFTER INSERT ON classifications BEGIN
+    INSERT INTO aggregates VALUES ('risk', NEW.risk_level, 1, COALESCE(NEW.risk_confidence, 0))
+        ON CONFLICT (kind, key) DO UPDATE
+        SET count = count + 1, confidence_sum = confidence_sum + excluded.confidence_sum;
+    INSERT INTO aggregates SELECT 'dept', NEW.department, 1, COALESCE(NEW.department_confidence, 0)
+        WHERE NEW.department IS NOT NULL
+        ON CONFLICT (kind, key) DO UPDATE
+        SET count = count + 1, confidence_sum = confidence_sum + excluded.confidence_sum;
+    INSERT INTO patients SELECT NEW.patient_id, 1, NEW.created_at, NEW.created_at, NEW.risk_level
+        WHERE NEW.patient_id IS NOT NULL
+        ON CONFLICT (patient_id) DO UPDATE
+        SET count = count + 1, last_at = excluded.last_at, last_risk = excluded.last_risk;
+END;
+
+CREATE TRIGGER IF NOT EXISTS patients_total AFTER INSERT ON patients BEGIN
+    INSERT INTO aggregates VALUES ('patients', 'all', 1, 0)
+        ON CONFLICT (kind, key) DO UPDATE SET count = count + 1;
+END;
+"""
+
+INSERT = """
+INSERT INTO classifications (
+    patient_id, created_at, age, gender, symptoms, pre_existing_conditions,
+    blood_pressure_systolic, heart_rate, temperature_f,
+    risk_level, risk_confidence, department, department_confidence, model_version
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+class HistoryStore:
+    """One SQLite connection per thread (and per process after a fork) onto the shared database file."""
+
+    def __init__(self, path: str = DB_PATH):
+        self.path = path
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')   # durable across crashes of the process, not of the OS
+            conn.executescript(SCHEMA)
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    # ── writing ──
+    def record(self, records: list[dict], results: list[dict]) -> None:
+        """Append one row per classified record (records without a patient_id count in the totals only)."""
+        now = time.time()
+        rows = [
+            (
+                _patient_id(r.get('patient_id')), now, r.get('age'), r.get('gender'),
+                json.dumps(r.get('symptoms', [])), json.dumps(r.get('pre_existing_conditions', [])),
+                r.get('blood_pressure_systolic'), r.get('heart_rate'), r.get('temperature_f'),
+                res['risk_level'], res.get('risk_confidence'),
+                res.get('department'), res.get('department_confidence'), res.get('model_version'),
+            )
+            for r, res in zip(records, results)
+        ]
+        try:
+            conn = self._conn()
+            with conn:
+                conn.executemany(INSERT, rows)
+        except (sqlite3.Error, OSError, TypeError, ValueError):
+            history_rows_total.inc(len(rows), result='failed')
+            return
+        history_rows_total.inc(len(rows), result='written')
+
+    # ── reading ──
+    def trend(self, patient_id: str, limit: int = TREND_LIMIT) -> dict | None:
+        """
+        The patient's latest `limit` classifications (oldest first) and their risk
+        trend, or None for an unknown patient. Records use the shape of
+        HistoricalRecord in src/lib/types.ts (vitals.bp is the systolic reading),
+        so they can be passed on as a triage request's `trend_data`.
+        """
+        conn = self._conn()
+        summary = conn.execute(
+            'SELECT count, first_at, last_at, last_risk FROM patients WHERE patient_id = ?', (patient_id,),
+        ).fetchone()
+        if summary is None:
+            return None
+        rows = conn.execute(
+            'SELECT created_at, risk_level, risk_confidence, department, department_confidence, '
+            'blood_pressure_systolic, heart_rate, temperature_f, symptoms, model_version '
+            'FROM classifications WHERE patient_id = ? ORDER BY id DESC LIMIT ?',
+            (patient_id, max(1, min(int(limit), MAX_TREND_LIMIT))),
+        ).fetchall()
+        records = [
+            {
+                'date': _iso(created_at),
+                'risk_level': risk_level,
+                'risk_probability': risk_confidence,
+                'department': department,
+                'department_confidence': department_confidence,
+                'vitals': {'bp': _number_str(bp), 'hr': hr, 'temp': temp},
+                'symptoms': json.loads(symptoms or '[]'),
+                'model_version': model_version,
+            }
+            for created_at, risk_level, risk_confidence, department, department_confidence,
+                bp, hr, temp, symptoms, model_version in reversed(rows)
+        ]
+        count, first_at, last_at, last_risk = summary
+        return {
+            'patient_id': patient_id,
+            'count': count,
+            'first_seen': _iso(first_at),
+            'last_seen': _iso(last_at),
+            'latest_risk': last_risk,
+            'trend': risk_trend([r['risk_level'] for r in records]),
+            'records': records,
+        }
+
+    def stats(self) -> dict:
+        """Running totals by risk level and department, read from the aggregate tables."""
+        conn = self._conn()
+        groups = {'risk': {}, 'dept': {}, 'patients': {}}
+        for kind, key, count, confidence_sum in conn.execute('SELECT kind, key, count, confidence_sum FROM aggregates'):
+            groups[kind][key] = {'count': count, 'mean_confidence': confidence_sum / count if count else None}
+        total = sum(g['count'] for g in groups['risk'].values())
+        confidence = sum(g['mean_confidence'] * g['count'] for g in groups['risk'].values())
+        return {
+            'total': total,
+            'patients': groups['patients'].get('all', {}).get('count', 0),
+            'risk': groups['risk'],
+            'departments': groups['dept'],
+            'mean_risk_confidence': confidence / total if total else None,
+        }
+
+
+def risk_trend(levels: list[str]) -> dict:
+    """
+    analyzeTrend()'s rule: the mean risk score (Low 1 … High 3) of the last
+    three classifications vs. the ones before; a move of more than half a
+    point is worsening / improving.
+    """
+    scores = [RISK_SCORES.get(level, 1) for level in levels]
+    if len(scores) < 2:
+        return {'direction': 'insufficient_data', 'recent_score': scores[-1] if scores else None, 'earlier_score': None}
+    recent = scores[-RECENT_RECORDS:]
+    older = scores[:-RECENT_RECORDS] or recent
+    recent_avg, older_avg = sum(recent) / len(recent), sum(older) / len(older)
+    if recent_avg > older_avg + 0.5:
+        direction = 'worsening'
+    elif recent_avg < older_avg - 0.5:
+        direction = 'improving'
+    else:
+        direction = 'stable'
+    return {'direction': direction, 'recent_score': recent_avg, 'earlier_score': older_avg}
+
+
+def _patient_id(value) -> str | None:
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _iso(ts: float) -> str:
+    return time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(ts)) + 'Z'
+
+
+def _number_str(value) -> str | None:
+    return None if value is None else f'{value:g}'
@@ -3,26 +3,462 @@ TriageAI — ML Inference Module
 ================================
 Loads the trained models and provides a `classify()` function
 that takes raw patient data and returns risk_level + department.
+
+Models are resolved through the artifact manifest (see registry.py) and
+loaded on first use: the compiled forest format (forest.py) when
+`<name>_forest/` exists — that path needs only NumPy — otherwise the pickled
+sklearn forest via joblib. A missing department model degrades responses to
+risk-only instead of failing the import.
+
+The import path stays lean for cold starts: NumPy and the standard library
+only, with joblib/sklearn imported on first use of a pickled model
+(bench/startup.py enforces the budget).
+
+`reload_models()` swaps in a newly trained version without a restart; every
+result names the version that produced it in `model_version`.
+
+Most patients are clearly Low risk, so each task first asks a small distilled
+forest (`<name>_fast_forest/`) and only escalates rows below its calibrated
+confidence threshold — or, for risk, with any real chance of High — to the
+full forest. `served_by` records which one answered; ML_FAST_PATH=0 disables it.
+
+`classify(..., explain=True)` adds an exact per-feature breakdown of each
+predicted probability (path contributions, see CompiledForest.contributions)
+from whichever model answered the row.
+
+Every scored batch also feeds the version's DriftMonitor (drift.py), which
+compares live inputs and predictions with the training profile, and, when
+ML_HISTORY=1 (the serving entry points' default), every classification is
+appended to the patient history store (history.py).
 """
 
+import gc
 import os
 import json
+import time
+import threading
 import numpy as np
-import pandas as pd
-import joblib
+
+from features import FeatureEncoder
+from registry import ModelRegistry, MODEL_NAMES, FAST_MODEL_NAMES
+from cache import PredictionCache
+from drift import DriftMonitor, ENABLED as DRIFT_ENABLED, prune_versions
+from history import HistoryStore, ENABLED as HISTORY_ENABLED
+from metrics import inference_stage_seconds, inference_rows_total, unknown_terms_total, fast_path_rows_total
 
 # ─────────────────────────────── LOAD MODELS ───────────────────────────────
 MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
 
-risk_model = joblib.load(os.path.join(MODEL_DIR, 'risk_classifier.joblib'))
-dept_model = joblib.load(os.path.join(MODEL_DIR, 'dept_classifier.joblib'))
-risk_le = joblib.load(os.path.join(MODEL_DIR, 'risk_label_encoder.joblib'))
-dept_le = joblib.load(os.path.join(MODEL_DIR, 'dept_label_encoder.joblib'))
-symptom_mlb = joblib.load(os.path.join(MODEL_DIR, 'symptom_binarizer.joblib'))
-condition_mlb = joblib.load(os.path.join(MODEL_DIR, 'condition_binarizer.joblib'))
+# Answer confident rows from the distilled fast-path models (ML_FAST_PATH=0 always uses the full forests)
+FAST_PATH = os.environ.get('ML_FAST_PATH', '1') == '1'
+
+# Features listed per task in an explanation; the rest are summed into `other`
+EXPLAIN_TOP = int(os.environ.get('ML_EXPLAIN_TOP', '5'))
+
+
+class ModelValidationError(ValueError):
+    """A candidate model version does not match its feature metadata."""
+
+
+class ReloadInProgress(RuntimeError):
+    """Another reload is already loading a new model version."""
+
+
+class InvalidPatientRecord(ValueError):
+    """A request's patient fields have the wrong type (the caller's error, not the model's)."""
+
+
+class ModelBundle:
+    """
+    One model version: the classifiers, the encoder and the metadata they were
+    trained with. Bundles are never mutated — a reload builds a new one and
+    swaps the active reference, so a request that picked up a bundle finishes
+    on it even if a newer version goes live meanwhile.
+    """
+
+    def __init__(self, model_dir: str = MODEL_DIR):
+        # Classifiers are loaded on first use (or by `registry.preload()`), so
+        # importing this module for the metadata or encoder stays cheap.
+        self.registry = ModelRegistry(model_dir)
+        self.version = self.registry.version
+
+        meta_path = self.registry.file_path('metadata') or os.path.join(model_dir, 'feature_metadata.json')
+        with open(meta_path, 'r') as f:
+            self.feature_meta = json.load(f)
+
+        # Shared train/inference encoder; fall back to rebuilding it from metadata for older artifacts
+        encoder_path = self.registry.file_path('encoder')
+        if encoder_path and os.path.exists(encoder_path):
+            self.encoder = FeatureEncoder.load(encoder_path)
+        else:
+            self.encoder = FeatureEncoder.from_metadata(self.feature_meta)
+
+        # Drift sketches need the training profile; versions trained before it existed go unmonitored
+        profile_path = self.registry.file_path('drift_profile')
+        self.drift = None
+        if DRIFT_ENABLED and profile_path and os.path.exists(profile_path):
+            with open(profile_path, 'r') as f:
+                self.drift = DriftMonitor(json.load(f), self.encoder, self.version)
+
+    def validate(self) -> None:
+        """Check every loaded model and the encoder against feature_metadata.json."""
+        try:
+            self.registry.verify_files()
+        except (OSError, ValueError) as e:
+            raise ModelValidationError(str(e)) from e
+
+        columns = self.feature_meta['feature_columns']
+        if list(self.encoder.feature_columns) != list(columns):
+            raise ModelValidationError('feature encoder columns do not match feature_metadata.json')
+
+        expected_classes = {'risk': self.feature_meta['risk_classes'], 'dept': self.feature_meta['dept_classes']}
+        for name in MODEL_NAMES + FAST_MODEL_NAMES:
+            loaded = self.registry.try_get(name)
+            if loaded is None:
+                continue
+            if name in FAST_MODEL_NAMES:
+                # Fast-path probabilities stand in for the full forest's, column for column
+                full = self.registry.try_get(name.removesuffix('_fast'))
+                if full is not None and loaded.labels != full.labels:
+                    raise ModelValidationError(f'{name} model classes are not in the same order as the full model')
+            if loaded.model.n_features_in_ != len(columns):
+                raise ModelValidationError(
+                    f'{name} model expects {loaded.model.n_features_in_} features, metadata has {len(columns)}'
+                )
+            if sorted(loaded.labels) != sorted(str(c) for c in expected_classes[name.removesuffix('_fast')]):
+                raise ModelValidationError(f'{name} model classes do not match feature_metadata.json')
+
+    def warm(self) -> None:
+        """Score one synthetic patient so first-request costs (page faults, lazy imports) are paid now."""
+        record = {
+            'age': 45, 'gender': self.encoder.gender_classes[0], 'symptoms': [],
+            'blood_pressure_systolic': 120, 'heart_rate': 80, 'temperature_f': 98.6,
+            'pre_existing_conditions': [],
+        }
+        predict_matrix(self.encoder.transform([record]), self)
+
+
+_active = ModelBundle()
+_reload_lock = threading.Lock()
+
+
+def current_models() -> ModelBundle:
+    """The model version new requests are served with."""
+    return _active
+
+
+def reload_models(model_dir: str = MODEL_DIR) -> dict:
+    """
+    Load the artifacts currently in `model_dir` as a new version and make it live.
+
+    The new bundle is loaded (models in parallel), validated and warmed while the
+    old one keeps serving; then the active reference is swapped in one assignment.
+    A version with fewer ready models than the live one is refused, as is any
+    version that fails validation — the old version stays live in both cases.
+
+    Raises:
+        ReloadInProgress, ModelValidationError, ModelUnavailable
+    """
+    global _active
+    if not _reload_lock.acquire(blocking=False):
+        raise ReloadInProgress('A model reload is already in progress')
+    try:
+        started = time.perf_counter()
+        bundle = ModelBundle(model_dir)
+        bundle.registry.preload()
+        bundle.validate()
+        bundle.warm()
+
+        previous = _active
+        if _ready_count(bundle) < _ready_count(previous):
+            raise ModelValidationError(
+                f'new version has {_ready_count(bundle)} ready models, live version has {_ready_count(previous)}'
+            )
+
+        _active = bundle
+        previous_version = previous.version
+    finally:
+        _reload_lock.release()
+
+    # The old bundle goes away once in-flight requests drop their reference;
+    # entries cached under the old version can no longer be hit.
+    del previous
+    prediction_cache.clear()
+    if DRIFT_ENABLED:
+        # Sketches of versions no longer served only fill /dev/shm
+        prune_versions(bundle.version)
+    release_memory()
+    return {
+        'version': bundle.version,
+        'previous_version': previous_version,
+        'seconds': time.perf_counter() - started,
+        'models': bundle.registry.status()['models'],
+    }
+
+
+def _ready_count(bundle: ModelBundle) -> int:
+    """Ready full models; the optional fast-path models do not count."""
+    models = bundle.registry.status()['models']
+    return sum(models[name]['state'] == 'ready' for name in MODEL_NAMES if name in models)
+
+
+def release_memory() -> None:
+    """Collect unreachable model objects and hand freed heap pages back to the OS."""
+    gc.collect()
+    try:
+        import ctypes
+        ctypes.CDLL('libc.so.6').malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+# Results keyed on model version + encoded feature row; emptied when anything in MODEL_DIR changes
+prediction_cache = PredictionCache(model_dir=MODEL_DIR)
+
+# Append-only log of every classification, by patient_id (opt-in: ML_HISTORY=1)
+history = HistoryStore() if HISTORY_ENABLED else None
+
+
+def build_feature_matrix(records: list[dict], bundle: ModelBundle | None = None,
+                         unknown: list | None = None) -> np.ndarray:
+    """
+    Build the (n_records × n_features) float32 matrix for a batch of patients.
+
+    Each record uses the same keys as `classify()`'s arguments. Column order
+    matches `feature_meta['feature_columns']`. Terms are matched through the
+    encoder's vocabulary index (aliases, case and spacing folded); pass a list
+    as `unknown` to collect the unrecognized ones per record.
+    """
+    return (bundle or _active).encoder.transform(records, unknown=unknown)
+
+
+def predict_matrix(X: np.ndarray, bundle: ModelBundle | None = None, explain: bool = False) -> list[dict]:
+    """
+    Run both models on an encoded feature matrix and decode one result dict per row.
+
+    The risk model is required (raises ModelUnavailable). If the department model
+    is missing or failed to load, rows are still scored for risk: `department` and
+    `department_confidence` are None and 'dept' is listed in `models_unavailable`.
+    `served_by` names the model that answered each task ('fast' or 'full').
+    With `explain`, each result also carries `explanation` (see `_explain`).
+    """
+    bundle = bundle or _active
+    risk = bundle.registry.get('risk')
+    dept = bundle.registry.try_get('dept')
+
+    risk_proba, risk_fast = _predict_proba(bundle, risk, X)
+    if dept is not None:
+        dept_proba, dept_fast = _predict_proba(bundle, dept, X)
+        dept_idx = dept_proba.argmax(axis=1)
+    risk_idx = risk_proba.argmax(axis=1)
+
+    if explain:
+        risk_why = _explain(bundle, risk, X, risk_fast, risk_idx)
+        dept_why = _explain(bundle, dept, X, dept_fast, dept_idx) if dept is not None else None
+
+    t0 = time.perf_counter()
+    unavailable = [] if dept is not None else ['dept']
 
-with open(os.path.join(MODEL_DIR, 'feature_metadata.json'), 'r') as f:
-    feature_meta = json.load(f)
+    results = []
+    for i in range(X.shape[0]):
+        result = {
+            'risk_level': risk.labels[risk_idx[i]],
+            'risk_confidence': float(risk_proba[i, risk_idx[i]]),
+            'risk_probabilities': dict(zip(risk.labels, risk_proba[i].tolist())),
+            'department': None,
+            'department_confidence': None,
+            'department_probabilities': {},
+            'models_unavailable': list(unavailable),
+            'model_version': bundle.version,
+            'served_by': {'risk': 'fast' if risk_fast[i] else 'full'},
+        }
+        if dept is not None:
+            result['department'] = dept.labels[dept_idx[i]]
+            result['department_confidence'] = float(dept_proba[i, dept_idx[i]])
+            result['department_probabilities'] = dict(zip(dept.labels, dept_proba[i].tolist()))
+            result['served_by']['dept'] = 'fast' if dept_fast[i] else 'full'
+        if explain:
+            result['explanation'] = {'risk': risk_why[i]}
+            if dept is not None:
+                result['explanation']['dept'] = dept_why[i]
+        results.append(result)
+    inference_stage_seconds.observe(time.perf_counter() - t0, stage='decode')
+    return results
+
+
+def score_matrix(X: np.ndarray, bundle: ModelBundle | None = None) -> dict[str, tuple]:
+    """
+    Columnar scoring for bulk jobs: {task: (labels, probabilities, fast-served mask)}
+    for 'risk' and, when it is ready, 'dept'. Same models and fast-path rules as
+    `predict_matrix`, without building a dict per row.
+    """
+    bundle = bundle or _active
+    models = {'risk': bundle.registry.get('risk'), 'dept': bundle.registry.try_get('dept')}
+    return {
+        name: (loaded.labels, *_predict_proba(bundle, loaded, X))
+        for name, loaded in models.items() if loaded is not None
+    }
+
+
+def _predict_proba(bundle: ModelBundle, full, X: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Class probabilities for every row, and a mask of the rows the fast model answered.
+
+    With a fast-path model and its calibrated threshold (feature_metadata.json
+    `fast_path`), rows where it is confident — and, for a guarded class such as
+    High risk, not even slightly suspicious — keep its probabilities; only the
+    rest walk the full forest.
+    """
+    name = full.name
+    fast, config = _fast_model(bundle, name)
+    if fast is None:
+        with inference_stage_seconds.time(stage=f'{name}_forest'):
+            proba = full.model.predict_proba(X)
+        return proba, np.zeros(X.shape[0], dtype=bool)
+
+    with inference_stage_seconds.time(stage=f'{name}_fast'):
+        proba = fast.model.predict_proba(X)
+    served = proba.max(axis=1) >= config['threshold']
+    guard = config.get('guard')
+    if guard:
+        served &= proba[:, fast.labels.index(guard['class'])] < guard['min_proba']
+
+    escalate = np.flatnonzero(~served)
+    if len(escalate):
+        with inference_stage_seconds.time(stage=f'{name}_forest'):
+            proba[escalate] = full.model.predict_proba(X[escalate])
+    fast_path_rows_total.inc(len(served) - len(escalate), model=name, path='fast')
+    fast_path_rows_total.inc(len(escalate), model=name, path='escalated')
+    return proba, served
+
+
+def _fast_model(bundle: ModelBundle, name: str) -> tuple:
+    """The fast-path model for task `name` and its calibration, or (None, None) if it is off."""
+    config = bundle.feature_meta.get('fast_path', {}).get(name)
+    if not (FAST_PATH and config and config['threshold'] <= 1):
+        return None, None
+    fast = bundle.registry.try_get(f'{name}_fast')
+    return (fast, config) if fast is not None else (None, None)
+
+
+def _explain(bundle: ModelBundle, full, X: np.ndarray, served: np.ndarray, predicted: np.ndarray) -> list[dict]:
+    """
+    Per-row breakdown of the predicted class's probability for one task.
+
+    Each row is explained by the model that answered it (`served` marks the
+    fast-path rows), so `base + sum(features) + other` equals the returned
+    probability exactly, up to float rounding:
+
+        {'class': 'High', 'base': 0.31,
+         'features': [{'feature': 'heart_rate', 'value': 128.0, 'contribution': 0.22}, ...],
+         'other': 0.004}
+
+    `base` is the model's average prediction before any split; `features` are
+    the EXPLAIN_TOP largest contributions by magnitude and `other` the sum of the rest.
+    """
+    name = full.name
+    n_rows = X.shape[0]
+    bias = np.empty((n_rows, len(full.labels)))
+    contrib = np.empty((n_rows, X.shape[1], len(full.labels)))
+    fast = _fast_model(bundle, name)[0] if served.any() else None
+    with inference_stage_seconds.time(stage=f'{name}_explain'):
+        for loaded, rows in ((fast, np.flatnonzero(served)), (full, np.flatnonzero(~served))):
+            if len(rows):
+                bias[rows], contrib[rows] = loaded.compiled().contributions(X[rows])
+
+    rows = np.arange(n_rows)
+    picked = contrib[rows, :, predicted]
+    top = np.argsort(-np.abs(picked), axis=1, kind='stable')[:, :EXPLAIN_TOP]
+    columns = bundle.encoder.feature_columns
+
+    explanations = []
+    for i in rows:
+        features = [
+            {'feature': columns[j], 'value': round(float(X[i, j]), 4), 'contribution': float(picked[i, j])}
+            for j in top[i] if picked[i, j] != 0.0
+        ]
+        explanations.append({
+            'class': full.labels[predicted[i]],
+            'base': float(bias[i, predicted[i]]),
+            'features': features,
+            'other': float(picked[i].sum() - picked[i, top[i]].sum()),
+        })
+    return explanations
+
+
+def classify_batch(records: list[dict], use_cache: bool = True, explain: bool = False) -> list[dict]:
+    """
+    Classify many patients at once.
+
+    Builds the whole feature matrix in one pass and runs a single `predict_proba`
+    per model; the predicted class is the argmax of the probabilities (exactly what
+    RandomForestClassifier.predict does internally), so each forest is walked once.
+    Rows already in the prediction cache skip the forests entirely. The whole
+    batch is served by one model version, named in each result's `model_version`.
+
+    Args:
+        records: list of dicts with the same keys as `classify()`'s arguments
+        use_cache: look up / store results in `prediction_cache`
+        explain: add per-feature `explanation`s (cached separately from plain results)
+
+    Returns:
+        list of dicts in the same shape as `classify()`'s return value, in input order
+    """
+    if not records:
+        return []
+
+    bundle = _active
+    unknown = []
+    with inference_stage_seconds.time(stage='encode'):
+        X = build_feature_matrix(records, bundle, unknown)
+
+    if not (use_cache and prediction_cache.enabled):
+        inference_rows_total.inc(len(records), source='model')
+        return _observed(bundle, records, X, unknown, predict_matrix(X, bundle, explain))
+
+    with inference_stage_seconds.time(stage='cache_lookup'):
+        prefix = str(bundle.version).encode() + (b'/explain' if explain else b'')
+        keys = [prefix + row.tobytes() for row in X]
+        results = [prediction_cache.get(k) for k in keys]
+        missing = [i for i, r in enumerate(results) if r is None]
+
+    inference_rows_total.inc(len(records) - len(missing), source='cache')
+    inference_rows_total.inc(len(missing), source='model')
+
+    if missing:
+        for i, result in zip(missing, predict_matrix(X[missing], bundle, explain)):
+            # Degraded results are not cached so full answers resume once every model is ready
+            if not result['models_unavailable']:
+                prediction_cache.put(keys[i], result)
+            results[i] = result
+    return _observed(bundle, records, X, unknown, results)
+
+
+def _observed(bundle: ModelBundle, records: list[dict], X: np.ndarray, unknown: list[dict],
+              results: list[dict]) -> list[dict]:
+    """
+    Feed the batch to the drift monitor and the history store (cache hits
+    included — they are live traffic too).
+    """
+    if bundle.drift is not None:
+        with inference_stage_seconds.time(stage='drift'):
+            bundle.drift.observe(X, unknown, results)
+    if history is not None:
+        with inference_stage_seconds.time(stage='history'):
+            history.record(records, results)
+    return _with_unknown(results, unknown)
+
+
+def _with_unknown(results: list[dict], unknown: list[dict]) -> list[dict]:
+    """
+    Attach each record's unrecognized terms. Results may be shared cache
+    entries (the key is the feature row, which ignores the dropped terms), so
+    each gets a shallow copy rather than being modified.
+    """
+    for terms in unknown:
+        for kind, missed in terms.items():
+            unknown_terms_total.inc(len(missed), kind=kind)
+    return [{**result, 'unknown_terms': terms} for result, terms in zip(results, unknown)]
 
 
 def classify(
@@ -33,6 +469,8 @@ def classify(
     heart_rate: int,
     temperature_f: float,
     pre_existing_conditions: list[str],
+    explain: bool = False,
+    patient_id: str | None = None,
 ) -> dict:
     """
     Classify a patient's risk level and recommended department.
@@ -45,98 +483,97 @@ def classify(
         heart_rate: Heart rate (bpm)
         temperature_f: Temperature in Fahrenheit
         pre_existing_conditions: List, e.g. ['Diabetes', 'Heart Disease']
+        explain: also return `explanation` — per task, the base probability and the
+            features that moved the predicted class's probability most (see `_explain`)
+        patient_id: files the classification under this patient in the history store
 
     Returns:
-        dict with keys: risk_level, risk_probabilities, department, department_probabilities
-    """
-
-    # ── Build feature vector ──
-
-    # Numeric
-    if age <= 12:
-        age_group = 0
-    elif age <= 30:
-        age_group = 1
-    elif age <= 50:
-        age_group = 2
-    elif age <= 70:
-        age_group = 3
-    else:
-        age_group = 4
-
-    if blood_pressure_systolic <= 90:
-        bp_category = 0
-    elif blood_pressure_systolic <= 120:
-        bp_category = 1
-    elif blood_pressure_systolic <= 140:
-        bp_category = 2
-    else:
-        bp_category = 3
-
-    if heart_rate <= 60:
-        hr_category = 0
-    elif heart_rate <= 80:
-        hr_category = 1
-    elif heart_rate <= 100:
-        hr_category = 2
-    else:
-        hr_category = 3
-
-    has_fever = 1 if temperature_f > 100.4 else 0
-    symptom_count = len(symptoms)
-    condition_count = len([c for c in pre_existing_conditions if c.lower() != 'none'])
-
-    numeric_vals = [
-        age, blood_pressure_systolic, heart_rate, temperature_f,
-        age_group, bp_category, hr_category, has_fever,
-        symptom_count, condition_count
-    ]
-
-    # Gender one-hot
-    gender_vals = [
-        1 if gender == 'Female' else 0,
-        1 if gender == 'Male' else 0,
-        1 if gender == 'Other' else 0,
-    ]
-
-    # Symptoms multi-label
-    symptom_vector = symptom_mlb.transform([symptoms])[0].tolist()
-
-    # Conditions multi-label
-    clean_conditions = [c for c in pre_existing_conditions if c.lower() != 'none']
-    condition_vector = condition_mlb.transform([clean_conditions])[0].tolist()
-
-    # Combine
-    feature_vector = numeric_vals + gender_vals + symptom_vector + condition_vector
-    X = np.array([feature_vector])
-
-    # ── Predict ──
-    risk_pred = risk_model.predict(X)[0]
-    risk_proba = risk_model.predict_proba(X)[0]
-
-    dept_pred = dept_model.predict(X)[0]
-    dept_proba = dept_model.predict_proba(X)[0]
-
-    risk_label = risk_le.inverse_transform([risk_pred])[0]
-    dept_label = dept_le.inverse_transform([dept_pred])[0]
-
-    risk_probs = {label: float(prob) for label, prob in zip(risk_le.classes_, risk_proba)}
-    dept_probs = {label: float(prob) for label, prob in zip(dept_le.classes_, dept_proba)}
+        dict with keys: risk_level, risk_probabilities, department, department_probabilities,
+        models_unavailable, model_version, served_by ({'risk': 'fast'|'full', ...}), unknown_terms ({'symptoms': [...], 'conditions': [...],
+        'gender': [...]} for terms the models do not know; {} when all were recognized)
+    """
+    return classify_batch([{
+        'age': age,
+        'gender': gender,
+        'symptoms': symptoms,
+        'blood_pressure_systolic': blood_pressure_systolic,
+        'heart_rate': heart_rate,
+        'temperature_f': temperature_f,
+        'pre_existing_conditions': pre_existing_conditions,
+        'patient_id': patient_id,
+    }], explain=explain)[0]
+
+
+def parse_record(data: dict) -> dict:
+    """
+    Validate a raw JSON patient payload into `classify()` keyword arguments.
 
+    Missing (or null) fields take the same defaults as before; numbers may be
+    given as numeric strings, and symptoms / conditions as a list of strings or
+    one comma-separated string. Anything else raises InvalidPatientRecord, so
+    a malformed request is rejected on its own instead of failing inside a
+    batch it shares with valid ones.
+    """
+    if not isinstance(data, dict):
+        raise InvalidPatientRecord(f'patient must be a JSON object, got {type(data).__name__}')
+    gender = _field(data, 'gender', 'Other')
+    if not isinstance(gender, str):
+        raise InvalidPatientRecord(f'gender must be a string, got {type(gender).__name__}')
+    patient_id = data.get('patient_id')
+    if patient_id is not None and (isinstance(patient_id, bool) or not isinstance(patient_id, (str, int))):
+        raise InvalidPatientRecord(f'patient_id must be a string, got {type(patient_id).__name__}')
     return {
-        'risk_level': risk_label,
-        'risk_confidence': float(max(risk_proba)),
-        'risk_probabilities': risk_probs,
-        'department': dept_label,
-        'department_confidence': float(max(dept_proba)),
-        'department_probabilities': dept_probs,
+        'age': int(_number(data, 'age', 0)),
+        'gender': gender,
+        'symptoms': _terms(data, 'symptoms'),
+        'blood_pressure_systolic': int(_number(data, 'blood_pressure_systolic', 120)),
+        'heart_rate': int(_number(data, 'heart_rate', 80)),
+        'temperature_f': _number(data, 'temperature_f', 98.6),
+        'pre_existing_conditions': _terms(data, 'pre_existing_conditions'),
+        'patient_id': None if patient_id is None else str(patient_id),
     }
 
 
+def _field(data: dict, key: str, default):
+    value = data.get(key)
+    return default if value is None else value
+
+
+def _number(data: dict, key: str, default: float) -> float:
+    value = _field(data, key, default)
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise InvalidPatientRecord(f'{key} must be a number, got {type(value).__name__}')
+    try:
+        number = float(value)
+    except ValueError:
+        raise InvalidPatientRecord(f'{key} must be a number, got {value!r}') from None
+    if not np.isfinite(number):
+        raise InvalidPatientRecord(f'{key} must be finite, got {value!r}')
+    return number
+
+
+def _terms(data: dict, key: str) -> list[str]:
+    value = _field(data, key, [])
+    if isinstance(value, str):
+        return [term.strip() for term in value.split(',')]
+    if not isinstance(value, list) or not all(isinstance(term, str) for term in value):
+        raise InvalidPatientRecord(f'{key} must be a list of strings or a comma-separated string')
+    return value
+
+
 # ─────────────────────────────── CLI TEST ───────────────────────────────
+def _pct(value) -> str:
+    return 'n/a' if value is None else f'{value*100:.1f}%'
+
+
 if __name__ == '__main__':
     print("\n🧪 Testing ML Inference...\n")
 
+    current_models().registry.preload()
+    for name, info in current_models().registry.status()['models'].items():
+        print(f"  {name:5s} {info['state']:8s} {info['error'] or ''}")
+    print()
+
     # Test case 1: High-risk cardiac
     result = classify(
         age=65,
@@ -146,11 +583,15 @@ if __name__ == '__main__':
         heart_rate=110,
         temperature_f=99.2,
         pre_existing_conditions=['Heart Disease', 'Diabetes'],
+        explain=True,
     )
     print(f"Test 1 — Cardiac Emergency:")
     print(f"  Risk:       {result['risk_level']} ({result['risk_confidence']*100:.1f}%)")
-    print(f"  Department: {result['department']} ({result['department_confidence']*100:.1f}%)")
+    print(f"  Department: {result['department']} ({_pct(result['department_confidence'])})")
     print(f"  Risk Probs: {result['risk_probabilities']}")
+    why = result['explanation']['risk']
+    print(f"  Why {why['class']}: base {why['base']:.3f}, " +
+          ', '.join(f"{f['feature']} {f['contribution']:+.3f}" for f in why['features']))
     print()
 
     # Test case 2: Low-risk general
@@ -165,14 +606,14 @@ if __name__ == '__main__':
     )
     print(f"Test 2 — General Medicine:")
     print(f"  Risk:       {result2['risk_level']} ({result2['risk_confidence']*100:.1f}%)")
-    print(f"  Department: {result2['department']} ({result2['department_confidence']*100:.1f}%)")
+    print(f"  Department: {result2['department']} ({_pct(result2['department_confidence'])})")
     print()
 
     # Test case 3: Neurology
     result3 = classify(
         age=45,
         gender='Other',
-        symptoms=['Numbness', 'Blurred Vision', 'Dizziness'],
+        symptoms=['numbness/tingling', 'vision changes', 'Dizziness', 'Tremor'],   # frontend spellings
         blood_pressure_systolic=125,
         heart_rate=82,
         temperature_f=98.6,
@@ -180,7 +621,8 @@ if __name__ == '__main__':
     )
     print(f"Test 3 — Neurology:")
     print(f"  Risk:       {result3['risk_level']} ({result3['risk_confidence']*100:.1f}%)")
-    print(f"  Department: {result3['department']} ({result3['department_confidence']*100:.1f}%)")
+    print(f"  Department: {result3['department']} ({_pct(result3['department_confidence'])})")
+    print(f"  Unknown:    {result3['unknown_terms']}")
     print()
 
     # Test case 4: Pulmonology
@@ -195,4 +637,4 @@ if __name__ == '__main__':
     )
     print(f"Test 4 — Pulmonology:")
     print(f"  Risk:       {result4['risk_level']} ({result4['risk_confidence']*100:.1f}%)")
-    print(f"  Department: {result4['department']} ({result4['department_confidence']*100:.1f}%)")
+    print(f"  Department: {result4['department']} ({_pct(result4['department_confidence'])})")
@@ -0,0 +1,213 @@
+"""
+TriageAI — Streaming Dataset Ingestion
+========================================
+Encodes a triage export of any size into an on-disk, memory-mapped training set
+without ever holding the raw table in memory.
+
+  pass 1  stream the file in chunks to collect vocabularies, label classes and
+          the row count (O(vocabulary) memory)
+  pass 2  stream it again, encode each chunk with vectorized string ops
+          (split → explode → dict lookup) straight into a preallocated
+          float32 .npy memmap, and store the targets as uint8 class codes
+
+The output directory holds X.npy, y_<target>.npy and dataset.json; training
+opens the arrays with mmap_mode='r', so resident memory is bounded by the chunk
+size rather than the dataset size. CSV is read with pandas; Parquet needs
+pyarrow, which is imported only when a Parquet file is given.
+
+Usage:
+  python ingest.py <export.csv|export.parquet> <out_dir> [--chunk-rows 50000]
+"""
+
+import os
+import json
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from features import FeatureEncoder, FEVER_THRESHOLD_F
+
+CHUNK_ROWS = 50_000
+
+FEATURE_SOURCE_COLUMNS = [
+    'Age', 'Gender', 'Symptoms', 'Blood_Pressure_Systolic', 'Heart_Rate', 'Temperature_F',
+    'Pre_Existing_Conditions',
+]
+TARGET_COLUMNS = ['Risk_Level', 'Recommended_Department']
+
+
+# ─────────────────────────────── READING ───────────────────────────────
+def iter_chunks(path: str, chunk_rows: int = CHUNK_ROWS, columns: list[str] | None = None):
+    """Yield DataFrames of at most `chunk_rows` rows from a CSV or Parquet file."""
+    columns = columns or FEATURE_SOURCE_COLUMNS + TARGET_COLUMNS
+    if path.endswith(('.parquet', '.pq')):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError('Reading Parquet requires pyarrow (pip install pyarrow)')
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunk_rows)
+
+
+def split_multi(series: pd.Series) -> pd.Series:
+    """
+    Split a comma-separated column into token lists. Blank cells become the
+    literal 'nan' token, as str(NaN) did in the original pipeline.
+    """
+    return series.fillna('nan').astype(str).str.strip().str.split(r'\s*,\s*', regex=True)
+
+
+def _tokens(series: pd.Series) -> pd.Series:
+    """One row per token, indexed by the source row position."""
+    return split_multi(series.reset_index(drop=True)).explode()
+
+
+# ─────────────────────────────── ENCODING ───────────────────────────────
+def encode_frame(encoder: FeatureEncoder, df: pd.DataFrame, out: np.ndarray | None = None) -> np.ndarray:
+    """
+    Vectorized equivalent of `encoder.transform()` for a raw export chunk
+    (CSV column names). Writes into `out` (e.g. a memmap slice) if given.
+    """
+    n = len(df)
+    X = np.zeros((n, encoder.n_features), dtype=np.float32) if out is None else out
+    if out is not None:
+        X.fill(0)
+    col = encoder._col
+
+    age = df['Age'].to_numpy(dtype=np.float64)
+    bp = df['Blood_Pressure_Systolic'].to_numpy(dtype=np.float64)
+    hr = df['Heart_Rate'].to_numpy(dtype=np.float64)
+    temp = df['Temperature_F'].to_numpy(dtype=np.float64)
+    X[:, col['Age']] = age
+    X[:, col['Blood_Pressure_Systolic']] = bp
+    X[:, col['Heart_Rate']] = hr
+    X[:, col['Temperature_F']] = temp
+    X[:, col['age_group']] = np.searchsorted(encoder._age_bins, age, side='left')
+    X[:, col['bp_category']] = np.searchsorted(encoder._bp_bins, bp, side='left')
+    X[:, col['hr_category']] = np.searchsorted(encoder._hr_bins, hr, side='left')
+    X[:, col['has_fever']] = temp > FEVER_THRESHOLD_F
+
+    symptoms = _tokens(df['Symptoms'])
+    conditions = _tokens(df['Pre_Existing_Conditions'])
+    conditions = conditions[conditions.str.lower() != 'none']   # clean_conditions()
+    X[:, col['symptom_count']] = symptoms.groupby(level=0).size().reindex(range(n), fill_value=0).to_numpy()
+    X[:, col['condition_count']] = conditions.groupby(level=0).size().reindex(range(n), fill_value=0).to_numpy()
+
+    for tokens, vocab in (
+        (symptoms, encoder.symptoms),
+        (conditions, encoder.conditions),
+        (df['Gender'].reset_index(drop=True), encoder.genders),
+    ):
+        # Canonical spellings resolve in one vectorized dict map; only the rest go through the alias index
+        cols = tokens.map(vocab.exact)
+        miss = cols.isna().to_numpy() & tokens.notna().to_numpy()
+        if miss.any():
+            cols[miss] = tokens[miss].map(vocab.column).astype(float)
+        hit = cols.notna().to_numpy()
+        X[tokens.index.to_numpy()[hit], cols.to_numpy()[hit].astype(np.intp)] = 1.0
+    return X
+
+
+# ─────────────────────────────── INGESTION ───────────────────────────────
+def scan(path: str, chunk_rows: int = CHUNK_ROWS) -> dict:
+    """Pass 1: row count, token vocabularies and label classes."""
+    n_rows = 0
+    symptoms, conditions, genders = set(), set(), set()
+    targets = {t: set() for t in TARGET_COLUMNS}
+    for chunk in iter_chunks(path, chunk_rows):
+        n_rows += len(chunk)
+        symptoms.update(_tokens(chunk['Symptoms']).dropna())
+        cond = _tokens(chunk['Pre_Existing_Conditions']).dropna()
+        conditions.update(cond[cond.str.lower() != 'none'])
+        genders.update(chunk['Gender'].dropna().astype(str))
+        for t in TARGET_COLUMNS:
+            targets[t].update(chunk[t].dropna().astype(str))
+    return {
+        'n_rows': n_rows,
+        'symptoms': sorted(symptoms),
+        'conditions': sorted(conditions),
+        'genders': sorted(genders),
+        'classes': {t: sorted(v) for t, v in targets.items()},
+    }
+
+
+def ingest(path: str, out_dir: str, chunk_rows: int = CHUNK_ROWS, encoder: FeatureEncoder | None = None) -> dict:
+    """
+    Encode `path` into `out_dir` (X.npy, y_<target>.npy, dataset.json).
+
+    Without `encoder`, one is fitted from the scanned vocabularies. Returns the
+    dataset description that is also written to dataset.json.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    info = scan(path, chunk_rows)
+    if encoder is None:
+        encoder = FeatureEncoder.fit([info['symptoms']], [info['conditions']], info['genders'])
+
+    n = info['n_rows']
+    X = np.lib.format.open_memmap(os.path.join(out_dir, 'X.npy'), mode='w+', dtype=np.float32,
+                                  shape=(n, encoder.n_features))
+    y = {}
+    for t, classes in info['classes'].items():
+        dtype = np.uint8 if len(classes) <= 256 else np.uint16
+        y[t] = np.lib.format.open_memmap(os.path.join(out_dir, f'y_{t}.npy'), mode='w+', dtype=dtype, shape=(n,))
+
+    start = 0
+    for chunk in iter_chunks(path, chunk_rows):
+        stop = start + len(chunk)
+        encode_frame(encoder, chunk, out=X[start:stop])
+        for t, classes in info['classes'].items():
+            codes = pd.Categorical(chunk[t].astype(str), categories=classes).codes
+            if (codes < 0).any():
+                raise ValueError(f'{t} has a missing value in rows {start}..{stop}')
+            y[t][start:stop] = codes
+        start = stop
+    X.flush()
+    for arr in y.values():
+        arr.flush()
+    del X, y
+
+    dataset = {
+        'source': os.path.abspath(path),
+        'n_rows': n,
+        'n_features': encoder.n_features,
+        'classes': info['classes'],
+        'encoder': encoder.to_dict(),
+    }
+    with open(os.path.join(out_dir, 'dataset.json'), 'w') as f:
+        json.dump(dataset, f, indent=2)
+    return dataset
+
+
+def open_dataset(out_dir: str) -> tuple[dict, np.ndarray, dict]:
+    """(description, X memmap, {target: y memmap}) for an ingested directory."""
+    with open(os.path.join(out_dir, 'dataset.json'), 'r') as f:
+        dataset = json.load(f)
+    X = np.load(os.path.join(out_dir, 'X.npy'), mmap_mode='r')
+    y = {t: np.load(os.path.join(out_dir, f'y_{t}.npy'), mmap_mode='r') for t in dataset['classes']}
+    return dataset, X, y
+
+
+def take_rows(X: np.ndarray, idx: np.ndarray, path: str, chunk_rows: int = CHUNK_ROWS) -> np.ndarray:
+    """Gather X[idx] into a new .npy memmap at `path`, `chunk_rows` rows at a time."""
+    out = np.lib.format.open_memmap(path, mode='w+', dtype=X.dtype, shape=(len(idx), X.shape[1]))
+    for start in range(0, len(idx), chunk_rows):
+        out[start:start + chunk_rows] = X[idx[start:start + chunk_rows]]
+    out.flush()
+    return out
+
+
+# ─────────────────────────────── CLI ───────────────────────────────
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Encode a triage export into a memory-mapped training set.')
+    parser.add_argument('path', help='CSV or Parquet export')
+    parser.add_argument('out_dir', help='output directory')
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+
+    dataset = ingest(args.path, args.out_dir, args.chunk_rows)
+    print(f"\n📦 Ingested {dataset['n_rows']} rows × {dataset['n_features']} features → {args.out_dir}")
+    for target, classes in dataset['classes'].items():
+        print(f"   {target}: {classes}")
@@ -0,0 +1,195 @@
+"""
+TriageAI — Metrics
+====================
+Minimal, dependency-free counters and histograms rendered in the Prometheus
+text exposition format (served at GET /api/ml/metrics).
+
+Metrics are per process: under serve.py each gunicorn worker keeps its own
+values and reports its pid in the `ml_process_info` series.
+"""
+
+import os
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+
+# Seconds; tuned for sub-millisecond stages up to multi-second batch calls
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+
+
+def _label_str(names: tuple, values: tuple, extra: str = '') -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = tuple(labels.get(n, '') for n in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_label_str(self.labels, key)} {value:g}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # key → [per-bucket counts..., +Inf count, sum]
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, **labels) -> None:
+        key = tuple(labels.get(n, '') for n in self.labels)
+        idx = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[idx] += 1
+            series[-1] += seconds
+
+    @contextmanager
+    def time(self, **labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def render(self) -> list[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            snapshot = {k: list(v) for k, v in self._series.items()}
+        for key, series in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = 'le="%g"' % bound
+                lines.append(f'{self.name}_bucket{_label_str(self.labels, key, le)} {cumulative}')
+            cumulative += series[len(self.buckets)]
+            le = 'le="+Inf"'
+            lines.append(f'{self.name}_bucket{_label_str(self.labels, key, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_label_str(self.labels, key)} {series[-1]:.9g}')
+            lines.append(f'{self.name}_count{_label_str(self.labels, key)} {cumulative}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list = []
+        self._collectors: list = []
+
+    def counter(self, name: str, help: str, labels: tuple = ()) -> Counter:
+        metric = Counter(name, help, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, help, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge_callback(self, name: str, help: str, fn, labels: tuple = ()) -> None:
+        """
+        Register a gauge whose value is read from `fn()` at scrape time.
+
+        Without `labels`, `fn` returns a number. With `labels`, it returns a dict
+        mapping a label value (or tuple of values, one per label) to a number.
+        """
+        self._collectors.append((name, help, fn, tuple(labels)))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for name, help, fn, label_names in self._collectors:
+            lines.append(f'# HELP {name} {help}')
+            lines.append(f'# TYPE {name} gauge')
+            try:
+                value = fn()
+            except Exception:
+                continue
+            if isinstance(value, dict):
+                for key, v in sorted(value.items()):
+                    key = key if isinstance(key, tuple) else (key,)
+                    lines.append(f'{name}{_label_str(label_names, key)} {float(v):g}')
+            else:
+                lines.append(f'{name} {float(value):g}')
+        return '\n'.join(lines) + '\n'
+
+
+# ─────────────────────────────── SHARED METRICS ───────────────────────────────
+registry = Registry()
+
+inference_stage_seconds = registry.histogram(
+    'ml_inference_stage_seconds',
+    'Time spent in each stage of classify_batch (per call, not per row).',
+    labels=('stage',),
+)
+inference_rows_total = registry.counter(
+    'ml_inference_rows_total',
+    'Rows classified, by whether they were served from the prediction cache.',
+    labels=('source',),
+)
+unknown_terms_total = registry.counter(
+    'ml_unknown_terms_total',
+    'Input terms no vocabulary recognized (dropped from the features), by kind.',
+    labels=('kind',),
+)
+fast_path_rows_total = registry.counter(
+    'ml_fast_path_rows_total',
+    'Rows scored by the fast-path model, by model and whether they were escalated to the full forest.',
+    labels=('model', 'path'),
+)
+http_stage_seconds = registry.histogram(
+    'ml_http_stage_seconds',
+    'Time spent in each stage of an HTTP request handler.',
+    labels=('endpoint', 'stage'),
+)
+http_requests_total = registry.counter(
+    'ml_http_requests_total',
+    'HTTP requests handled, by endpoint and status code.',
+    labels=('endpoint', 'status'),
+)
+errors_total = registry.counter(
+    'ml_errors_total',
+    'Requests that failed inside the ML service, by endpoint.',
+    labels=('endpoint',),
+)
+fallbacks_total = registry.counter(
+    'ml_fallbacks_total',
+    'Requests the service turned away so the caller must fall back to the rule engine, by reason.',
+    labels=('reason',),
+)
+history_rows_total = registry.counter(
+    'ml_history_rows_total',
+    'Classifications written to the patient history store, by result.',
+    labels=('result',),
+)
+
+registry.gauge_callback('ml_process_info', 'Constant 1, labelled with this worker process id.',
+                        lambda: {str(os.getpid()): 1}, labels=('pid',))
@@ -0,0 +1,94 @@
+"""
+TriageAI — Training Stage Cache
+=================================
+On-disk memoization for the stages of train_model.py. Each stage result is
+stored under `<cache_dir>/<stage>/<key>.joblib`, where the key is a SHA-256 of
+everything the stage depends on: the hash of its input data, its config
+(hyperparameters, seeds, fold counts) and the source of the code that computes
+it. Change any of those and the stage recomputes; otherwise it is read back.
+
+Keys are chained — a stage's key includes its upstream stage's key — so editing
+the CSV invalidates everything, while changing one model's hyperparameters only
+invalidates that model's fit and cross-validation.
+"""
+
+import os
+import json
+import time
+import hashlib
+import inspect
+
+import joblib
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'train')
+
+
+def hash_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def hash_code(*objects) -> str:
+    """Hash the source of functions/classes/modules so code edits invalidate their stages."""
+    h = hashlib.sha256()
+    for obj in objects:
+        h.update(inspect.getsource(obj).encode())
+    return h.hexdigest()
+
+
+def stage_key(*parts) -> str:
+    """Stable key for JSON-serializable parts (dict key order does not matter)."""
+    blob = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()[:16]
+
+
+class StageCache:
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, enabled: bool = True):
+        self.cache_dir = cache_dir
+        self.enabled = enabled
+        self.log: list[dict] = []
+        self._memory: dict[tuple, object] = {}   # results produced or read during this run
+
+    def path(self, stage: str, key: str) -> str:
+        return os.path.join(self.cache_dir, stage, f'{key}.joblib')
+
+    def has(self, stage: str, key: str) -> bool:
+        return (stage, key) in self._memory or (self.enabled and os.path.exists(self.path(stage, key)))
+
+    def load(self, stage: str, key: str):
+        if (stage, key) in self._memory:
+            return self._memory[(stage, key)]
+        started = time.perf_counter()
+        value = self._memory[(stage, key)] = joblib.load(self.path(stage, key))
+        self._record(stage, key, True, started)
+        return value
+
+    def save(self, stage: str, key: str, value, started: float | None = None) -> None:
+        self._memory[(stage, key)] = value
+        if self.enabled:
+            target = self.path(stage, key)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            joblib.dump(value, target + '.tmp')
+            os.replace(target + '.tmp', target)
+        if started is not None:
+            self._record(stage, key, False, started)
+
+    def run(self, stage: str, key: str, fn, *args, **kwargs):
+        """Return the cached result for (stage, key), computing and storing it on a miss."""
+        if self.has(stage, key):
+            return self.load(stage, key)
+        started = time.perf_counter()
+        value = fn(*args, **kwargs)
+        self.save(stage, key, value, started)
+        return value
+
+    def _record(self, stage: str, key: str, cached: bool, started: float) -> None:
+        self.log.append({
+            'stage': stage,
+            'key': key,
+            'cached': cached,
+            'seconds': time.perf_counter() - started,
+        })
@@ -3,32 +3,42 @@ TriageAI — ML Prediction Script (called by Node.js)
 =====================================================
 Takes JSON input via stdin, runs the ML model, outputs JSON to stdout.
 This is the bridge between the Next.js API route and the Python ML model.
+
+Modes:
+  python predict.py            One-shot: read a single JSON object, print one result, exit.
+  python predict.py --worker   Persistent: load the models once, then read newline-delimited
+                               JSON requests from stdin and write one JSON response per line.
+                               Each request carries an "id" that is echoed back on the response.
+
+Either mode accepts "explain": true on a request to add the per-feature
+`explanation` (see inference.classify).
 """
 
 import sys
 import os
 import json
-import warnings
-warnings.filterwarnings('ignore')
+import threading
 
 # Add ml dir to path
 sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__))))
-from inference import classify
+# Served classifications are patient history (ML_HISTORY=0 turns recording off)
+os.environ.setdefault('ML_HISTORY', '1')
+from inference import classify, classify_batch, current_models, parse_record
+from scheduler import MicroBatchScheduler
+
+
+def parse_input(input_data: dict) -> dict:
+    """Validate a raw JSON payload into `classify()` keyword arguments (see inference.parse_record)."""
+    return parse_record(input_data)
+
 
 def main():
     try:
         # Read JSON from stdin
         input_data = json.loads(sys.stdin.read())
 
-        result = classify(
-            age=int(input_data.get('age', 0)),
-            gender=str(input_data.get('gender', 'Other')),
-            symptoms=input_data.get('symptoms', []),
-            blood_pressure_systolic=int(input_data.get('blood_pressure_systolic', 120)),
-            heart_rate=int(input_data.get('heart_rate', 80)),
-            temperature_f=float(input_data.get('temperature_f', 98.6)),
-            pre_existing_conditions=input_data.get('pre_existing_conditions', []),
-        )
+        current_models().registry.preload()
+        result = classify(**parse_input(input_data), explain=bool(input_data.get('explain')))
 
         print(json.dumps(result))
 
@@ -36,5 +46,72 @@ def main():
         print(json.dumps({'error': str(e)}))
         sys.exit(1)
 
+
+def worker():
+    """
+    Long-lived worker loop. Models are loaded in parallel once at startup, so
+    every request is served without any cold-start cost.
+
+    Protocol (one JSON object per line, both directions):
+      → {"id": "abc", "age": 65, "gender": "Male", ...}
+      ← {"id": "abc", "risk_level": "High", ...}      or {"id": "abc", "error": "..."}
+
+    Requests are fed through a MicroBatchScheduler, so lines that arrive close
+    together are scored in one batch and responses may come back out of order —
+    match them up by id. A request with a field of the wrong type is answered
+    with its own {"id", "error"} line before it is queued, and a batch that still
+    fails is retried row by row, so one bad line never fails the requests
+    batched with it. Requests with "explain": true are scored on their own,
+    outside the micro-batches. A {"ready": true, "models": {...}} line is written once
+    the models are loaded; a missing department model still reports ready and
+    responses carry department=null with "models_unavailable": ["dept"]. The
+    worker drains outstanding requests and exits when stdin is closed.
+    """
+    out = sys.stdout
+    write_lock = threading.Lock()
+
+    def respond(response: dict):
+        line = json.dumps(response) + '\n'
+        with write_lock:
+            out.write(line)
+            out.flush()
+
+    current_models().registry.preload()
+    scheduler = MicroBatchScheduler(classify_batch).start()
+    states = {name: m['state'] for name, m in current_models().registry.status()['models'].items()}
+    respond({'ready': True, 'pid': os.getpid(), 'models': states})
+
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+
+        request_id = None
+        try:
+            input_data = json.loads(line)
+            request_id = input_data.get('id') if isinstance(input_data, dict) else None
+            record = parse_input(input_data)
+            if input_data.get('explain'):
+                respond({'id': request_id, **classify_batch([record], explain=True)[0]})
+                continue
+            future = scheduler.submit_async(record)
+        except Exception as e:
+            respond({'id': request_id, 'error': str(e)})
+            continue
+
+        def done(f, request_id=request_id):
+            try:
+                respond({'id': request_id, **f.result()})
+            except Exception as e:
+                respond({'id': request_id, 'error': str(e)})
+
+        future.add_done_callback(done)
+
+    scheduler.stop()
+
+
 if __name__ == '__main__':
-    main()
+    if '--worker' in sys.argv[1:]:
+        worker()
+    else:
+        main()
@@ -0,0 +1,97 @@
+"""
+TriageAI — Sampling Profiler
+==============================
+Low-overhead wall-clock sampler for a running ML worker. While active, a
+background thread snapshots every other thread's Python stack at a fixed
+interval and counts identical stacks.
+
+The dump is in "collapsed stack" format — one `frame;frame;frame count` line
+per unique stack, root first — which flamegraph.pl, speedscope and inferno
+render directly.
+
+Toggled at runtime through the server (only when ML_ENABLE_PROFILER=1):
+  POST /api/ml/profiler/start?interval_ms=5
+  POST /api/ml/profiler/stop      → collapsed stacks as text/plain
+  GET  /api/ml/profiler           → status
+"""
+
+import os
+import sys
+import time
+import threading
+from collections import Counter
+
+PROFILER_ENABLED = os.environ.get('ML_ENABLE_PROFILER', '0') == '1'
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f'{os.path.basename(code.co_filename)}:{code.co_name}'
+
+
+class SamplingProfiler:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._stacks: Counter = Counter()
+        self.interval = 0.005
+        self.samples = 0
+        self.started_at: float | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self, interval_ms: float = 5.0) -> bool:
+        """Start sampling; returns False if already running."""
+        with self._lock:
+            if self._thread is not None:
+                return False
+            self.interval = max(0.5, interval_ms) / 1000.0
+            self._stacks = Counter()
+            self.samples = 0
+            self.started_at = time.time()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self) -> str:
+        """Stop sampling and return the collapsed-stack profile."""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+        return self.collapsed()
+
+    def collapsed(self) -> str:
+        return ''.join(f'{stack} {count}\n' for stack, count in self._stacks.most_common())
+
+    def status(self) -> dict:
+        return {
+            'enabled': PROFILER_ENABLED,
+            'running': self.running,
+            'interval_ms': self.interval * 1000.0,
+            'samples': self.samples,
+            'unique_stacks': len(self._stacks),
+            'started_at': self.started_at,
+        }
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                self._stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+
+profiler = SamplingProfiler()
@@ -0,0 +1,367 @@
+"""
+TriageAI — Model Registry
+===========================
+Manifest-driven artifact store for the classifiers.
+
+`models/manifest.json` (written by train_model.py, or `python registry.py`)
+records, for every model, the artifact files it can be served from together
+with their SHA-256 checksums and a version string:
+
+  {
+    "version": "20260214-0712-1a2b3c4d",
+    "created_at": "...",
+    "models": {
+      "risk": {
+        "version": "1a2b3c4d5e6f",
+        "compiled": {"path": "risk_forest", "sha256": "..."},
+        "sklearn":  {"path": "risk_classifier.joblib", "sha256": "..."},
+        "labels":   {"path": "risk_label_encoder.joblib", "sha256": "..."}
+      },
+      "dept": { ... },
+      "risk_fast": {"version": "...", "compiled": {"path": "risk_fast_forest", ...}}
+    },
+    "files": {
+      "metadata": {"path": "feature_metadata.json", "sha256": "..."},
+      "encoder":  {"path": "feature_encoder.json", "sha256": "..."},
+      "drift_profile": {"path": "drift_profile.json", "sha256": "..."}
+    }
+  }
+
+Models load lazily on first `get()`, or concurrently in a thread pool via
+`preload()`. Each model has its own state (unloaded / loading / ready /
+missing / error), so risk scoring can serve while the department model is
+still loading or absent.
+
+Forests are served from memory-mapped compiled arrays (forest.py), never from
+per-process Python objects: every worker maps the same read-only pages, so
+its RSS barely grows with model size and more workers fit on a node. A model
+that only has a sklearn pickle is compiled once into ML_SHARED_DIR (default
+/dev/shm/triageai-forests, i.e. POSIX shared memory) under a lock, keyed by
+the pickle's checksum; later workers attach to that copy zero-copy. The
+directory is a cache and may be deleted at any time. ML_SHARED_FORESTS=0
+unpickles sklearn models per process instead.
+
+Usage:
+  python registry.py          (Re)write models/manifest.json for the artifacts on disk
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from forest import CompiledForest, export_forest
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+MANIFEST_NAME = 'manifest.json'
+MODEL_NAMES = ('risk', 'dept')
+# Distilled fast-path models (train_model.py). Optional: they are listed only when
+# present and never affect health — inference falls back to the full forests.
+FAST_MODEL_NAMES = tuple(f'{name}_fast' for name in MODEL_NAMES)
+
+# Verify artifact checksums against the manifest before serving them
+VERIFY_CHECKSUMS = os.environ.get('ML_VERIFY_CHECKSUMS', '1') == '1'
+
+SHARED_FORESTS = os.environ.get('ML_SHARED_FORESTS', '1') == '1'
+SHARED_DIR = os.environ.get('ML_SHARED_DIR') or os.path.join(
+    '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(), 'triageai-forests'
+)
+
+UNLOADED, LOADING, READY, MISSING, ERROR = 'unloaded', 'loading', 'ready', 'missing', 'error'
+
+
+class ModelUnavailable(Exception):
+    """Raised when a model is missing or failed to load."""
+
+
+# ─────────────────────────────── MANIFEST ───────────────────────────────
+
+def sha256_path(path: str) -> str:
+    """SHA-256 of a file, or of every file (name + bytes, sorted) inside a directory."""
+    h = hashlib.sha256()
+    if os.path.isdir(path):
+        for name in sorted(os.listdir(path)):
+            h.update(name.encode())
+            h.update(_file_digest(os.path.join(path, name)))
+    else:
+        h.update(_file_digest(path))
+    return h.hexdigest()
+
+
+def _file_digest(path: str) -> bytes:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.digest()
+
+
+def _entry(model_dir: str, rel_path: str) -> dict | None:
+    path = os.path.join(model_dir, rel_path)
+    if not os.path.exists(path):
+        return None
+    return {'path': rel_path, 'sha256': sha256_path(path)}
+
+
+def build_manifest(model_dir: str = MODEL_DIR) -> dict:
+    """Describe the artifacts currently in `model_dir`."""
+    models = {}
+    for name in MODEL_NAMES + FAST_MODEL_NAMES:
+        entry = {
+            'compiled': _entry(model_dir, f'{name}_forest'),
+            'sklearn': _entry(model_dir, f'{name}_classifier.joblib'),
+            'labels': _entry(model_dir, f'{name}_label_encoder.joblib'),
+        }
+        entry = {k: v for k, v in entry.items() if v is not None}
+        if name in FAST_MODEL_NAMES and not entry:
+            continue
+        served_from = entry.get('compiled') or entry.get('sklearn')
+        entry['version'] = served_from['sha256'][:12] if served_from else None
+        models[name] = entry
+
+    files = {
+        'metadata': _entry(model_dir, 'feature_metadata.json'),
+        'encoder': _entry(model_dir, 'feature_encoder.json'),
+        'drift_profile': _entry(model_dir, 'drift_profile.json'),
+    }
+    files = {k: v for k, v in files.items() if v is not None}
+
+    combined = hashlib.sha256(
+        ''.join(str(m.get('version')) for m in models.values()).encode()
+        + ''.join(f['sha256'] for f in files.values()).encode()
+    ).hexdigest()[:8]
+    return {
+        'version': f'{time.strftime("%Y%m%d-%H%M%S")}-{combined}',
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'models': models,
+        'files': files,
+    }
+
+
+def write_manifest(model_dir: str = MODEL_DIR) -> dict:
+    """Write the manifest last, atomically — servers watching for reloads key on it."""
+    manifest = build_manifest(model_dir)
+    target = os.path.join(model_dir, MANIFEST_NAME)
+    with open(target + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(target + '.tmp', target)
+    return manifest
+
+
+def read_manifest(model_dir: str = MODEL_DIR) -> dict:
+    """Load the manifest, or derive one from the files on disk if none was written."""
+    path = os.path.join(model_dir, MANIFEST_NAME)
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            return json.load(f)
+    return build_manifest(model_dir)
+
+
+# ─────────────────────────────── SHARED FORESTS ───────────────────────────────
+
+def shared_forest(sha256: str, model_path: str, labels_path: str, shared_dir: str = SHARED_DIR) -> str:
+    """
+    Directory holding the compiled copy of a pickled sklearn forest, building
+    it if no process has yet. The first process to take the lock unpickles and
+    compiles into a temp directory that is renamed into place, so others either
+    wait for it or find it finished.
+    """
+    target = os.path.join(shared_dir, sha256[:16])
+    if CompiledForest.exists(target):
+        return target
+    os.makedirs(shared_dir, exist_ok=True)
+    with open(target + '.lock', 'w') as lock:
+        try:
+            import fcntl
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        except ImportError:
+            pass  # no flock (Windows): racing processes may each compile; one rename wins
+        if CompiledForest.exists(target):
+            return target
+
+        import joblib
+        model = joblib.load(model_path)
+        le = joblib.load(labels_path)
+        scratch = tempfile.mkdtemp(prefix=f'.{sha256[:16]}-', dir=shared_dir)
+        try:
+            export_forest(model, le.classes_[model.classes_], scratch)
+            os.rename(scratch, target)
+        except Exception:
+            # A half-written scratch copy in tmpfs would hold RAM until reboot
+            shutil.rmtree(scratch, ignore_errors=True)
+            if not CompiledForest.exists(target):
+                raise
+    return target
+
+
+# ─────────────────────────────── REGISTRY ───────────────────────────────
+
+class LoadedModel:
+    """A ready-to-serve classifier: `model.predict_proba` columns are named by `labels`."""
+
+    def __init__(self, name: str, model, labels: list[str], version: str | None, source: str):
+        self.name = name
+        self.model = model
+        self.labels = labels
+        self.version = version
+        self.source = source
+        self._compiled = None
+
+    def compiled(self) -> CompiledForest:
+        """
+        The model as a CompiledForest, whose node arrays explanations walk. A
+        pickled sklearn forest (ML_SHARED_FORESTS=0) is compiled in memory on
+        the first call.
+        """
+        if isinstance(self.model, CompiledForest):
+            return self.model
+        if self._compiled is None:
+            self._compiled = CompiledForest.from_sklearn(self.model, self.labels)
+        return self._compiled
+
+
+class _Slot:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.state = UNLOADED
+        self.loaded: LoadedModel | None = None
+        self.error: str | None = None
+        self.load_seconds: float | None = None
+
+
+class ModelRegistry:
+    def __init__(self, model_dir: str = MODEL_DIR, manifest: dict | None = None):
+        self.model_dir = model_dir
+        self.manifest = manifest if manifest is not None else read_manifest(model_dir)
+        self._slots = {name: _Slot() for name in self.manifest.get('models', {})}
+
+    @property
+    def version(self) -> str | None:
+        return self.manifest.get('version')
+
+    def file_path(self, key: str) -> str | None:
+        """Path of a non-model file listed in the manifest ('metadata', 'encoder')."""
+        entry = self.manifest.get('files', {}).get(key)
+        return os.path.join(self.model_dir, entry['path']) if entry else None
+
+    def verify_files(self) -> None:
+        """Raise ValueError if a non-model file no longer matches its manifest checksum."""
+        for entry in self.manifest.get('files', {}).values():
+            self._verified_path(entry)
+
+    # ── Loading ──
+
+    def get(self, name: str) -> LoadedModel:
+        """Return the loaded model, loading it now (or waiting for a background load) if needed."""
+        slot = self._slots.get(name)
+        if slot is None:
+            raise ModelUnavailable(f'Unknown model: {name}')
+        if slot.state == READY:
+            return slot.loaded
+
+        with slot.lock:
+            if slot.state not in (READY, MISSING, ERROR):
+                self._load(name, slot)
+        if slot.state != READY:
+            raise ModelUnavailable(f'{name} model {slot.state}: {slot.error}')
+        return slot.loaded
+
+    def try_get(self, name: str) -> LoadedModel | None:
+        try:
+            return self.get(name)
+        except ModelUnavailable:
+            return None
+
+    def preload(self, names=None, wait: bool = True) -> ThreadPoolExecutor:
+        """Load models concurrently in a thread pool. With wait=False, returns immediately."""
+        names = list(names or self._slots)
+        pool = ThreadPoolExecutor(max_workers=max(1, len(names)), thread_name_prefix='model-load')
+        for name in names:
+            pool.submit(self.try_get, name)
+        pool.shutdown(wait=wait)
+        return pool
+
+    def _load(self, name: str, slot: _Slot) -> None:
+        """Load one model. Caller holds slot.lock."""
+        entry = self.manifest['models'][name]
+        slot.state = LOADING
+        started = time.perf_counter()
+        try:
+            if 'compiled' in entry:
+                path = self._verified_path(entry['compiled'])
+                model = CompiledForest.load(path, mmap=True)
+                loaded = LoadedModel(name, model, [str(c) for c in model.classes_], entry.get('version'), 'compiled')
+            elif 'sklearn' in entry and 'labels' in entry:
+                model_path = self._verified_path(entry['sklearn'])
+                labels_path = self._verified_path(entry['labels'])
+                if SHARED_FORESTS:
+                    sha256 = entry['sklearn'].get('sha256') or sha256_path(model_path)
+                    model = CompiledForest.load(shared_forest(sha256, model_path, labels_path), mmap=True)
+                    loaded = LoadedModel(name, model, [str(c) for c in model.classes_], entry.get('version'), 'shared')
+                else:
+                    import joblib
+                    model = joblib.load(model_path, mmap_mode='r')
+                    le = joblib.load(labels_path)
+                    labels = [str(c) for c in le.classes_[model.classes_]]
+                    loaded = LoadedModel(name, model, labels, entry.get('version'), 'sklearn')
+            else:
+                slot.state = MISSING
+                slot.error = 'no compiled or sklearn artifact in manifest'
+                return
+        except FileNotFoundError as e:
+            slot.state = MISSING
+            slot.error = str(e)
+            return
+        except Exception as e:
+            slot.state = ERROR
+            slot.error = f'{type(e).__name__}: {e}'
+            return
+
+        slot.loaded = loaded
+        slot.load_seconds = time.perf_counter() - started
+        slot.error = None
+        slot.state = READY
+
+    def _verified_path(self, entry: dict) -> str:
+        path = os.path.join(self.model_dir, entry['path'])
+        if not os.path.exists(path):
+            raise FileNotFoundError(f'{entry["path"]} not found')
+        if VERIFY_CHECKSUMS and entry.get('sha256') and sha256_path(path) != entry['sha256']:
+            raise ValueError(f'checksum mismatch for {entry["path"]}')
+        return path
+
+    # ── Status ──
+
+    def status(self) -> dict:
+        models = {}
+        for name, slot in self._slots.items():
+            models[name] = {
+                'state': slot.state,
+                'version': self.manifest['models'][name].get('version'),
+                'source': slot.loaded.source if slot.loaded else None,
+                'load_seconds': slot.load_seconds,
+                'error': slot.error,
+            }
+        states = [m['state'] for name, m in models.items() if name not in FAST_MODEL_NAMES]
+        if all(s == READY for s in states):
+            overall = 'healthy'
+        elif any(s == READY for s in states):
+            overall = 'degraded'
+        elif any(s in (LOADING, UNLOADED) for s in states):
+            overall = 'loading'
+        else:
+            overall = 'unavailable'
+        return {'status': overall, 'version': self.version, 'models': models}
+
+
+# ─────────────────────────────── CLI ───────────────────────────────
+if __name__ == '__main__':
+    manifest = write_manifest()
+    print(f"\n📜 Wrote {os.path.join(MODEL_DIR, MANIFEST_NAME)} (version {manifest['version']})\n")
+    for name, entry in manifest['models'].items():
+        artifacts = ', '.join(k for k in ('compiled', 'sklearn', 'labels') if k in entry) or 'none'
+        print(f"   {name:5s} version {entry['version']}  artifacts: {artifacts}")
@@ -0,0 +1,98 @@
+"""
+TriageAI — Model Watcher
+==========================
+Background thread that notices a newly trained model version and hot-swaps it
+in via `inference.reload_models()`.
+
+train_model.py writes `models/manifest.json` last (atomically), so the watcher
+only has to poll that one file: when its version differs from the live one, the
+new artifacts are loaded, validated and swapped in without dropping requests.
+A version that fails to load is not retried until the manifest changes again.
+
+Configuration (environment):
+  ML_RELOAD_INTERVAL     seconds between manifest checks (default 5; 0 disables)
+"""
+
+import os
+import json
+import time
+import threading
+
+from registry import MANIFEST_NAME
+from inference import ReloadInProgress
+
+RELOAD_INTERVAL_S = float(os.environ.get('ML_RELOAD_INTERVAL', 5.0))
+
+
+class ModelWatcher:
+    def __init__(self, reload_fn, current_version_fn, model_dir: str, interval: float = RELOAD_INTERVAL_S):
+        self.reload_fn = reload_fn
+        self.current_version_fn = current_version_fn
+        self.manifest_path = os.path.join(model_dir, MANIFEST_NAME)
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._last_mtime: float | None = None
+        self._failed_version: str | None = None
+        self.last_check: float | None = None
+        self.last_reload: dict | None = None
+        self.last_error: str | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval > 0
+
+    def start(self) -> 'ModelWatcher':
+        if self.enabled and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='model-watcher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def check(self) -> bool:
+        """Reload if the manifest on disk names a new version. Returns True if a swap happened."""
+        self.last_check = time.time()
+        try:
+            mtime = os.stat(self.manifest_path).st_mtime
+        except FileNotFoundError:
+            return False
+        if mtime == self._last_mtime:
+            return False
+
+        try:
+            with open(self.manifest_path, 'r') as f:
+                version = json.load(f).get('version')
+        except (OSError, ValueError):
+            return False  # caught mid-write; the next poll sees the finished file
+        self._last_mtime = mtime
+
+        if version == self.current_version_fn() or version == self._failed_version:
+            return False
+
+        try:
+            self.last_reload = self.reload_fn()
+            self.last_error = None
+            self._failed_version = None
+            return True
+        except ReloadInProgress:
+            self._last_mtime = None  # an admin reload is running; look again next poll
+            return False
+        except Exception as e:
+            self._failed_version = version
+            self.last_error = f'{version}: {type(e).__name__}: {e}'
+            return False
+
+    def status(self) -> dict:
+        return {
+            'enabled': self.enabled,
+            'interval_s': self.interval,
+            'last_check': self.last_check,
+            'last_reload': self.last_reload,
+            'last_error': self.last_error,
+        }
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.check()
@@ -0,0 +1,368 @@
+"""
+TriageAI — Bulk Offline Re-scoring
+====================================
+Re-scores a historical triage export (the columns of
+smart_triage_dataset_1200-1.csv, CSV or Parquet) with the current models, to
+audit how risk and department assignments shift after a retrain.
+
+The export is streamed in chunks (ingest.iter_chunks) and the chunks are
+sharded across a process pool; each worker loads the models once and encodes
+its chunks with the vectorized ingest encoder. Every chunk becomes one part
+file in the output directory:
+
+  <out_dir>/
+    part-00000.parquet   row, [--keep columns], risk_level, risk_confidence,
+    part-00001.parquet   risk_prob_<class>…, risk_served_by, department,
+    ...                  department_confidence, department_prob_<class>…,
+                         department_served_by, model_version, and when the
+                         export has them the stored Risk_Level /
+                         Recommended_Department with risk_changed /
+                         department_changed flags
+    _rescore.json        run settings, finished parts with their diff counts,
+                         and the final summary
+
+Parts are written aside and renamed into place, and _rescore.json lists only
+finished parts, so an interrupted run picks up where it stopped when the same
+command is run again. A resume is refused if the export, chunk size, format
+or model version changed since the first run (--restart starts over).
+
+The output directory reads as one table with pandas.read_parquet(out_dir) or
+pyarrow.dataset. Parquet and Arrow output need pyarrow; --format csv does not.
+Rows go through the fast path like live traffic; set ML_FAST_PATH=0 to score
+everything with the full forests.
+
+Usage:
+  python rescore.py <export.csv|export.parquet> <out_dir> [--format parquet|arrow|csv]
+                    [--workers N] [--chunk-rows 20000] [--keep patient_id,...] [--restart]
+"""
+
+import os
+import json
+import time
+import re
+import argparse
+import multiprocessing
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from ingest import iter_chunks, encode_frame, FEATURE_SOURCE_COLUMNS, TARGET_COLUMNS
+from registry import read_manifest, MODEL_DIR
+
+CHUNK_ROWS = 20_000
+FORMATS = {'parquet': '.parquet', 'arrow': '.arrow', 'csv': '.csv'}
+STATE_NAME = '_rescore.json'   # '_' and '.' files are skipped by dataset readers
+# Every file a run writes into out_dir (parts, the state file and their temp files)
+OWN_FILES = re.compile(r'^(\.?part-\d{5}(\.parquet|\.arrow|\.csv)(\.tmp)?|_rescore\.json(\.tmp)?)$')
+
+# Stored label column → (task, result column prefix)
+STORED_LABELS = {'Risk_Level': ('risk', 'risk'), 'Recommended_Department': ('dept', 'department')}
+
+
+# ─────────────────────────────── INPUT ───────────────────────────────
+def input_columns(path: str) -> list[str]:
+    """Column names of a CSV or Parquet export, without reading its rows."""
+    if path.endswith(('.parquet', '.pq')):
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(path).schema_arrow.names
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def count_rows(path: str) -> int:
+    """Data rows in the export: Parquet metadata, or a newline count for CSV (for progress only)."""
+    if path.endswith(('.parquet', '.pq')):
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(path).metadata.num_rows
+    lines, last = 0, b''
+    with open(path, 'rb') as f:
+        while block := f.read(1 << 20):
+            lines += block.count(b'\n')
+            last = block[-1:]
+    lines += last not in (b'', b'\n')   # final line without a newline
+    return max(lines - 1, 0)             # minus the header
+
+
+def input_fingerprint(path: str) -> dict:
+    st = os.stat(path)
+    return {'path': os.path.abspath(path), 'size': st.st_size, 'mtime': st.st_mtime}
+
+
+# ─────────────────────────────── WORKERS ───────────────────────────────
+_bundle = None
+
+
+def _init_worker() -> None:
+    """Pool initializer: load the models once per worker process."""
+    global _bundle
+    import warnings
+    warnings.filterwarnings('ignore')
+    import inference
+    _bundle = inference.current_models()
+    _bundle.registry.preload()
+
+
+def score_chunk(index: int, start: int, chunk: pd.DataFrame, out_dir: str, fmt: str, keep: list[str]) -> dict:
+    """Score one chunk, write its part file and return the part's diff counts."""
+    from inference import score_matrix
+
+    chunk = chunk.reset_index(drop=True)
+    X = encode_frame(_bundle.encoder, chunk)
+    scored = score_matrix(X, _bundle)
+
+    columns = {'row': np.arange(start, start + len(chunk), dtype=np.int64)}
+    for col in keep:
+        columns[col] = chunk[col].to_numpy()
+    predicted = {}
+    for task, prefix in (('risk', 'risk'), ('dept', 'department')):
+        level = 'risk_level' if task == 'risk' else 'department'
+        if task not in scored:
+            columns[level] = pd.array([None] * len(chunk), dtype='string')
+            columns[f'{prefix}_confidence'] = np.full(len(chunk), np.nan)
+            continue
+        labels, proba, fast = scored[task]
+        idx = proba.argmax(axis=1)
+        predicted[task] = np.asarray(labels, dtype=object)[idx]
+        columns[level] = predicted[task]
+        columns[f'{prefix}_confidence'] = proba[np.arange(len(idx)), idx]
+        for j, label in enumerate(labels):
+            columns[f'{prefix}_prob_{label}'] = proba[:, j]
+        columns[f'{prefix}_served_by'] = np.where(fast, 'fast', 'full')
+    columns['model_version'] = np.full(len(chunk), str(_bundle.version))
+
+    diff = {}
+    for stored_col, (task, prefix) in STORED_LABELS.items():
+        if stored_col not in chunk.columns:
+            continue
+        stored = chunk[stored_col]
+        columns[stored_col] = stored.astype('string').to_numpy()
+        if task not in predicted:
+            continue
+        labeled = stored.notna().to_numpy()
+        changed = labeled & (stored.astype(str).to_numpy() != predicted[task])
+        columns[f'{prefix}_changed'] = changed
+        pairs = pd.DataFrame({'stored': stored[labeled].astype(str), 'predicted': predicted[task][labeled]})
+        counts = pairs.value_counts()
+        diff[task] = {'labeled': int(labeled.sum()), 'changed': int(changed.sum()), 'transitions': {}}
+        for (s, p), n in counts.items():
+            diff[task]['transitions'].setdefault(s, {})[p] = int(n)
+
+    write_part(pd.DataFrame(columns), os.path.join(out_dir, part_name(index, fmt)), fmt)
+    return {'index': index, 'start': start, 'rows': len(chunk), 'model_version': str(_bundle.version), 'diff': diff}
+
+
+# ─────────────────────────────── OUTPUT ───────────────────────────────
+def part_name(index: int, fmt: str) -> str:
+    return f'part-{index:05d}{FORMATS[fmt]}'
+
+
+def write_part(df: pd.DataFrame, path: str, fmt: str) -> None:
+    """Write one part aside and rename it into place, so a part file on disk is always complete."""
+    tmp = os.path.join(os.path.dirname(path), f'.{os.path.basename(path)}.tmp')
+    if fmt == 'csv':
+        df.to_csv(tmp, index=False)
+    else:
+        import pyarrow as pa
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if fmt == 'parquet':
+            import pyarrow.parquet as pq
+            pq.write_table(table, tmp)
+        else:
+            with pa.OSFile(tmp, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+    os.replace(tmp, path)
+
+
+def save_state(out_dir: str, state: dict) -> None:
+    path = os.path.join(out_dir, STATE_NAME)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def load_state(out_dir: str, settings: dict, restart: bool) -> dict:
+    """Finished parts from an earlier run with the same settings, or a fresh state."""
+    path = os.path.join(out_dir, STATE_NAME)
+    if os.path.exists(path) and not restart:
+        with open(path, 'r') as f:
+            state = json.load(f)
+        changed = [k for k, v in settings.items() if state.get(k) != v]
+        if changed:
+            raise SystemExit(
+                f'❌ {out_dir} holds a re-scoring run with different {", ".join(changed)}; '
+                f'use --restart to discard it or pick another output directory'
+            )
+        # A part counts as finished only if both the state and the file say so
+        state['parts'] = {
+            k: p for k, p in state['parts'].items()
+            if os.path.exists(os.path.join(out_dir, part_name(int(k), settings['format'])))
+        }
+        return state
+    if os.path.isdir(out_dir) and restart:
+        clear_output(out_dir)
+    os.makedirs(out_dir, exist_ok=True)
+    return {**settings, 'parts': {}, 'complete': False}
+
+
+def clear_output(out_dir: str) -> None:
+    """
+    Delete an earlier run's files for --restart. Refuses (and deletes nothing)
+    if out_dir holds anything this tool did not write — a mistyped --out must
+    not wipe an unrelated directory.
+    """
+    names = os.listdir(out_dir)
+    foreign = sorted(n for n in names if not OWN_FILES.match(n) or not os.path.isfile(os.path.join(out_dir, n)))
+    if foreign:
+        shown = ', '.join(foreign[:5]) + (', ...' if len(foreign) > 5 else '')
+        raise SystemExit(
+            f'❌ {out_dir} holds files that are not from a re-scoring run ({shown}); '
+            f'refusing to --restart into it — pick another output directory'
+        )
+    for name in names:
+        os.remove(os.path.join(out_dir, name))
+
+
+# ─────────────────────────────── DIFF SUMMARY ───────────────────────────────
+def merge_diffs(parts: list[dict]) -> dict:
+    """Sum the per-part stored-vs-predicted counts into one table per task."""
+    total = {}
+    for part in parts:
+        for task, d in part['diff'].items():
+            t = total.setdefault(task, {'labeled': 0, 'changed': 0, 'transitions': {}})
+            t['labeled'] += d['labeled']
+            t['changed'] += d['changed']
+            for stored, predicted in d['transitions'].items():
+                row = t['transitions'].setdefault(stored, {})
+                for label, n in predicted.items():
+                    row[label] = row.get(label, 0) + n
+    for t in total.values():
+        t['agreement'] = 1.0 - t['changed'] / t['labeled'] if t['labeled'] else None
+    return total
+
+
+def print_summary(summary: dict, top: int = 8) -> None:
+    if not summary:
+        print("\n   (no stored Risk_Level / Recommended_Department labels to compare against)")
+        return
+    for task, t in summary.items():
+        name = 'Risk' if task == 'risk' else 'Department'
+        share = f" ({(1 - t['agreement']) * 100:.2f}%)" if t['labeled'] else ''
+        print(f"\n🔀 {name}: {t['changed']:,} of {t['labeled']:,} labeled rows changed{share}")
+        moves = sorted(
+            ((n, s, p) for s, row in t['transitions'].items() for p, n in row.items() if s != p),
+            reverse=True,
+        )
+        for n, s, p in moves[:top]:
+            print(f"   {s:>18s} → {p:<18s} {n:>8,}")
+
+
+# ─────────────────────────────── MAIN ───────────────────────────────
+def rescore(path: str, out_dir: str, fmt: str = 'parquet', workers: int | None = None,
+            chunk_rows: int = CHUNK_ROWS, keep: list[str] | None = None, restart: bool = False) -> dict:
+    """Re-score `path` into `out_dir`; returns the final state (settings, parts, summary)."""
+    keep = keep or []
+    if fmt != 'csv' or path.endswith(('.parquet', '.pq')):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise RuntimeError('Parquet and Arrow files require pyarrow (pip install pyarrow); or use --format csv')
+    available = input_columns(path)
+    missing = [c for c in FEATURE_SOURCE_COLUMNS + keep if c not in available]
+    if missing:
+        raise SystemExit(f'❌ {path} is missing columns: {missing}')
+    columns = FEATURE_SOURCE_COLUMNS + [c for c in TARGET_COLUMNS if c in available] + keep
+
+    settings = {
+        'input': input_fingerprint(path),
+        'chunk_rows': chunk_rows,
+        'format': fmt,
+        'keep': keep,
+        'model_version': read_manifest(MODEL_DIR).get('version'),
+        'fast_path': os.environ.get('ML_FAST_PATH', '1') == '1',
+    }
+    state = load_state(out_dir, settings, restart)
+    done = state['parts']
+    total_rows = count_rows(path)
+    workers = workers or os.cpu_count() or 1
+
+    print("=" * 70)
+    print("  TriageAI — Bulk Re-scoring")
+    print("=" * 70)
+    print(f"   {path} → {out_dir} ({fmt}), ~{total_rows:,} rows, "
+          f"{workers} workers, model version {settings['model_version']}")
+    if done:
+        print(f"   resuming: {len(done)} parts / {sum(p['rows'] for p in done.values()):,} rows already scored")
+
+    started = time.perf_counter()
+    scored_rows = sum(p['rows'] for p in done.values())
+    new_rows = 0
+    last_report = 0.0
+
+    def finish(part: dict) -> None:
+        nonlocal scored_rows, new_rows, last_report
+        if part['model_version'] != str(settings['model_version']):
+            raise RuntimeError(
+                f"models changed during the run (now {part['model_version']}); rerun with --restart"
+            )
+        done[str(part['index'])] = part
+        save_state(out_dir, state)
+        scored_rows += part['rows']
+        new_rows += part['rows']
+        now = time.perf_counter()
+        if now - last_report >= 1.0:
+            last_report = now
+            rate = new_rows / (now - started)
+            pct = f" ({scored_rows / total_rows * 100:5.1f}%)" if total_rows else ''
+            print(f"   {scored_rows:>12,} rows{pct} | {rate:,.0f} rows/s", flush=True)
+
+    ctx = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn')
+    pool = ctx.Pool(workers, initializer=_init_worker)
+    pending = deque()
+    try:
+        start = 0
+        for index, chunk in enumerate(iter_chunks(path, chunk_rows, columns)):
+            if str(index) not in done:
+                pending.append(pool.apply_async(score_chunk, (index, start, chunk, out_dir, fmt, keep)))
+            start += len(chunk)
+            # Bounded read-ahead: raw chunks never pile up faster than the workers drain them
+            while len(pending) >= 2 * workers:
+                finish(pending.popleft().get())
+        while pending:
+            finish(pending.popleft().get())
+        pool.close()
+    except KeyboardInterrupt:
+        pool.terminate()
+        print(f"\n⏸  Interrupted after {scored_rows:,} rows — run the same command again to resume")
+        raise SystemExit(130)
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+    seconds = time.perf_counter() - started
+    state['complete'] = True
+    state['rows'] = scored_rows
+    state['summary'] = merge_diffs(list(done.values()))
+    state['last_run'] = {'rows': new_rows, 'seconds': seconds, 'rows_per_s': new_rows / seconds if seconds else None}
+    save_state(out_dir, state)
+
+    print(f"\n✓ {scored_rows:,} rows in {len(done)} parts → {out_dir} "
+          f"({new_rows:,} scored this run in {seconds:.1f}s, {state['last_run']['rows_per_s'] or 0:,.0f} rows/s)")
+    print_summary(state['summary'])
+    return state
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Re-score a triage export with the current models.')
+    parser.add_argument('path', help='CSV or Parquet export')
+    parser.add_argument('out_dir', help='output directory (one part file per chunk + _rescore.json)')
+    parser.add_argument('--format', choices=tuple(FORMATS), default='parquet')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: CPU count)')
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    parser.add_argument('--keep', default='', help='comma-separated input columns to copy through, e.g. patient_id')
+    parser.add_argument('--restart', action='store_true', help='discard an earlier run in out_dir')
+    args = parser.parse_args()
+
+    rescore(args.path, args.out_dir, args.format, args.workers, args.chunk_rows,
+            [c.strip() for c in args.keep.split(',') if c.strip()], args.restart)
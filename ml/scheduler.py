@@ -0,0 +1,234 @@
+"""
+TriageAI — Micro-Batching Scheduler
+=====================================
+Collects individual classification requests from many threads and hands them
+to a batch handler (normally `inference.classify_batch`) in groups, so one
+`predict_proba` call per model serves many concurrent callers.
+
+A batch is flushed when it reaches `max_batch_size` rows or when the oldest
+queued request has waited `max_wait_ms`, whichever comes first. The queue is
+bounded: `submit()` raises `SchedulerFull` instead of queueing unbounded work,
+which the HTTP layer turns into a 503.
+
+If the handler raises on a batch, its rows are retried one at a time, so a
+single bad record fails only its own request rather than every request it
+was batched with.
+
+Per-batch size, handler latency and queue wait are recorded over a sliding
+window of recent batches and reported by `stats()`.
+
+Tuning (environment, or constructor arguments):
+  ML_BATCH_MAX_SIZE      rows per batch                     (default 32)
+  ML_BATCH_MAX_WAIT_MS   max time a request waits to batch  (default 2)
+  ML_QUEUE_SIZE          pending requests before rejecting  (default 256)
+"""
+
+import os
+import time
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+DEFAULT_MAX_BATCH_SIZE = int(os.environ.get('ML_BATCH_MAX_SIZE', 32))
+DEFAULT_MAX_WAIT_MS = float(os.environ.get('ML_BATCH_MAX_WAIT_MS', 2.0))
+DEFAULT_MAX_QUEUE = int(os.environ.get('ML_QUEUE_SIZE', 256))
+
+# Number of recent batches kept for percentile stats
+STATS_WINDOW = 1024
+
+
+class SchedulerFull(Exception):
+    """Raised by `submit()` when the request queue is at capacity."""
+
+
+class SchedulerStopped(Exception):
+    """Raised by `submit()` after `stop()` has been called."""
+
+
+class MicroBatchScheduler:
+    """
+    Thread-based micro-batcher.
+
+    Args:
+        handler: callable taking a list of records and returning a list of results
+        max_batch_size: most rows handed to `handler` at once
+        max_wait_ms: longest a request waits for the batch to fill
+        max_queue: queued requests allowed before `submit()` rejects
+    """
+
+    def __init__(
+        self,
+        handler,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        max_wait_ms: float = DEFAULT_MAX_WAIT_MS,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+    ):
+        self.handler = handler
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._stopping = threading.Event()
+        # Held for the stop check + enqueue in submit_async and for the batch thread's exit
+        # check, so a record can never be queued after the batch thread has decided to exit
+        self._submit_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+        self._stats_lock = threading.Lock()
+        self._batch_sizes: deque[int] = deque(maxlen=STATS_WINDOW)
+        self._batch_latency_ms: deque[float] = deque(maxlen=STATS_WINDOW)
+        self._queue_wait_ms: deque[float] = deque(maxlen=STATS_WINDOW)
+        self.total_batches = 0
+        self.total_rows = 0
+        self.total_errors = 0
+        self.total_rejected = 0
+        self.total_split = 0
+
+    # ─────────────────────────────── LIFECYCLE ───────────────────────────────
+
+    def start(self) -> 'MicroBatchScheduler':
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: float | None = 10.0) -> None:
+        """Stop accepting work, finish everything already queued, then join the batch thread."""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    # ─────────────────────────────── SUBMISSION ───────────────────────────────
+
+    def submit_async(self, record) -> Future:
+        """Queue one record; returns a Future resolved with its result."""
+        future: Future = Future()
+        with self._submit_lock:
+            if self._stopping.is_set():
+                raise SchedulerStopped('Scheduler is shutting down')
+            try:
+                self._queue.put_nowait((record, future, time.perf_counter()))
+            except queue.Full:
+                with self._stats_lock:
+                    self.total_rejected += 1
+                raise SchedulerFull(f'Request queue full ({self._queue.maxsize} pending)')
+        return future
+
+    def submit(self, record, timeout: float | None = None):
+        """Queue one record and block until its batch has been processed."""
+        return self.submit_async(record).result(timeout)
+
+    # ─────────────────────────────── BATCH LOOP ───────────────────────────────
+
+    def _collect(self) -> list:
+        """Block for the first request, then gather more until the batch is full or the wait expires."""
+        try:
+            batch = [self._queue.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            with self._submit_lock:
+                if self._stopping.is_set() and self._queue.empty():
+                    return
+            batch = self._collect()
+            if not batch:
+                continue
+
+            records = [record for record, _, _ in batch]
+            started = time.perf_counter()
+            try:
+                results = self.handler(records)
+            except Exception as e:
+                if len(batch) > 1:
+                    self._run_singly(batch, started)
+                    continue
+                self._record(batch, started, failed=True)
+                batch[0][1].set_exception(e)
+                continue
+
+            self._record(batch, started)
+            for (_, future, _), result in zip(batch, results):
+                future.set_result(result)
+
+    def _run_singly(self, batch: list, started: float) -> None:
+        """Score a failed batch row by row, so only the rows that raise get the exception."""
+        failed = False
+        for record, future, _ in batch:
+            try:
+                result = self.handler([record])[0]
+            except Exception as e:
+                failed = True
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+        with self._stats_lock:
+            self.total_split += 1
+        self._record(batch, started, failed=failed)
+
+    # ─────────────────────────────── STATS ───────────────────────────────
+
+    def _record(self, batch: list, started: float, failed: bool = False) -> None:
+        finished = time.perf_counter()
+        # Queue wait of the oldest request — the one the batch delayed the most
+        wait_ms = (started - batch[0][2]) * 1000.0
+        with self._stats_lock:
+            self.total_batches += 1
+            self.total_rows += len(batch)
+            if failed:
+                self.total_errors += 1
+            self._batch_sizes.append(len(batch))
+            self._batch_latency_ms.append((finished - started) * 1000.0)
+            self._queue_wait_ms.append(wait_ms)
+
+    def stats(self) -> dict:
+        """Counters since start plus percentiles over the last STATS_WINDOW batches."""
+        with self._stats_lock:
+            sizes = sorted(self._batch_sizes)
+            latency = sorted(self._batch_latency_ms)
+            wait = sorted(self._queue_wait_ms)
+            return {
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000.0,
+                'max_queue': self._queue.maxsize,
+                'queue_depth': self._queue.qsize(),
+                'total_batches': self.total_batches,
+                'total_rows': self.total_rows,
+                'total_errors': self.total_errors,
+                'total_rejected': self.total_rejected,
+                'total_split': self.total_split,
+                'batch_size': _summarize(sizes),
+                'batch_latency_ms': _summarize(latency),
+                'queue_wait_ms': _summarize(wait),
+            }
+
+
+def _summarize(sorted_values: list) -> dict:
+    if not sorted_values:
+        return {'mean': 0.0, 'p50': 0.0, 'p95': 0.0, 'p99': 0.0, 'max': 0.0}
+    n = len(sorted_values)
+    return {
+        'mean': sum(sorted_values) / n,
+        'p50': sorted_values[int(0.50 * (n - 1))],
+        'p95': sorted_values[int(0.95 * (n - 1))],
+        'p99': sorted_values[int(0.99 * (n - 1))],
+        'max': sorted_values[-1],
+    }
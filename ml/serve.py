@@ -0,0 +1,105 @@
+"""
+TriageAI — Production ML Server
+=================================
+Multi-process front end for server.py, built on gunicorn.
+
+  - The Flask app (and therefore every model artifact) is imported once in the
+    master process; workers are forked afterwards and share those pages
+    copy-on-write. `gc.freeze()` keeps the garbage collector from touching —
+    and so un-sharing — the preloaded objects.
+  - Retrained models are hot-swapped by each worker on its own (reloader.py);
+    after a swap a worker serves its own copy until the next restart.
+  - Each worker runs a pool of request threads; concurrent /api/ml/classify
+    calls are queued and micro-batched into a single predict_proba per model
+    (see scheduler.py). A full queue answers 503 with Retry-After.
+  - SIGTERM / SIGINT stop accepting connections, let in-flight requests finish
+    (up to ML_GRACEFUL_TIMEOUT) and drain each worker's batch queue.
+
+Usage:
+  python serve.py
+
+Configuration (environment):
+  ML_HOST                bind address                          (default 0.0.0.0)
+  ML_PORT                bind port                             (default 5000)
+  ML_WORKERS             worker processes                      (default: CPU count)
+  ML_THREADS             request threads per worker            (default 32)
+  ML_QUEUE_SIZE          queued /classify requests per worker  (default 256)
+  ML_BATCH_MAX_SIZE      rows per micro-batch                  (default 32)
+  ML_BATCH_MAX_WAIT_MS   max time a request waits for a batch  (default 2)
+  ML_GRACEFUL_TIMEOUT    seconds to finish in-flight requests  (default 30)
+  ML_RELOAD_INTERVAL     seconds between new-model checks      (default 5; 0 disables)
+  ML_ADMIN_TOKEN         enables POST /api/ml/admin/reload     (default: disabled)
+"""
+
+import gc
+import os
+import sys
+
+from gunicorn.app.base import BaseApplication
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def gunicorn_options() -> dict:
+    host = os.environ.get('ML_HOST', '0.0.0.0')
+    port = int(os.environ.get('ML_PORT', 5000))
+    return {
+        'bind': f'{host}:{port}',
+        'workers': int(os.environ.get('ML_WORKERS', os.cpu_count() or 1)),
+        'worker_class': 'gthread',
+        'threads': int(os.environ.get('ML_THREADS', 32)),
+        'backlog': int(os.environ.get('ML_BACKLOG', 2048)),
+        'graceful_timeout': int(os.environ.get('ML_GRACEFUL_TIMEOUT', 30)),
+        'timeout': 60,
+        'keepalive': 5,
+        'preload_app': True,
+        'accesslog': None,
+        'errorlog': '-',
+        'loglevel': 'info',
+        'when_ready': on_ready,
+        'worker_exit': on_worker_exit,
+    }
+
+
+def on_ready(server):
+    # Everything loaded so far is long-lived; move it out of GC tracking so
+    # collections in the workers don't write to (and copy) the shared pages.
+    gc.collect()
+    gc.freeze()
+    server.log.info('Models preloaded; forking workers')
+
+
+def on_worker_exit(server, worker):
+    import server as ml_server
+    ml_server.shutdown_scheduler()
+
+
+class TriageMLApplication(BaseApplication):
+    """Embeds gunicorn so the server can be started with `python serve.py`."""
+
+    def __init__(self, options: dict):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            if key in self.cfg.settings and value is not None:
+                self.cfg.set(key, value)
+
+    def load(self):
+        from server import app
+        from inference import current_models
+        # Load every model (in parallel) before the fork so workers share them
+        current_models().registry.preload(wait=True)
+        return app
+
+
+if __name__ == '__main__':
+    options = gunicorn_options()
+    print("=" * 60)
+    print("  TriageAI ML API Server (production)")
+    print("=" * 60)
+    print(f"  Bind:        {options['bind']}")
+    print(f"  Workers:     {options['workers']} × {options['threads']} threads")
+    print("=" * 60)
+    TriageMLApplication(options).run()
@@ -4,77 +4,287 @@ TriageAI — ML API Server
 Flask API that exposes the trained ML models for the Next.js frontend.
 Runs on port 5000.
 
-Endpoint:
+Endpoints:
   POST /api/ml/classify
-  Body: { age, gender, symptoms, blood_pressure_systolic, heart_rate, temperature_f, pre_existing_conditions }
-  Returns: { risk_level, risk_confidence, department, department_confidence, ... }
+  Body: { age, gender, symptoms, blood_pressure_systolic, heart_rate, temperature_f, pre_existing_conditions,
+          patient_id? }
+  Returns: { risk_level, risk_confidence, department, department_confidence, models_unavailable, ... }
+  (department fields are null while the department model is missing → 200 with models_unavailable: ["dept"])
+  A field of the wrong type (e.g. symptoms: 5) → 400 naming the field; the request
+  never reaches the micro-batch queue
+  Terms are matched case-insensitively and through aliases (vocabulary.py); any the
+  models do not know are listed in unknown_terms, e.g. {"symptoms": ["Tremor"]}
+  served_by names the model that answered each task: the distilled fast-path model
+  when it is confident, else the full forest (see inference.py)
+  With "explain": true in the body (or ?explain=1), explanation breaks each predicted
+  probability down into a base value plus per-feature contributions, e.g.
+  {"risk": {"class": "High", "base": 0.33, "features": [{"feature": "Heart_Rate",
+  "value": 128, "contribution": 0.21}, ...], "other": 0.02}}; such requests skip
+  the micro-batch queue
+
+  POST /api/ml/classify/batch
+  Body: { patients: [ { ...same fields as /classify... }, ... ], explain?: bool }
+  Returns: { count, results: [ { risk_level, risk_confidence, department, ... }, ... ] }
+
+  GET  /api/ml/drift?windows=24
+  Returns: { status, rows, features: { Age: { psi, kl, status, ... }, symptoms: {...}, ... },
+             predicted: { risk: {...}, dept: {...} }, unknown_terms: {...} }
+  Live inputs and predictions over the last `windows` windows (1 h each by default),
+  merged across every worker on the node, vs. the training profile (see drift.py);
+  404 when the model version has no drift_profile.json
+
+  GET  /api/ml/patients/<patient_id>/trend?limit=20
+  Returns: { patient_id, count, first_seen, last_seen, latest_risk,
+             trend: { direction: worsening|improving|stable|insufficient_data, ... },
+             records: [ { date, risk_level, risk_probability, vitals: { bp, hr, temp }, symptoms, ... } ] }
+  The patient's latest classifications from the history store (history.py), oldest
+  first, in the HistoricalRecord shape the triage engine takes as trend_data;
+  404 for a patient with no history
+
+  GET  /api/ml/stats
+  Returns: { total, patients, mean_risk_confidence, risk: { High: { count, mean_confidence } },
+             departments: {...} }
+  Running totals over every classification recorded, across all workers
+
+  GET  /api/ml/metrics
+  Returns: Prometheus text — per-stage timing histograms, request/error/fallback counters
+
+  GET/POST /api/ml/profiler[/start|/stop]
+  Runtime sampling profiler (only when ML_ENABLE_PROFILER=1); /stop returns collapsed stacks
+
+  POST /api/ml/admin/reload      (header X-Admin-Token: $ML_ADMIN_TOKEN)
+  Load, validate and hot-swap the artifacts in ml/models; in-flight requests finish
+  on the old version. Each worker also picks up a new manifest.json on its own
+  (see reloader.py), so a reload call only needs to reach one of them.
+
+Every classification result carries the `model_version` that produced it.
 """
 
 import os
 import sys
-import warnings
-warnings.filterwarnings('ignore')
+import time
+import threading
+from concurrent.futures import TimeoutError as FutureTimeout
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
 
 # Add parent dir to path for imports
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-from inference import classify, feature_meta
+# Served classifications are patient history (ML_HISTORY=0 turns recording off)
+os.environ.setdefault('ML_HISTORY', '1')
+from inference import (
+    MODEL_DIR, classify_batch, current_models, reload_models, prediction_cache, history, parse_record,
+    InvalidPatientRecord, ModelValidationError, ReloadInProgress,
+)
+from history import TREND_LIMIT
+from registry import ModelUnavailable
+from reloader import ModelWatcher
+from scheduler import MicroBatchScheduler, SchedulerFull, SchedulerStopped
+from metrics import registry, http_stage_seconds, http_requests_total, errors_total, fallbacks_total
+from profiler import profiler, PROFILER_ENABLED
 
 app = Flask(__name__)
 CORS(app)  # Allow Next.js frontend to call this API
 
 
+# ─────────────────────────────── INSTRUMENTATION ───────────────────────────────
+@app.before_request
+def start_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def record_request(response):
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    started = g.get('request_started')
+    if started is not None:
+        http_stage_seconds.observe(time.perf_counter() - started, endpoint=endpoint, stage='total')
+    http_requests_total.inc(endpoint=endpoint, status=str(response.status_code))
+    return response
+
+
+def read_json(endpoint: str):
+    """The parsed JSON body, or None when it is missing or not valid JSON (a 400, not a server error)."""
+    with http_stage_seconds.time(endpoint=endpoint, stage='json_parse'):
+        return request.get_json(silent=True)
+
+
+# Upper bound on patients per batch call — keeps a single request from monopolising a worker.
+MAX_BATCH_SIZE = 10000
+
+# Longest a single /classify call waits for its micro-batch before giving up
+REQUEST_TIMEOUT_S = float(os.environ.get('ML_REQUEST_TIMEOUT', 5.0))
+
+# ─────────────────────────────── MICRO-BATCHING ───────────────────────────────
+# Concurrent /classify requests are queued and scored together by one background
+# thread per process. The scheduler is created lazily so that pre-forked workers
+# (see serve.py) each start their own thread after the fork.
+_scheduler: MicroBatchScheduler | None = None
+_scheduler_pid: int | None = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> MicroBatchScheduler:
+    global _scheduler, _scheduler_pid
+    if _scheduler is None or _scheduler_pid != os.getpid():
+        with _scheduler_lock:
+            if _scheduler is None or _scheduler_pid != os.getpid():
+                _scheduler = MicroBatchScheduler(classify_batch).start()
+                _scheduler_pid = os.getpid()
+    return _scheduler
+
+
+def shutdown_scheduler() -> None:
+    """Drain queued requests and stop this process's batch thread."""
+    global _scheduler
+    if _scheduler is not None and _scheduler_pid == os.getpid():
+        _scheduler.stop()
+        _scheduler = None
+
+
+# ─────────────────────────────── HOT RELOAD ───────────────────────────────
+# Like the scheduler, one watcher thread per process, started after the fork.
+ADMIN_TOKEN = os.environ.get('ML_ADMIN_TOKEN', '')
+
+_watcher: ModelWatcher | None = None
+_watcher_pid: int | None = None
+_watcher_lock = threading.Lock()
+
+
+def get_watcher() -> ModelWatcher:
+    global _watcher, _watcher_pid
+    if _watcher is None or _watcher_pid != os.getpid():
+        with _watcher_lock:
+            if _watcher is None or _watcher_pid != os.getpid():
+                _watcher = ModelWatcher(reload_models, lambda: current_models().version, MODEL_DIR).start()
+                _watcher_pid = os.getpid()
+    return _watcher
+
+
+@app.before_request
+def ensure_watcher():
+    get_watcher()
+
+
+registry.gauge_callback('ml_scheduler_queue_depth', 'Requests waiting in this worker\'s micro-batch queue.',
+                        lambda: get_scheduler().queue_depth)
+registry.gauge_callback('ml_prediction_cache_entries', 'Entries in the prediction cache.',
+                        lambda: prediction_cache.stats()['size'])
+registry.gauge_callback('ml_prediction_cache_lookups', 'Prediction cache lookups since start, by result.',
+                        lambda: {k: prediction_cache.stats()[k] for k in ('hits', 'misses')},
+                        labels=('result',))
+registry.gauge_callback('ml_drift_psi', 'PSI of live traffic vs. the training profile (last 24 windows, whole node).',
+                        lambda: current_models().drift.psi() if current_models().drift else {},
+                        labels=('distribution',))
+
+
+def parse_patient(data: dict) -> dict:
+    """Extract and validate classifier arguments from a JSON patient payload (see inference.parse_record)."""
+    return parse_record(data)
+
+
+def wants_explanation(data: dict) -> bool:
+    """`"explain": true` in the JSON body, or ?explain=1 on the URL."""
+    return bool(data.get('explain')) or request.args.get('explain', '').lower() in ('1', 'true', 'yes')
+
+
 @app.route('/api/ml/classify', methods=['POST'])
 def classify_patient():
     """Classify a patient's risk level and recommended department."""
     try:
-        data = request.get_json()
+        data = read_json('/api/ml/classify')
 
         if not data:
-            return jsonify({'error': 'No JSON body provided'}), 400
-
-        # Extract and validate fields
-        age = int(data.get('age', 0))
-        gender = str(data.get('gender', 'Other'))
-        symptoms = data.get('symptoms', [])
-        bp = int(data.get('blood_pressure_systolic', 120))
-        hr = int(data.get('heart_rate', 80))
-        temp = float(data.get('temperature_f', 98.6))
-        conditions = data.get('pre_existing_conditions', [])
-
-        # Handle symptoms as string or list
-        if isinstance(symptoms, str):
-            symptoms = [s.strip() for s in symptoms.split(',')]
-
-        if isinstance(conditions, str):
-            conditions = [c.strip() for c in conditions.split(',')]
-
-        result = classify(
-            age=age,
-            gender=gender,
-            symptoms=symptoms,
-            blood_pressure_systolic=bp,
-            heart_rate=hr,
-            temperature_f=temp,
-            pre_existing_conditions=conditions,
-        )
+            return jsonify({'error': 'No valid JSON body provided'}), 400
+
+        record = parse_patient(data)
+        with http_stage_seconds.time(endpoint='/api/ml/classify', stage='classify'):
+            if wants_explanation(data):
+                # Rare, clinician-initiated; scored directly rather than batched with plain requests
+                result = classify_batch([record], explain=True)[0]
+            else:
+                result = get_scheduler().submit(record, timeout=REQUEST_TIMEOUT_S)
 
         return jsonify({
             'success': True,
             **result,
         })
 
+    except InvalidPatientRecord as e:
+        return jsonify({'success': False, 'error': f'Invalid patient record: {e}'}), 400
+
+    except (SchedulerFull, SchedulerStopped) as e:
+        fallbacks_total.inc(reason='queue_full' if isinstance(e, SchedulerFull) else 'shutting_down')
+        response = jsonify({'success': False, 'error': str(e)})
+        response.headers['Retry-After'] = '1'
+        return response, 503
+
+    except ModelUnavailable as e:
+        fallbacks_total.inc(reason='model_unavailable')
+        return jsonify({'success': False, 'error': str(e)}), 503
+
+    except FutureTimeout:
+        fallbacks_total.inc(reason='timeout')
+        return jsonify({'success': False, 'error': f'Timed out after {REQUEST_TIMEOUT_S:g}s'}), 504
+
     except Exception as e:
+        errors_total.inc(endpoint='/api/ml/classify')
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@app.route('/api/ml/classify/batch', methods=['POST'])
+def classify_patients_batch():
+    """Classify many patients in one call (mass-casualty intake, bulk re-scoring)."""
+    try:
+        data = read_json('/api/ml/classify/batch')
+
+        if not isinstance(data, dict) or not isinstance(data.get('patients'), list):
+            return jsonify({'success': False, 'error': 'Body must be {"patients": [...]}'}), 400
+
+        patients = data['patients']
+        if len(patients) > MAX_BATCH_SIZE:
+            return jsonify({
+                'success': False,
+                'error': f'Batch too large: {len(patients)} patients (max {MAX_BATCH_SIZE})',
+            }), 413
+
+        records = []
+        for i, p in enumerate(patients):
+            try:
+                records.append(parse_patient(p))
+            except InvalidPatientRecord as e:
+                return jsonify({'success': False, 'error': f'Invalid patient record {i}: {e}'}), 400
+
+        with http_stage_seconds.time(endpoint='/api/ml/classify/batch', stage='classify'):
+            results = classify_batch(records, explain=wants_explanation(data))
+
+        return jsonify({
+            'success': True,
+            'model_version': results[0]['model_version'] if results else current_models().version,
+            'count': len(results),
+            'results': results,
+        })
+
+    except ModelUnavailable as e:
+        fallbacks_total.inc(reason='model_unavailable')
+        return jsonify({'success': False, 'error': str(e)}), 503
+
+    except Exception as e:
+        errors_total.inc(endpoint='/api/ml/classify/batch')
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
 @app.route('/api/ml/health', methods=['GET'])
 def health():
-    """Health check endpoint."""
+    """Health check endpoint. Status is degraded while any model is missing or failed."""
+    bundle = current_models()
+    feature_meta = bundle.feature_meta
+    models = bundle.registry.status()
     return jsonify({
-        'status': 'healthy',
+        'status': models['status'],
+        'models': models['models'],
+        'artifact_version': models['version'],
         'model_info': {
             'risk_accuracy': feature_meta['model_metrics']['risk_accuracy'],
             'dept_accuracy': feature_meta['model_metrics']['dept_accuracy'],
@@ -83,17 +293,108 @@ def health():
             'symptom_classes': feature_meta['symptom_classes'],
             'department_classes': feature_meta['dept_classes'],
             'risk_classes': feature_meta['risk_classes'],
-        }
+        },
+        'reload': get_watcher().status(),
+        'prediction_cache': prediction_cache.stats(),
+        'scheduler': {
+            'pid': os.getpid(),
+            **get_scheduler().stats(),
+        },
     })
 
 
 @app.route('/api/ml/metadata', methods=['GET'])
 def metadata():
     """Return full model metadata."""
-    return jsonify(feature_meta)
+    return jsonify(current_models().feature_meta)
+
+
+@app.route('/api/ml/drift', methods=['GET'])
+def drift():
+    """Input and prediction drift of live traffic against the training profile."""
+    monitor = current_models().drift
+    if monitor is None:
+        return jsonify({'success': False, 'error': 'No drift profile for the live model version'}), 404
+    try:
+        windows = max(1, int(request.args.get('windows', 24)))
+    except ValueError:
+        return jsonify({'success': False, 'error': 'windows must be an integer'}), 400
+    return jsonify({'success': True, 'model_version': current_models().version, **monitor.report(windows)})
+
+
+@app.route('/api/ml/patients/<patient_id>/trend', methods=['GET'])
+def patient_trend(patient_id):
+    """A patient's classification history and risk trend."""
+    if history is None:
+        return jsonify({'success': False, 'error': 'Patient history is disabled (ML_HISTORY=0)'}), 404
+    try:
+        limit = int(request.args.get('limit', TREND_LIMIT))
+    except ValueError:
+        return jsonify({'success': False, 'error': 'limit must be an integer'}), 400
+    trend = history.trend(patient_id, limit)
+    if trend is None:
+        return jsonify({'success': False, 'error': f'No history for patient {patient_id}'}), 404
+    return jsonify({'success': True, **trend})
+
+
+@app.route('/api/ml/stats', methods=['GET'])
+def stats():
+    """Classification totals by risk level and department."""
+    if history is None:
+        return jsonify({'success': False, 'error': 'Patient history is disabled (ML_HISTORY=0)'}), 404
+    return jsonify({'success': True, **history.stats()})
+
+
+@app.route('/api/ml/metrics', methods=['GET'])
+def metrics():
+    """Prometheus text exposition of this worker's metrics."""
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/api/ml/profiler', methods=['GET'])
+def profiler_status():
+    """Sampling profiler status."""
+    return jsonify(profiler.status())
+
+
+@app.route('/api/ml/profiler/start', methods=['POST'])
+def profiler_start():
+    """Start sampling this worker's stacks (ML_ENABLE_PROFILER=1 only)."""
+    if not PROFILER_ENABLED:
+        return jsonify({'success': False, 'error': 'Profiler disabled; set ML_ENABLE_PROFILER=1'}), 403
+    interval_ms = request.args.get('interval_ms', default=5.0, type=float)
+    started = profiler.start(interval_ms)
+    return jsonify({'success': started, **profiler.status()}), 200 if started else 409
+
+
+@app.route('/api/ml/profiler/stop', methods=['POST'])
+def profiler_stop():
+    """Stop sampling and return collapsed stacks (flamegraph.pl / speedscope input)."""
+    if not PROFILER_ENABLED:
+        return jsonify({'success': False, 'error': 'Profiler disabled; set ML_ENABLE_PROFILER=1'}), 403
+    return Response(profiler.stop(), mimetype='text/plain')
+
+
+@app.route('/api/ml/admin/reload', methods=['POST'])
+def admin_reload():
+    """Hot-swap to the model artifacts currently on disk (ML_ADMIN_TOKEN required)."""
+    if not ADMIN_TOKEN:
+        return jsonify({'success': False, 'error': 'Admin API disabled; set ML_ADMIN_TOKEN'}), 403
+    if request.headers.get('X-Admin-Token') != ADMIN_TOKEN:
+        return jsonify({'success': False, 'error': 'Invalid admin token'}), 403
+    try:
+        return jsonify({'success': True, 'pid': os.getpid(), **reload_models()})
+    except ReloadInProgress as e:
+        return jsonify({'success': False, 'error': str(e)}), 409
+    except (ModelValidationError, ModelUnavailable) as e:
+        return jsonify({'success': False, 'error': str(e), 'version': current_models().version}), 422
+    except Exception as e:
+        errors_total.inc(endpoint='/api/ml/admin/reload')
+        return jsonify({'success': False, 'error': str(e), 'version': current_models().version}), 500
 
 
 if __name__ == '__main__':
+    feature_meta = current_models().feature_meta
     print("=" * 60)
     print("  TriageAI ML API Server")
     print("=" * 60)
@@ -102,7 +403,15 @@ if __name__ == '__main__':
     print(f"  Features:             {feature_meta['feature_count']}")
     print(f"  Endpoints:")
     print(f"    POST /api/ml/classify")
+    print(f"    POST /api/ml/classify/batch")
     print(f"    GET  /api/ml/health")
     print(f"    GET  /api/ml/metadata")
+    print(f"    GET  /api/ml/drift")
+    print(f"    GET  /api/ml/patients/<id>/trend")
+    print(f"    GET  /api/ml/stats")
+    print(f"    GET  /api/ml/metrics")
+    print(f"    POST /api/ml/admin/reload")
+    print(f"  (development server — use serve.py for multi-process serving)")
     print("=" * 60)
-    app.run(host='0.0.0.0', port=5000, debug=False)
+    current_models().registry.preload(wait=False)
+    app.run(host='0.0.0.0', port=5000, debug=False, threaded=True)
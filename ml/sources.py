@@ -0,0 +1,107 @@
+"""
+TriageAI — Labeled Record Sources
+===================================
+Where incremental training (`train_model.py --incremental`) pulls newly labeled
+triage records from. Every source returns rows in the training CSV's schema
+(Age, Gender, Symptoms, Blood_Pressure_Systolic, Heart_Rate, Temperature_F,
+Pre_Existing_Conditions, Risk_Level, Recommended_Department) plus a watermark
+marking how far it has read, so the next run only sees newer records.
+
+  file:<path.csv>       an append-only CSV in the training schema;
+                        watermark = number of data rows already consumed
+  sqlite:<path.db>      a local stand-in for the Supabase `triage_records`
+                        table (same column names, TEXT[] columns stored as
+                        JSON arrays); watermark = last `created_at` read
+
+A bare path picks the source by extension (.db / .sqlite → sqlite, else file).
+"""
+
+import os
+import json
+import sqlite3
+
+import pandas as pd
+
+TRAINING_COLUMNS = [
+    'Age', 'Gender', 'Symptoms', 'Blood_Pressure_Systolic', 'Heart_Rate', 'Temperature_F',
+    'Pre_Existing_Conditions', 'Risk_Level', 'Recommended_Department',
+]
+
+
+class RecordSource:
+    """Base class: `fetch(watermark)` → (DataFrame in TRAINING_COLUMNS, new watermark)."""
+
+    kind = 'base'
+
+    def __init__(self, path: str):
+        self.path = os.path.abspath(path)
+
+    @property
+    def id(self) -> str:
+        """Stable identifier under which this source's watermark is stored."""
+        return f'{self.kind}:{self.path}'
+
+    def fetch(self, watermark=None) -> tuple[pd.DataFrame, object]:
+        raise NotImplementedError
+
+
+class CSVFileSource(RecordSource):
+    kind = 'file'
+
+    def fetch(self, watermark=None) -> tuple[pd.DataFrame, int]:
+        consumed = int(watermark or 0)
+        df = pd.read_csv(self.path, skiprows=range(1, consumed + 1))
+        missing = [c for c in TRAINING_COLUMNS if c not in df.columns]
+        if missing:
+            raise ValueError(f'{self.path} is missing columns: {missing}')
+        return df[TRAINING_COLUMNS], consumed + len(df)
+
+
+class SQLiteSource(RecordSource):
+    kind = 'sqlite'
+    table = 'triage_records'
+
+    def fetch(self, watermark=None) -> tuple[pd.DataFrame, str | None]:
+        query = (
+            f'SELECT age, gender, symptoms, bp, hr, temp, conditions, risk_level, '
+            f'recommended_department, created_at FROM {self.table} '
+            f'WHERE created_at > ? ORDER BY created_at'
+        )
+        with sqlite3.connect(self.path) as conn:
+            rows = pd.read_sql_query(query, conn, params=(watermark or '',))
+        if rows.empty:
+            return pd.DataFrame(columns=TRAINING_COLUMNS), watermark
+
+        df = pd.DataFrame({
+            'Age': rows['age'],
+            'Gender': rows['gender'],
+            'Symptoms': rows['symptoms'].map(lambda v: _join_array(v, empty='')),
+            # bp is stored as "systolic/diastolic" text
+            'Blood_Pressure_Systolic': rows['bp'].astype(str).str.split('/').str[0].astype(float),
+            'Heart_Rate': rows['hr'],
+            'Temperature_F': rows['temp'],
+            'Pre_Existing_Conditions': rows['conditions'].map(lambda v: _join_array(v, empty='None')),
+            'Risk_Level': rows['risk_level'],
+            'Recommended_Department': rows['recommended_department'],
+        })
+        return df, rows['created_at'].iloc[-1]
+
+
+def _join_array(value, empty: str) -> str:
+    """A TEXT[] column stored as a JSON array → the CSV's comma-separated form."""
+    items = json.loads(value) if isinstance(value, str) and value.startswith('[') else value
+    if not items:
+        return empty
+    return ', '.join(items) if isinstance(items, list) else str(items)
+
+
+SOURCES = {'file': CSVFileSource, 'sqlite': SQLiteSource}
+
+
+def open_source(spec: str) -> RecordSource:
+    """Resolve 'file:<path>', 'sqlite:<path>' or a bare path to a RecordSource."""
+    kind, sep, path = spec.partition(':')
+    if sep and kind in SOURCES:
+        return SOURCES[kind](path)
+    kind = 'sqlite' if spec.endswith(('.db', '.sqlite', '.sqlite3')) else 'file'
+    return SOURCES[kind](spec)
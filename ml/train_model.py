@@ -16,229 +16,1064 @@ Features used:
 
 This is a CLASSIFICATION task — not prediction.
 Given the patient's data, the model classifies the appropriate risk level and department.
+
+Pipeline stages: load → encode → split → fit → cross-validate → distill → export.
+Every stage result is cached on disk (see pipeline.py) under a hash of its
+input data, config and code, so a rerun only recomputes what changed. The two
+model fits and all CV folds run concurrently in a process pool.
+
+Each forest is also distilled into a small fast-path forest (FAST_PARAMS)
+that inference answers from when it is confident. The confidence threshold
+is calibrated on the held-out split and stored in feature_metadata.json.
+Training prints the accuracy/coverage/latency table it was chosen from.
+
+`--tune` searches the forests' hyperparameters first (successive halving
+over TUNE_SPACE, see tune_model): candidates are ranked on cross-validated
+accuracy against the single-row and batch latency and size of their compiled
+forests, the Pareto front is written to tuning_report.json, and the chosen
+config is trained and exported as the new artifacts. Later full runs keep
+using it (feature_metadata.json `tuned_params`) until --default-params.
+
+A full run also saves drift_profile.json — the training data's vital-sign
+deciles, term frequencies and class mix — which serving compares live
+traffic against (see drift.py).
+
+Usage:
+  python train_model.py                      full run (cached stages are reused)
+  python train_model.py --only risk          retrain/export only the risk model
+  python train_model.py --skip-cv            skip cross-validation (reuses cached folds if any)
+  python train_model.py --no-cache --jobs 4  recompute everything with 4 worker processes
+  python train_model.py --tune               search hyperparameters, then train the chosen config
+  python train_model.py --csv export.parquet  stream a large export (see ingest.py); also --stream for CSV
+  python train_model.py --incremental sqlite:triage.db   grow the saved forests with new records
+
+Incremental mode pulls the records a source (sources.py) added since the
+watermark stored in feature_metadata.json, appends any new vocabulary as
+feature columns, grows each forest with warm_start and records the run's cost
+next to that of a full retrain (measured with --compare-full, otherwise
+estimated from the last uncached full run). A full run resets the watermarks.
 """
 
 import os
 import sys
 import json
+import time
+import shutil
+import argparse
+import tempfile
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 import pandas as pd
-from sklearn.model_selection import train_test_split, cross_val_score, StratifiedKFold
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
-from sklearn.preprocessing import LabelEncoder, MultiLabelBinarizer
-from sklearn.metrics import classification_report, accuracy_score, confusion_matrix
+from sklearn.model_selection import train_test_split, StratifiedKFold
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import LabelEncoder
+from sklearn.metrics import classification_report, accuracy_score
 import joblib
 import warnings
 warnings.filterwarnings('ignore')
 
+import features
+import ingest
+import drift
+from features import FeatureEncoder, NUMERIC_COLUMNS, DERIVED_COLUMNS, gender_column, clean_conditions
+from forest import export_forest, compile_forest, CompiledForest
+from registry import write_manifest
+from pipeline import StageCache, DEFAULT_CACHE_DIR, hash_file, hash_code, stage_key
+
 # ─────────────────────────────── PATHS ───────────────────────────────
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_DIR = os.path.dirname(BASE_DIR)
 CSV_PATH = os.path.join(PROJECT_DIR, 'smart_triage_dataset_1200-1.csv')
 MODEL_DIR = os.path.join(BASE_DIR, 'models')
-os.makedirs(MODEL_DIR, exist_ok=True)
-
-print("=" * 70)
-print("  TriageAI — ML Model Training Pipeline")
-print("=" * 70)
-
-# ─────────────────────────────── DATA LOADING ───────────────────────────────
-print("\n📂 Loading dataset...")
-df = pd.read_csv(CSV_PATH)
-print(f"   ✓ Loaded {len(df)} records, {len(df.columns)} columns")
-print(f"   Columns: {list(df.columns)}")
-
-# ─────────────────────────────── FEATURE ENGINEERING ───────────────────────────────
-print("\n🔧 Feature Engineering...")
-
-# 1. Parse multi-value Symptoms into lists
-df['Symptoms_List'] = df['Symptoms'].apply(lambda x: [s.strip() for s in str(x).split(',')])
-
-# 2. Parse multi-value Pre_Existing_Conditions into lists
-df['Conditions_List'] = df['Pre_Existing_Conditions'].apply(
-    lambda x: [c.strip() for c in str(x).split(',') if c.strip().lower() != 'none']
-)
-
-# 3. Multi-label binarize Symptoms
-symptom_mlb = MultiLabelBinarizer()
-symptom_features = symptom_mlb.fit_transform(df['Symptoms_List'])
-symptom_cols = [f'symptom_{s.lower().replace(" ", "_")}' for s in symptom_mlb.classes_]
-symptom_df = pd.DataFrame(symptom_features, columns=symptom_cols, index=df.index)
-print(f"   ✓ {len(symptom_mlb.classes_)} unique symptoms: {list(symptom_mlb.classes_)}")
-
-# 4. Multi-label binarize Pre_Existing_Conditions
-condition_mlb = MultiLabelBinarizer()
-condition_features = condition_mlb.fit_transform(df['Conditions_List'])
-condition_cols = [f'cond_{c.lower().replace(" ", "_")}' for c in condition_mlb.classes_]
-condition_df = pd.DataFrame(condition_features, columns=condition_cols, index=df.index)
-print(f"   ✓ {len(condition_mlb.classes_)} unique conditions: {list(condition_mlb.classes_)}")
-
-# 5. One-hot encode Gender
-gender_dummies = pd.get_dummies(df['Gender'], prefix='gender').astype(int)
-print(f"   ✓ Gender categories: {list(gender_dummies.columns)}")
-
-# 6. Numeric features
-numeric_features = df[['Age', 'Blood_Pressure_Systolic', 'Heart_Rate', 'Temperature_F']].copy()
-
-# 7. Derived features for better classification
-numeric_features['age_group'] = pd.cut(df['Age'], bins=[0, 12, 30, 50, 70, 100], labels=[0, 1, 2, 3, 4]).astype(int)
-numeric_features['bp_category'] = pd.cut(df['Blood_Pressure_Systolic'], bins=[0, 90, 120, 140, 200], labels=[0, 1, 2, 3]).astype(int)
-numeric_features['hr_category'] = pd.cut(df['Heart_Rate'], bins=[0, 60, 80, 100, 200], labels=[0, 1, 2, 3]).astype(int)
-numeric_features['has_fever'] = (df['Temperature_F'] > 100.4).astype(int)
-numeric_features['symptom_count'] = df['Symptoms_List'].apply(len)
-numeric_features['condition_count'] = df['Conditions_List'].apply(len)
-
-print(f"   ✓ Numeric features: {list(numeric_features.columns)}")
-
-# 8. Combine all features
-X = pd.concat([numeric_features, gender_dummies, symptom_df, condition_df], axis=1)
-print(f"\n   📊 Total feature matrix: {X.shape[0]} samples × {X.shape[1]} features")
-
-# ─────────────────────────────── TARGETS ───────────────────────────────
-# Target 1: Risk Level
-risk_le = LabelEncoder()
-y_risk = risk_le.fit_transform(df['Risk_Level'])
-print(f"\n🎯 Target 1 — Risk Level: {dict(zip(risk_le.classes_, range(len(risk_le.classes_))))}")
-print(f"   Distribution: {dict(zip(*np.unique(y_risk, return_counts=True)))}")
-
-# Target 2: Recommended Department
-dept_le = LabelEncoder()
-y_dept = dept_le.fit_transform(df['Recommended_Department'])
-print(f"\n🎯 Target 2 — Department: {dict(zip(dept_le.classes_, range(len(dept_le.classes_))))}")
-print(f"   Distribution: {dict(zip(*np.unique(y_dept, return_counts=True)))}")
-
-# ─────────────────────────────── TRAIN/TEST SPLIT ───────────────────────────────
-print("\n" + "─" * 70)
-print("  MODEL 1: Risk Level Classifier")
-print("─" * 70)
-
-X_train_r, X_test_r, y_train_r, y_test_r = train_test_split(
-    X, y_risk, test_size=0.2, random_state=42, stratify=y_risk
-)
-print(f"   Train: {len(X_train_r)} | Test: {len(X_test_r)}")
-
-# Train Risk Level model — RandomForest with tuned hyperparameters
-risk_model = RandomForestClassifier(
-    n_estimators=200,
-    max_depth=15,
-    min_samples_split=5,
-    min_samples_leaf=2,
-    class_weight='balanced',   # Handle imbalanced classes (High=98 vs Low=796)
-    random_state=42,
-    n_jobs=-1,
-)
-risk_model.fit(X_train_r, y_train_r)
-
-# Evaluate
-y_pred_r = risk_model.predict(X_test_r)
-risk_accuracy = accuracy_score(y_test_r, y_pred_r)
-print(f"\n   ✅ Accuracy: {risk_accuracy:.4f} ({risk_accuracy * 100:.1f}%)")
-
-# Cross-validation
-cv_scores_r = cross_val_score(risk_model, X, y_risk, cv=StratifiedKFold(5, shuffle=True, random_state=42), scoring='accuracy')
-print(f"   📈 5-Fold CV Accuracy: {cv_scores_r.mean():.4f} ± {cv_scores_r.std():.4f}")
-
-print(f"\n   Classification Report:")
-print(classification_report(y_test_r, y_pred_r, target_names=risk_le.classes_, zero_division=0))
-
-# Feature importance for Risk
-feature_importance_risk = pd.Series(risk_model.feature_importances_, index=X.columns).sort_values(ascending=False)
-print("   Top 10 Features for Risk Classification:")
-for feat, imp in feature_importance_risk.head(10).items():
-    print(f"      {feat:35s} → {imp:.4f}")
-
-# ─────────────────────────────── DEPARTMENT MODEL ───────────────────────────────
-print("\n" + "─" * 70)
-print("  MODEL 2: Department Classifier")
-print("─" * 70)
-
-X_train_d, X_test_d, y_train_d, y_test_d = train_test_split(
-    X, y_dept, test_size=0.2, random_state=42, stratify=y_dept
-)
-print(f"   Train: {len(X_train_d)} | Test: {len(X_test_d)}")
-
-# Train Department model
-dept_model = RandomForestClassifier(
-    n_estimators=200,
-    max_depth=20,
-    min_samples_split=3,
-    min_samples_leaf=2,
-    class_weight='balanced',
-    random_state=42,
-    n_jobs=-1,
-)
-dept_model.fit(X_train_d, y_train_d)
-
-# Evaluate
-y_pred_d = dept_model.predict(X_test_d)
-dept_accuracy = accuracy_score(y_test_d, y_pred_d)
-print(f"\n   ✅ Accuracy: {dept_accuracy:.4f} ({dept_accuracy * 100:.1f}%)")
-
-cv_scores_d = cross_val_score(dept_model, X, y_dept, cv=StratifiedKFold(5, shuffle=True, random_state=42), scoring='accuracy')
-print(f"   📈 5-Fold CV Accuracy: {cv_scores_d.mean():.4f} ± {cv_scores_d.std():.4f}")
-
-print(f"\n   Classification Report:")
-print(classification_report(y_test_d, y_pred_d, target_names=dept_le.classes_, zero_division=0))
-
-# Feature importance for Department
-feature_importance_dept = pd.Series(dept_model.feature_importances_, index=X.columns).sort_values(ascending=False)
-print("   Top 10 Features for Department Classification:")
-for feat, imp in feature_importance_dept.head(10).items():
-    print(f"      {feat:35s} → {imp:.4f}")
-
-# ─────────────────────────────── SAVE MODELS ───────────────────────────────
-print("\n" + "─" * 70)
-print("  💾 Saving Models & Artifacts")
-print("─" * 70)
-
-# Save models
-joblib.dump(risk_model, os.path.join(MODEL_DIR, 'risk_classifier.joblib'))
-joblib.dump(dept_model, os.path.join(MODEL_DIR, 'dept_classifier.joblib'))
-
-# Save encoders
-joblib.dump(risk_le, os.path.join(MODEL_DIR, 'risk_label_encoder.joblib'))
-joblib.dump(dept_le, os.path.join(MODEL_DIR, 'dept_label_encoder.joblib'))
-joblib.dump(symptom_mlb, os.path.join(MODEL_DIR, 'symptom_binarizer.joblib'))
-joblib.dump(condition_mlb, os.path.join(MODEL_DIR, 'condition_binarizer.joblib'))
-
-# Save feature metadata for inference
-feature_meta = {
-    'feature_columns': list(X.columns),
-    'symptom_classes': list(symptom_mlb.classes_),
-    'condition_classes': list(condition_mlb.classes_),
-    'gender_categories': list(gender_dummies.columns),
-    'risk_classes': list(risk_le.classes_),
-    'dept_classes': list(dept_le.classes_),
-    'numeric_features': ['Age', 'Blood_Pressure_Systolic', 'Heart_Rate', 'Temperature_F'],
-    'model_metrics': {
-        'risk_accuracy': float(risk_accuracy),
-        'risk_cv_mean': float(cv_scores_r.mean()),
-        'risk_cv_std': float(cv_scores_r.std()),
-        'dept_accuracy': float(dept_accuracy),
-        'dept_cv_mean': float(cv_scores_d.mean()),
-        'dept_cv_std': float(cv_scores_d.std()),
+TUNING_REPORT = os.path.join(MODEL_DIR, 'tuning_report.json')
+# Feature matrix handed to --tune's worker processes (memory-mapped, not pickled per task)
+SHARED_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+
+# ─────────────────────────────── CONFIG ───────────────────────────────
+TEST_SIZE = 0.2
+CV_FOLDS = 5
+RANDOM_STATE = 42
+HISTORY_LIMIT = 20          # training runs kept in feature_metadata.json
+
+# Incremental mode (--incremental)
+NEW_TREES = 50              # trees grown per model on each incremental run
+MAX_TREES = 400             # oldest trees are dropped beyond this
+REPLAY_RATIO = 1.0          # base-dataset rows replayed per new record
+
+# Distilled fast-path model served ahead of each full forest (see calibrate_fast_path)
+FAST_PARAMS = {
+    'n_estimators': 10,
+    'max_depth': 6,
+    'min_samples_leaf': 3,
+    'class_weight': 'balanced',
+    'random_state': RANDOM_STATE,
+}
+FAST_THRESHOLDS = [round(t, 3) for t in np.arange(0.5, 1.0001, 0.025)]
+FAST_MAX_ACCURACY_DROP = 0.005   # combined accuracy may trail the full forest by at most this
+LATENCY_SAMPLE_ROWS = 200
+
+# Hyperparameter search (--tune): random draws from TUNE_SPACE, narrowed by successive halving
+TUNE_SPACE = {
+    'n_estimators': [25, 50, 100, 200, 300],
+    'max_depth': [6, 8, 10, 15, 20, None],
+    'min_samples_split': [2, 3, 5, 10],
+    'min_samples_leaf': [1, 2, 4],
+    'max_features': ['sqrt', 'log2', 0.3],
+}
+TUNE_CANDIDATES = 81             # per model, including its current MODEL_CONFIGS params
+TUNE_ETA = 3                     # each rung keeps 1/ETA of the candidates and trains them on ETA× the rows
+TUNE_RUNGS = 3                   # the last rung trains on every row of each fold
+TUNE_MAX_ACCURACY_DROP = 0.005   # chosen: fastest Pareto config within this of the most accurate
+TUNE_BATCH_ROWS = 1000
+# (metric, +1 higher is better / -1 lower is better)
+TUNE_OBJECTIVES = (('cv_accuracy', 1), ('single_us', -1), ('batch_us_per_row', -1), ('size_kb', -1))
+
+MODEL_CONFIGS = {
+    'risk': {
+        'title': 'Risk Level Classifier',
+        'target': 'Risk_Level',
+        # Any hint of High risk goes to the full forest, whatever the fast model's confidence
+        'fast_guard': {'class': 'High', 'min_proba': 0.10},
+        'params': {
+            'n_estimators': 200,
+            'max_depth': 15,
+            'min_samples_split': 5,
+            'min_samples_leaf': 2,
+            'class_weight': 'balanced',   # Handle imbalanced classes (High=98 vs Low=796)
+            'random_state': RANDOM_STATE,
+        },
+    },
+    'dept': {
+        'title': 'Department Classifier',
+        'target': 'Recommended_Department',
+        'params': {
+            'n_estimators': 200,
+            'max_depth': 20,
+            'min_samples_split': 3,
+            'min_samples_leaf': 2,
+            'class_weight': 'balanced',
+            'random_state': RANDOM_STATE,
+        },
     },
-    'training_samples': len(df),
-    'feature_count': X.shape[1],
 }
 
-with open(os.path.join(MODEL_DIR, 'feature_metadata.json'), 'w') as f:
-    json.dump(feature_meta, f, indent=2)
-
-print(f"   ✓ risk_classifier.joblib")
-print(f"   ✓ dept_classifier.joblib")
-print(f"   ✓ risk_label_encoder.joblib")
-print(f"   ✓ dept_label_encoder.joblib")
-print(f"   ✓ symptom_binarizer.joblib")
-print(f"   ✓ condition_binarizer.joblib")
-print(f"   ✓ feature_metadata.json")
-
-# ─────────────────────────────── SUMMARY ───────────────────────────────
-print("\n" + "=" * 70)
-print("  ✅ TRAINING COMPLETE")
-print("=" * 70)
-print(f"   Risk Level Classifier  → {risk_accuracy * 100:.1f}% accuracy (CV: {cv_scores_r.mean() * 100:.1f}%)")
-print(f"   Department Classifier  → {dept_accuracy * 100:.1f}% accuracy (CV: {cv_scores_d.mean() * 100:.1f}%)")
-print(f"   Feature dimensions     → {X.shape[1]} features")
-print(f"   Models saved to        → {MODEL_DIR}")
-print("=" * 70)
+
+# ─────────────────────────────── STAGES ───────────────────────────────
+def prepare_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Split the comma-separated Symptoms / Pre_Existing_Conditions columns into lists."""
+    df['Symptoms_List'] = ingest.split_multi(df['Symptoms'])
+    df['Conditions_List'] = ingest.split_multi(df['Pre_Existing_Conditions']).map(clean_conditions)
+    return df
+
+
+def load_dataset(csv_path: str) -> pd.DataFrame:
+    """Read the CSV and split its list columns (see prepare_frame)."""
+    return prepare_frame(pd.read_csv(csv_path))
+
+
+def frame_records(df: pd.DataFrame) -> list[dict]:
+    """Rows of a prepared frame as the record dicts FeatureEncoder.transform() takes."""
+    return [
+        {
+            'age': age,
+            'gender': gender,
+            'symptoms': symptoms,
+            'blood_pressure_systolic': bp,
+            'heart_rate': hr,
+            'temperature_f': temp,
+            'pre_existing_conditions': conditions,
+        }
+        for age, gender, symptoms, bp, hr, temp, conditions in zip(
+            df['Age'], df['Gender'], df['Symptoms_List'], df['Blood_Pressure_Systolic'],
+            df['Heart_Rate'], df['Temperature_F'], df['Conditions_List'],
+        )
+    ]
+
+
+def encode_dataset(df: pd.DataFrame) -> tuple[FeatureEncoder, np.ndarray]:
+    """Fit the shared feature encoder and encode every record with the path inference uses."""
+    encoder = FeatureEncoder.fit(df['Symptoms_List'], df['Conditions_List'], df['Gender'])
+    return encoder, encoder.transform(frame_records(df))
+
+
+def split_indices(y: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Stratified train/test row indices (the rows train_test_split(X, y, ...) would pick)."""
+    return train_test_split(
+        np.arange(len(y)), test_size=TEST_SIZE, random_state=RANDOM_STATE, stratify=y
+    )
+
+
+@contextmanager
+def select_rows(X, idx: np.ndarray):
+    """
+    X[idx]. `X` may be the path of an ingested X.npy; its rows are then gathered
+    chunk by chunk into a scratch memmap, so a worker never holds them in RAM.
+    """
+    if not isinstance(X, str):
+        yield X[idx]
+        return
+    fd, scratch = tempfile.mkstemp(suffix='.npy', dir=os.path.dirname(X))
+    os.close(fd)
+    try:
+        yield ingest.take_rows(np.load(X, mmap_mode='r'), idx, scratch)
+    finally:
+        os.remove(scratch)
+
+
+def fit_task(params: dict, n_jobs: int, X, y: np.ndarray, train_idx, test_idx) -> dict:
+    """Fit one forest on the train rows and predict the held-out rows. Runs in a worker process."""
+    model = RandomForestClassifier(**params, n_jobs=n_jobs)
+    with select_rows(X, train_idx) as X_train:
+        model.fit(X_train, y[train_idx])
+    with select_rows(X, test_idx) as X_test:
+        return {'model': model, 'y_pred': model.predict(X_test)}
+
+
+def cv_fold_task(params: dict, n_jobs: int, X, y: np.ndarray, train_idx, test_idx) -> float:
+    """Accuracy of one cross-validation fold. Runs in a worker process."""
+    model = RandomForestClassifier(**params, n_jobs=n_jobs)
+    with select_rows(X, train_idx) as X_train:
+        model.fit(X_train, y[train_idx])
+    with select_rows(X, test_idx) as X_test:
+        return float(accuracy_score(y[test_idx], model.predict(X_test)))
+
+
+def fast_task(params: dict, n_jobs: int, X, y: np.ndarray, train_idx, test_idx, teacher) -> dict:
+    """
+    Distill `teacher` into a small forest fitted on its predictions for the
+    train rows, and score both on the held-out rows. Runs in a worker process.
+    """
+    with select_rows(X, train_idx) as X_train:
+        target = teacher.predict(X_train)
+        if len(np.unique(target)) < len(teacher.classes_):
+            target = y[train_idx]   # the teacher never predicts some class; keep every column
+        model = RandomForestClassifier(**params, n_jobs=n_jobs).fit(X_train, target)
+    with select_rows(X, test_idx) as X_test:
+        return {'model': model, 'proba': model.predict_proba(X_test), 'teacher_proba': teacher.predict_proba(X_test)}
+
+
+def calibrate_fast_path(y: np.ndarray, fast_proba: np.ndarray, full_proba: np.ndarray, classes,
+                        guard: dict | None, fast_us: float, full_us: float) -> dict:
+    """
+    Held-out accuracy, coverage and expected per-row latency of answering from
+    the fast model whenever its confidence reaches each of FAST_THRESHOLDS and
+    escalating the rest (which then pay for both models).
+
+    Picks the lowest threshold whose combined accuracy is within
+    FAST_MAX_ACCURACY_DROP of the full forest, whose recall of the guarded class
+    (if any) is no worse, and which is faster than the full forest alone.
+    None qualifying → threshold above 1, i.e. the fast path stays off.
+    """
+    full_pred = full_proba.argmax(axis=1)
+    fast_pred, fast_conf = fast_proba.argmax(axis=1), fast_proba.max(axis=1)
+    full_accuracy = float(np.mean(full_pred == y))
+    guard_idx = list(classes).index(guard['class']) if guard else None
+
+    def recall(pred):
+        mask = y == guard_idx
+        return float(np.mean(pred[mask] == guard_idx)) if mask.any() else None
+
+    report = []
+    for threshold in FAST_THRESHOLDS:
+        served = fast_conf >= threshold
+        if guard_idx is not None:
+            served &= fast_proba[:, guard_idx] < guard['min_proba']
+        pred = np.where(served, fast_pred, full_pred)
+        row = {
+            'threshold': threshold,
+            'coverage': float(served.mean()),
+            'accuracy': float(np.mean(pred == y)),
+            'agreement': float(np.mean(pred == full_pred)),
+            'est_us_per_row': round(fast_us + (1 - float(served.mean())) * full_us, 1),
+        }
+        if guard_idx is not None:
+            row['guard_recall'] = recall(pred)
+        report.append(row)
+
+    full_recall = recall(full_pred) if guard_idx is not None else None
+    chosen = next((
+        row for row in report
+        if row['accuracy'] >= full_accuracy - FAST_MAX_ACCURACY_DROP
+        and (full_recall is None or row['guard_recall'] >= full_recall)
+        and row['est_us_per_row'] < full_us
+    ), None)
+    return {
+        'threshold': chosen['threshold'] if chosen else 1.01,
+        'guard': guard,
+        'coverage': chosen['coverage'] if chosen else 0.0,
+        'accuracy': chosen['accuracy'] if chosen else full_accuracy,
+        'full_accuracy': full_accuracy,
+        'fast_only_accuracy': float(np.mean(fast_pred == y)),
+        'fast_us': round(fast_us, 1),
+        'full_us': round(full_us, 1),
+        'report': report,
+    }
+
+
+def per_row_latency_us(model, X: np.ndarray) -> float:
+    """Mean predict_proba time for one-row calls (the shape of a single /classify request)."""
+    model.predict_proba(X[:1])
+    started = time.perf_counter()
+    for i in range(len(X)):
+        model.predict_proba(X[i:i + 1])
+    return (time.perf_counter() - started) / max(len(X), 1) * 1e6
+
+
+def run_tasks(cache: StageCache, pending: dict, jobs: int) -> None:
+    """
+    Run {(stage, key): (fn, params, *args)} concurrently and cache each result.
+
+    Cores are split between concurrent tasks so the forests' own thread pools
+    don't oversubscribe the CPU.
+    """
+    if not pending:
+        return
+    workers = max(1, min(jobs, len(pending)))
+    n_jobs = max(1, (os.cpu_count() or 1) // workers)
+    print(f"\n⚙️  Training {len(pending)} forest(s) on {workers} process(es) × {n_jobs} thread(s)...")
+
+    started = time.perf_counter()
+    if workers == 1:
+        for (stage, key), (fn, params, *args) in pending.items():
+            cache.save(stage, key, fn(params, n_jobs, *args), started)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(fn, params, n_jobs, *args): (stage, key)
+            for (stage, key), (fn, params, *args) in pending.items()
+        }
+        for future, (stage, key) in futures.items():
+            cache.save(stage, key, future.result(), started)
+
+
+def dump(obj, filename: str) -> None:
+    """joblib.dump via a temp file + rename, so a running server never sees a half-written artifact."""
+    target = os.path.join(MODEL_DIR, filename)
+    joblib.dump(obj, target + '.tmp')
+    os.replace(target + '.tmp', target)
+
+
+def load_stage(cache: StageCache, csv_path: str, data_hash: str | None = None) -> tuple[str, pd.DataFrame]:
+    """(stage key, prepared frame) for the in-memory load stage."""
+    key = stage_key('load', data_hash or hash_file(csv_path),
+                    hash_code(load_dataset, prepare_frame, ingest.split_multi, clean_conditions))
+    return key, cache.run('load', key, load_dataset, csv_path)
+
+
+def write_metadata(meta: dict) -> None:
+    path = os.path.join(MODEL_DIR, 'feature_metadata.json')
+    with open(path + '.tmp', 'w') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def cpu_seconds() -> float:
+    """User + system CPU time of this process and its finished worker processes."""
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+def training_block(previous_meta: dict, entry: dict, watermarks: dict) -> dict:
+    """
+    The `training` section of feature_metadata.json: a version bumped on every
+    run, the per-source watermarks incremental runs resume from, and a short
+    history of what each run added and what it cost.
+    """
+    training = previous_meta.get('training', {})
+    return {
+        'version': training.get('version', 0) + 1,
+        'mode': entry['mode'],
+        'trained_at': entry['trained_at'],
+        'watermarks': watermarks,
+        'history': (training.get('history', []) + [entry])[-HISTORY_LIMIT:],
+    }
+
+
+# ─────────────────────────────── TUNING ───────────────────────────────
+@contextmanager
+def shared_matrix(X):
+    """
+    `X` as the path of a .npy file in shared memory, so every worker process
+    memory-maps the one copy (see select_rows) instead of unpickling its own.
+    """
+    if isinstance(X, str):
+        yield X
+        return
+    fd, path = tempfile.mkstemp(suffix='.npy', dir=SHARED_DIR)
+    os.close(fd)
+    try:
+        np.save(path, np.ascontiguousarray(X, dtype=np.float32))
+        yield path
+    finally:
+        os.remove(path)
+
+
+def sample_candidates(baseline: dict, n: int, seed: int) -> list[dict]:
+    """`baseline` plus distinct random draws from TUNE_SPACE (same class_weight / random_state), n in all."""
+    rng = np.random.default_rng(seed)
+    fixed = {k: baseline[k] for k in ('class_weight', 'random_state') if k in baseline}
+    candidates, seen = [baseline], {stage_key(baseline)}
+    for _ in range(n * 20):
+        if len(candidates) >= n:
+            break
+        params = {**{k: values[rng.integers(len(values))] for k, values in TUNE_SPACE.items()}, **fixed}
+        if stage_key(params) not in seen:
+            seen.add(stage_key(params))
+            candidates.append(params)
+    return candidates
+
+
+def tune_fold_task(params: dict, n_jobs: int, X, y: np.ndarray, train_idx, test_idx, measure: bool) -> dict:
+    """
+    Accuracy of one candidate on one cross-validation fold and, with `measure`,
+    its compiled forest for timing. Runs in a worker process.
+    """
+    model = RandomForestClassifier(**params, n_jobs=n_jobs)
+    with select_rows(X, train_idx) as X_train:
+        model.fit(X_train, y[train_idx])
+    with select_rows(X, test_idx) as X_test:
+        accuracy = float(accuracy_score(y[test_idx], model.predict(X_test)))
+    return {'accuracy': accuracy, 'forest': compile_forest(model, model.classes_) if measure else None}
+
+
+def forest_costs(forest: tuple, X_sample: np.ndarray) -> dict:
+    """Serving cost of a compiled forest: one-row and batched predict_proba time, and its node arrays' size."""
+    compiled = CompiledForest(*forest)
+    batch = np.resize(X_sample, (TUNE_BATCH_ROWS, X_sample.shape[1]))
+    compiled.predict_proba(batch)
+    timings = []
+    for _ in range(3):
+        started = time.perf_counter()
+        compiled.predict_proba(batch)
+        timings.append(time.perf_counter() - started)
+    return {
+        'single_us': round(per_row_latency_us(compiled, X_sample), 1),
+        'batch_us_per_row': round(min(timings) / len(batch) * 1e6, 2),
+        'size_kb': round(sum(a.nbytes for a in forest[0].values()) / 1024, 1),
+    }
+
+
+def dominates(a: dict, b: dict) -> bool:
+    """`a` is at least as good as `b` on every TUNE_OBJECTIVES metric and better on one."""
+    gains = [sign * (a[metric] - b[metric]) for metric, sign in TUNE_OBJECTIVES]
+    return all(g >= 0 for g in gains) and any(g > 0 for g in gains)
+
+
+def pareto_fronts(rows: list[dict]) -> list[list[dict]]:
+    """Non-dominated sorting: the Pareto front, then the front of what remains, and so on."""
+    fronts, remaining = [], list(rows)
+    while remaining:
+        front = [r for r in remaining if not any(dominates(other, r) for other in remaining)]
+        fronts.append(front)
+        remaining = [r for r in remaining if not any(r is f for f in front)]
+    return fronts
+
+
+def tune_model(cache: StageCache, X, y: np.ndarray, name: str, encode_key: str,
+               n_candidates: int, jobs: int) -> dict:
+    """
+    Successive halving for one model. Every candidate is cross-validated on
+    1/ETA^(RUNGS-1) of each fold's training rows; each rung keeps the best
+    1/ETA — by Pareto front on TUNE_OBJECTIVES, then by accuracy — and the next
+    trains them on ETA× the rows, up to all of them. Costs are measured on the
+    first fold's compiled forest. Every fold is a cached stage ('tune'), so an
+    interrupted search resumes.
+
+    From the last rung's Pareto front it picks the fastest single-row config
+    whose CV accuracy is within TUNE_MAX_ACCURACY_DROP of the most accurate one.
+    """
+    folds = list(StratifiedKFold(CV_FOLDS, shuffle=True, random_state=RANDOM_STATE).split(y, y))
+    code = hash_code(tune_fold_task, compile_forest)
+    with select_rows(X, folds[0][1][:LATENCY_SAMPLE_ROWS]) as X_sample:
+        X_sample = np.ascontiguousarray(X_sample, dtype=np.float32)
+
+    alive = sample_candidates(MODEL_CONFIGS[name]['params'], n_candidates, RANDOM_STATE)
+    rungs = []
+    for rung in range(TUNE_RUNGS):
+        fraction = float(TUNE_ETA) ** (rung - TUNE_RUNGS + 1)
+        keys, pending = {}, {}
+        for c, params in enumerate(alive):
+            for i, (train_f, test_f) in enumerate(folds):
+                key = stage_key('tune', encode_key, name, params, CV_FOLDS, RANDOM_STATE, i, fraction, code)
+                keys[c, i] = key
+                if fraction < 1:
+                    train_f = train_test_split(train_f, train_size=fraction, random_state=RANDOM_STATE,
+                                               stratify=y[train_f])[0]
+                if not cache.has('tune', key):
+                    pending[('tune', key)] = (tune_fold_task, params, X, y, train_f, test_f, i == 0)
+        print(f"\n   Rung {rung + 1}/{TUNE_RUNGS}: {len(alive)} candidate(s) on {fraction * 100:.0f}% of each fold's rows")
+        run_tasks(cache, pending, jobs)
+
+        rows = []
+        for c, params in enumerate(alive):
+            results = [cache.load('tune', keys[c, i]) for i in range(len(folds))]
+            rows.append({
+                'params': params,
+                'rows_fraction': round(fraction, 4),
+                'cv_accuracy': round(float(np.mean([r['accuracy'] for r in results])), 4),
+                **forest_costs(results[0]['forest'], X_sample),
+            })
+        ranked = [r for front in pareto_fronts(rows) for r in sorted(front, key=lambda r: -r['cv_accuracy'])]
+        rungs.append(ranked)
+        alive = [r['params'] for r in ranked[:max(1, len(ranked) // TUNE_ETA)]]
+
+    final = rungs[-1]
+    front = pareto_fronts(final)[0]
+    best = max(r['cv_accuracy'] for r in final)
+    chosen = min((r for r in front if r['cv_accuracy'] >= best - TUNE_MAX_ACCURACY_DROP),
+                 key=lambda r: r['single_us'])
+    baseline = next(r for rows in reversed(rungs) for r in rows if r['params'] == MODEL_CONFIGS[name]['params'])
+    return {'candidates': len(rungs[0]), 'rungs': rungs, 'pareto_front': front, 'chosen': chosen, 'baseline': baseline}
+
+
+def tune_models(cache: StageCache, X, labels: dict, encode_key: str, names: list[str], args) -> dict:
+    """Run tune_model for each model, print and save the report; returns {name: chosen params}."""
+    print("\n" + "─" * 70)
+    print(f"  🔎 Hyperparameter Search ({args.tune_candidates} candidates per model, successive halving ÷{TUNE_ETA})")
+    print("─" * 70)
+
+    report = {}
+    if os.path.exists(TUNING_REPORT):
+        with open(TUNING_REPORT, 'r') as f:
+            report = json.load(f)
+    with shared_matrix(X) as X_shared:
+        for name in names:
+            print(f"\n🎯 {MODEL_CONFIGS[name]['title']}")
+            y = labels[MODEL_CONFIGS[name]['target']][1]
+            result = report[name] = tune_model(cache, X_shared, y, name, encode_key, args.tune_candidates, args.jobs)
+            result['tuned_at'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+
+            print(f"\n   {'trees':>5s} {'depth':>5s} {'split':>5s} {'leaf':>4s} {'features':>8s} "
+                  f"{'CV acc':>7s} {'µs/row':>7s} {'batch µs':>8s} {'KB':>7s}")
+            for row in result['rungs'][-1]:
+                p = row['params']
+                marker = '  ←' if row is result['chosen'] else (' *' if any(row is r for r in result['pareto_front']) else '')
+                print(f"   {p['n_estimators']:5d} {str(p.get('max_depth')):>5s} {p['min_samples_split']:5d} "
+                      f"{p['min_samples_leaf']:4d} {str(p.get('max_features', 'sqrt')):>8s} "
+                      f"{row['cv_accuracy'] * 100:6.1f}% {row['single_us']:7.0f} {row['batch_us_per_row']:8.1f} "
+                      f"{row['size_kb']:7.0f}{marker}")
+            base, chosen = result['baseline'], result['chosen']
+            print(f"   (* Pareto front, ← chosen) current config: {base['cv_accuracy'] * 100:.1f}% at "
+                  f"{base['single_us']:.0f}µs/row, {base['size_kb']:.0f} KB on {base['rows_fraction'] * 100:.0f}% of rows")
+            print(f"   ✓ Chosen: {chosen['cv_accuracy'] * 100:.1f}% at {chosen['single_us']:.0f}µs/row, {chosen['size_kb']:.0f} KB")
+
+    with open(TUNING_REPORT + '.tmp', 'w') as f:
+        json.dump(report, f, indent=2)
+    os.replace(TUNING_REPORT + '.tmp', TUNING_REPORT)
+    print(f"\n   ✓ {os.path.basename(TUNING_REPORT)}")
+    return {name: report[name]['chosen']['params'] for name in names}
+
+
+# ─────────────────────────────── INCREMENTAL ───────────────────────────────
+def widen(model: RandomForestClassifier, n_features: int) -> None:
+    """
+    Let a forest accept `n_features` columns. Appended columns only ever hold
+    new vocabulary, which existing trees never split on, so their predictions
+    are unchanged; sklearn just checks each tree's recorded input width.
+    """
+    model.n_features_in_ = n_features
+    for tree in model.estimators_:
+        tree.n_features_in_ = n_features
+
+
+def grow_forest(model: RandomForestClassifier, X: np.ndarray, y: np.ndarray,
+                new_trees: int, max_trees: int) -> RandomForestClassifier:
+    """Fit `new_trees` more trees on (X, y) with warm_start, then drop the oldest beyond `max_trees`."""
+    widen(model, X.shape[1])
+    model.set_params(warm_start=True, n_estimators=len(model.estimators_) + new_trees, n_jobs=-1)
+    model.fit(X, y)
+    model.estimators_ = model.estimators_[-max_trees:]
+    model.set_params(warm_start=False, n_estimators=len(model.estimators_), n_jobs=None)
+    return model
+
+
+def replay_sample(y: np.ndarray, pool: np.ndarray, size: int, seed: int) -> np.ndarray:
+    """
+    `size` random rows of `pool`, plus one row of every class the sample misses.
+    warm_start trees must see every class, or the forest's class list would
+    change under the existing trees.
+    """
+    rng = np.random.default_rng(seed)
+    idx = rng.choice(pool, size=min(size, len(pool)), replace=False)
+    missing = np.setdiff1d(np.unique(y[pool]), y[idx])
+    extra = [pool[np.flatnonzero(y[pool] == c)[0]] for c in missing]
+    return np.sort(np.concatenate([idx, np.asarray(extra, dtype=idx.dtype)]))
+
+
+def last_full_run(meta: dict) -> dict | None:
+    """Most recent full run that trained every stage from scratch (a fair cost baseline)."""
+    for entry in reversed(meta.get('training', {}).get('history', [])):
+        if entry['mode'] == 'full' and entry.get('cached_stages') == 0 and entry['models'] == list(MODEL_CONFIGS):
+            return entry
+    return None
+
+
+def incremental_main(args, names: list[str]) -> None:
+    """
+    Grow the exported forests with records a source added since its watermark.
+
+    Each model gets NEW_TREES trees fitted on the new records plus a replay
+    sample of its base training rows (never its held-out test rows, which
+    measure the update). The encoder only ever appends columns, so the old
+    trees keep working on the wider feature matrix.
+    """
+    from sources import open_source
+
+    started, cpu_started = time.perf_counter(), cpu_seconds()
+    print("=" * 70)
+    print("  TriageAI — Incremental Training")
+    print("=" * 70)
+
+    meta_path = os.path.join(MODEL_DIR, 'feature_metadata.json')
+    if not os.path.exists(meta_path):
+        sys.exit("\n❌ No trained models to update — run a full training first.")
+    with open(meta_path, 'r') as f:
+        meta = json.load(f)
+    training = meta.get('training', {})
+    watermarks = dict(training.get('watermarks', {}))
+
+    source = open_source(args.incremental)
+    new_df, watermark = source.fetch(watermarks.get(source.id))
+    print(f"\n📥 {source.id}: {len(new_df)} new record(s) since {watermarks.get(source.id)!r}")
+    if new_df.empty:
+        print("   Nothing to train on.")
+        return
+    new_df = prepare_frame(new_df.reset_index(drop=True))
+
+    encoder_path = os.path.join(MODEL_DIR, 'feature_encoder.json')
+    old_encoder = FeatureEncoder.load(encoder_path) if os.path.exists(encoder_path) else FeatureEncoder.from_metadata(meta)
+    encoder = old_encoder.extend(new_df['Symptoms_List'], new_df['Conditions_List'], new_df['Gender'].astype(str))
+    added = encoder.feature_columns[old_encoder.n_features:]
+    print(f"   ✓ Feature columns: {old_encoder.n_features} → {encoder.n_features} {added if added else ''}")
+
+    models = {}
+    for name in MODEL_CONFIGS:
+        path = os.path.join(MODEL_DIR, f'{name}_classifier.joblib')
+        if os.path.exists(path):
+            models[name] = (joblib.load(path), joblib.load(os.path.join(MODEL_DIR, f'{name}_label_encoder.joblib')))
+    names = [n for n in names if n in models]
+    if not names:
+        sys.exit("\n❌ None of the requested models has a sklearn artifact to grow — run a full training.")
+    for name in names:
+        target, le = MODEL_CONFIGS[name]['target'], models[name][1]
+        unseen = sorted(set(new_df[target].astype(str)) - set(le.classes_))
+        if unseen:
+            sys.exit(f"\n❌ New {target} label(s) {unseen} — the class set changed, run a full retrain.")
+
+    cache = StageCache(args.cache_dir, enabled=not args.no_cache)
+    _, base_df = load_stage(cache, args.csv)
+    X_base = encoder.transform(frame_records(base_df))
+    X_new = encoder.transform(frame_records(new_df))
+    X_new_old = old_encoder.transform(frame_records(new_df))
+    version = training.get('version', 0) + 1
+
+    metrics, report, compare_seconds = {}, {}, 0.0
+    for name in names:
+        config = MODEL_CONFIGS[name]
+        model, le = models[name]
+        y_base = le.transform(base_df[config['target']])
+        y_new = le.transform(new_df[config['target']].astype(str))
+        train_idx, test_idx = split_indices(y_base)
+
+        # Test-then-train: score the current model on records it has never seen
+        before_new = accuracy_score(y_new, model.predict(X_new_old))
+        before_test = accuracy_score(y_base[test_idx], model.predict(X_base[test_idx][:, :old_encoder.n_features]))
+
+        replay = replay_sample(y_base, train_idx, int(len(new_df) * args.replay), RANDOM_STATE + version)
+        X_mix = np.vstack([X_new, X_base[replay]])
+        y_mix = np.concatenate([y_new, y_base[replay]])
+
+        fit_started, fit_cpu = time.perf_counter(), cpu_seconds()
+        n_before = len(model.estimators_)
+        grow_forest(model, X_mix, y_mix, args.new_trees, args.max_trees)
+        cost = {'seconds': time.perf_counter() - fit_started, 'cpu_seconds': cpu_seconds() - fit_cpu}
+        after_test = accuracy_score(y_base[test_idx], model.predict(X_base[test_idx]))
+        metrics[f'{name}_accuracy'] = float(after_test)
+
+        report[name] = {
+            'trees': [n_before, len(model.estimators_)],
+            'replay_rows': int(len(replay)),
+            'new_records_accuracy_before': round(float(before_new), 4),
+            'test_accuracy': [round(float(before_test), 4), round(float(after_test), 4)],
+            'fit_seconds': round(cost['seconds'], 3),
+            'fit_cpu_seconds': round(cost['cpu_seconds'], 3),
+        }
+        print(f"\n🌲 {config['title']}: {n_before} → {len(model.estimators_)} trees "
+              f"({len(new_df)} new + {len(replay)} replayed rows, {cost['seconds']:.2f}s)")
+        print(f"   Accuracy on the new records before update: {before_new * 100:.1f}%")
+        print(f"   Held-out test accuracy: {before_test * 100:.1f}% → {after_test * 100:.1f}%")
+
+        if args.compare_full:
+            # What a from-scratch retrain on base + new data would have cost
+            full_started, full_cpu = time.perf_counter(), cpu_seconds()
+            params = meta.get('tuned_params', {}).get(name, config['params'])
+            full = RandomForestClassifier(**params, n_jobs=-1)
+            full.fit(np.vstack([X_base[train_idx], X_new]), np.concatenate([y_base[train_idx], y_new]))
+            compare_seconds += time.perf_counter() - full_started
+            report[name]['full_retrain'] = {
+                'seconds': round(time.perf_counter() - full_started, 3),
+                'cpu_seconds': round(cpu_seconds() - full_cpu, 3),
+                'test_accuracy': round(float(accuracy_score(y_base[test_idx], full.predict(X_base[test_idx]))), 4),
+            }
+            print(f"   Full retrain: {report[name]['full_retrain']['seconds']:.2f}s, "
+                  f"{report[name]['full_retrain']['test_accuracy'] * 100:.1f}% held-out accuracy")
+
+    # ── Export ──
+    print("\n" + "─" * 70)
+    print("  💾 Saving Models & Artifacts")
+    print("─" * 70)
+    for name, (model, le) in models.items():
+        if name not in names:
+            if encoder.n_features == old_encoder.n_features:
+                continue
+            widen(model, encoder.n_features)   # not retrained, but must accept the new columns
+        dump(model, f'{name}_classifier.joblib')
+        export_forest(model, le.classes_[model.classes_], os.path.join(MODEL_DIR, f'{name}_forest'))
+        print(f"   ✓ {name}_classifier.joblib, {name}_forest/")
+    encoder.save(encoder_path)
+    print(f"   ✓ feature_encoder.json")
+    if added:
+        # Fast-path models read the old column count and have no sklearn copy to widen;
+        # serving uses the full forests alone until the next full run distills new ones
+        for name in MODEL_CONFIGS:
+            shutil.rmtree(os.path.join(MODEL_DIR, f'{name}_fast_forest'), ignore_errors=True)
+        meta.pop('fast_path', None)
+        print(f"   ✓ fast-path models removed (feature set changed)")
+
+    seconds = time.perf_counter() - started - compare_seconds
+    cpu = cpu_seconds() - cpu_started
+    entry = {
+        'mode': 'incremental',
+        'trained_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'models': names,
+        'source': source.id,
+        'rows': int(meta.get('training_samples', 0)) + len(new_df),
+        'rows_added': len(new_df),
+        'features_added': added,
+        'seconds': round(seconds, 3),
+        'cpu_seconds': round(cpu, 3),
+        'per_model': report,
+    }
+    baseline = last_full_run(meta)
+    if args.compare_full:
+        # Fit against fit: same models, same machine, this run
+        incremental_fit = sum(r['fit_seconds'] for r in report.values())
+        entry['full_retrain_seconds'] = round(sum(r['full_retrain']['seconds'] for r in report.values()), 3)
+        entry['full_retrain_basis'] = 'measured (model fits only)'
+        entry['cost_ratio'] = round(incremental_fit / max(entry['full_retrain_seconds'], 1e-9), 3)
+    elif baseline:
+        # Whole run against whole run; forest fit time grows roughly linearly with rows
+        entry['full_retrain_seconds'] = round(baseline['seconds'] * entry['rows'] / baseline['rows'], 3)
+        entry['full_retrain_basis'] = (f"estimated from the {baseline['trained_at']} full run"
+                                       + (' (incl. CV)' if baseline.get('cv') else ''))
+        entry['cost_ratio'] = round(seconds / max(entry['full_retrain_seconds'], 1e-9), 3)
+
+    watermarks[source.id] = watermark
+    meta.update({
+        'feature_columns': encoder.feature_columns,
+        'symptom_classes': encoder.symptom_classes,
+        'condition_classes': encoder.condition_classes,
+        'gender_categories': [gender_column(g) for g in encoder.gender_classes],
+        'training_samples': entry['rows'],
+        'feature_count': encoder.n_features,
+    })
+    meta['model_metrics'] = {**meta.get('model_metrics', {}), **metrics}
+    meta['training'] = training_block(meta, entry, watermarks)
+    write_metadata(meta)
+    print(f"   ✓ feature_metadata.json (training version {meta['training']['version']})")
+    manifest = write_manifest(MODEL_DIR)
+    print(f"   ✓ manifest.json (version {manifest['version']})")
+
+    print("\n" + "=" * 70)
+    print("  ✅ INCREMENTAL UPDATE COMPLETE")
+    print("=" * 70)
+    print(f"   Records added          → {len(new_df)} (watermark {watermark!r})")
+    print(f"   Wall / CPU time        → {seconds:.1f}s / {cpu:.1f}s")
+    if 'cost_ratio' in entry:
+        print(f"   vs. full retrain       → {entry['full_retrain_seconds']:.1f}s "
+              f"({entry['full_retrain_basis']}), ratio {entry['cost_ratio']:.2f}")
+    else:
+        print(f"   vs. full retrain       → no uncached full run on record (use --compare-full)")
+    print("=" * 70)
+
+
+# ─────────────────────────────── PIPELINE ───────────────────────────────
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Train the TriageAI risk and department classifiers.')
+    parser.add_argument('--only', choices=sorted(MODEL_CONFIGS), help='train and export just this model')
+    parser.add_argument('--skip-cv', action='store_true', help='skip cross-validation folds that are not cached')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help='worker processes (default: CPU count)')
+    parser.add_argument('--csv', default=CSV_PATH, help='training data (CSV, or Parquet which implies --stream)')
+    parser.add_argument('--stream', action='store_true',
+                        help='ingest in chunks into memory-mapped arrays (for exports too large for RAM)')
+    parser.add_argument('--chunk-rows', type=int, default=ingest.CHUNK_ROWS, help='rows per chunk with --stream')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help='stage cache directory')
+    parser.add_argument('--no-cache', action='store_true', help='recompute every stage')
+    parser.add_argument('--tune', action='store_true',
+                        help='search hyperparameters (successive halving) and train the chosen config')
+    parser.add_argument('--tune-candidates', type=int, default=TUNE_CANDIDATES,
+                        help='configs sampled per model with --tune')
+    parser.add_argument('--default-params', action='store_true',
+                        help='train with MODEL_CONFIGS params instead of the last tuned ones')
+    parser.add_argument('--incremental', metavar='SOURCE',
+                        help="grow the saved models with records newer than the source's watermark "
+                             "('file:<csv>' or 'sqlite:<db>', see sources.py)")
+    parser.add_argument('--new-trees', type=int, default=NEW_TREES, help='trees added per model with --incremental')
+    parser.add_argument('--max-trees', type=int, default=MAX_TREES, help='forest size cap with --incremental')
+    parser.add_argument('--replay', type=float, default=REPLAY_RATIO,
+                        help='base rows replayed per new record with --incremental')
+    parser.add_argument('--compare-full', action='store_true',
+                        help='with --incremental, also time a from-scratch retrain for comparison')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    names = [args.only] if args.only else list(MODEL_CONFIGS)
+    if args.incremental:
+        return incremental_main(args, names)
+    cache = StageCache(args.cache_dir, enabled=not args.no_cache)
+    started, cpu_started = time.perf_counter(), cpu_seconds()
+    os.makedirs(MODEL_DIR, exist_ok=True)
+
+    print("=" * 70)
+    print("  TriageAI — ML Model Training Pipeline")
+    print("=" * 70)
+
+    # ── Load & encode ──
+    print("\n📂 Loading dataset...")
+    data_hash = hash_file(args.csv)
+    streaming = args.stream or args.csv.endswith(('.parquet', '.pq'))
+    if streaming:
+        # Chunked two-pass ingestion into memory-mapped arrays (see ingest.py)
+        encode_key = stage_key('ingest', data_hash, hash_code(ingest, features))
+        out_dir = os.path.join(args.cache_dir, 'ingest', encode_key)
+        dataset = cache.run('ingest', encode_key, ingest.ingest, args.csv, out_dir, args.chunk_rows)
+        _, X, y_by_column = ingest.open_dataset(out_dir)
+        encoder = FeatureEncoder(**dataset['encoder'])
+        labels = {col: (np.asarray(dataset['classes'][col], dtype=object), y) for col, y in y_by_column.items()}
+        X_task = os.path.join(out_dir, 'X.npy')   # workers open the memmap themselves
+        n_rows = dataset['n_rows']
+        print(f"   ✓ Streamed {n_rows} records in chunks of {args.chunk_rows} → {out_dir}")
+    else:
+        load_key, df = load_stage(cache, args.csv, data_hash)
+        encode_key = stage_key('encode', load_key, hash_code(features, encode_dataset, frame_records))
+        encoder, X = cache.run('encode', encode_key, encode_dataset, df)
+        labels = {}
+        for col in {c['target'] for c in MODEL_CONFIGS.values()}:
+            le = LabelEncoder()
+            labels[col] = (le.fit(df[col]).classes_, le.transform(df[col]))
+        X_task = X
+        n_rows = len(df)
+        print(f"   ✓ Loaded {n_rows} records")
+
+    print("\n🔧 Feature Engineering...")
+    print(f"   ✓ {len(encoder.symptom_classes)} unique symptoms: {encoder.symptom_classes}")
+    print(f"   ✓ {len(encoder.condition_classes)} unique conditions: {encoder.condition_classes}")
+    print(f"   ✓ Gender categories: {[gender_column(g) for g in encoder.gender_classes]}")
+    print(f"   ✓ Numeric features: {NUMERIC_COLUMNS + DERIVED_COLUMNS}")
+    print(f"\n   📊 Total feature matrix: {X.shape[0]} samples × {X.shape[1]} features")
+
+    # A model that is not retrained keeps its artifacts, which must match this feature set
+    meta_path = os.path.join(MODEL_DIR, 'feature_metadata.json')
+    previous_meta = {}
+    if os.path.exists(meta_path):
+        with open(meta_path, 'r') as f:
+            previous_meta = json.load(f)
+    if args.only and previous_meta.get('feature_columns') != encoder.feature_columns:
+        sys.exit("\n❌ The feature set changed since the last full run — retrain both models (drop --only).")
+
+    # ── Hyperparameters: the last tuned config unless --default-params; --tune searches anew ──
+    tuned_params = {n: p for n, p in previous_meta.get('tuned_params', {}).items()
+                    if n not in names or not args.default_params}
+    if args.tune:
+        tuned_params.update(tune_models(cache, X_task, labels, encode_key, names, args))
+    params = {name: tuned_params.get(name, MODEL_CONFIGS[name]['params']) for name in names}
+
+    # ── Targets & split ──
+    fit_code = hash_code(fit_task, cv_fold_task)
+    targets, fit_keys, cv_keys, pending = {}, {}, {}, {}
+    for name in names:
+        config = MODEL_CONFIGS[name]
+        classes, y = labels[config['target']]
+        le = LabelEncoder()
+        le.classes_ = classes
+        print(f"\n🎯 {config['title']}: {dict(zip(le.classes_, range(len(le.classes_))))}")
+        print(f"   Distribution: {dict(zip(*np.unique(y, return_counts=True)))}")
+        print(f"   Params ({'tuned' if name in tuned_params else 'default'}): {params[name]}")
+
+        split_key = stage_key('split', encode_key, name, TEST_SIZE, RANDOM_STATE)
+        train_idx, test_idx = cache.run('split', split_key, split_indices, y)
+        targets[name] = (le, y, train_idx, test_idx)
+
+        # ── Fit & cross-validate: queue whatever is not cached ──
+        fit_keys[name] = stage_key('fit', split_key, params[name], fit_code)
+        if not cache.has('fit', fit_keys[name]):
+            pending[('fit', fit_keys[name])] = (fit_task, params[name], X_task, y, train_idx, test_idx)
+
+        folds = StratifiedKFold(CV_FOLDS, shuffle=True, random_state=RANDOM_STATE).split(y, y)
+        cv_keys[name] = []
+        for i, (train_f, test_f) in enumerate(folds):
+            key = stage_key('cv', encode_key, name, params[name], CV_FOLDS, RANDOM_STATE, i, fit_code)
+            cv_keys[name].append(key)
+            if not args.skip_cv and not cache.has('cv', key):
+                pending[('cv', key)] = (cv_fold_task, params[name], X_task, y, train_f, test_f)
+
+    run_tasks(cache, pending, args.jobs)
+
+    # ── Distill fast-path models from the fitted forests ──
+    fast_code = hash_code(fast_task)
+    fast_keys, pending = {}, {}
+    for name in names:
+        le, y, train_idx, test_idx = targets[name]
+        fast_keys[name] = stage_key('fast', fit_keys[name], FAST_PARAMS, fast_code)
+        if not cache.has('fast', fast_keys[name]):
+            teacher = cache.load('fit', fit_keys[name])['model']
+            pending[('fast', fast_keys[name])] = (fast_task, FAST_PARAMS, X_task, y, train_idx, test_idx, teacher)
+    run_tasks(cache, pending, args.jobs)
+
+    # ── Reports ──
+    trained, metrics = {}, {}
+    for name in names:
+        config = MODEL_CONFIGS[name]
+        le, y, train_idx, test_idx = targets[name]
+        fit = cache.load('fit', fit_keys[name])
+        model, y_pred = fit['model'], fit['y_pred']
+        trained[name] = model
+
+        cv_scores = None
+        if all(cache.has('cv', key) for key in cv_keys[name]):
+            cv_scores = np.asarray([cache.load('cv', key) for key in cv_keys[name]])
+
+        accuracy = accuracy_score(y[test_idx], y_pred)
+        metrics[f'{name}_accuracy'] = float(accuracy)
+        metrics[f'{name}_cv_mean'] = float(cv_scores.mean()) if cv_scores is not None else None
+        metrics[f'{name}_cv_std'] = float(cv_scores.std()) if cv_scores is not None else None
+
+        print("\n" + "─" * 70)
+        print(f"  {config['title']}")
+        print("─" * 70)
+        print(f"   Train: {len(train_idx)} | Test: {len(test_idx)}")
+        print(f"\n   ✅ Accuracy: {accuracy:.4f} ({accuracy * 100:.1f}%)")
+        if cv_scores is not None:
+            print(f"   📈 {CV_FOLDS}-Fold CV Accuracy: {cv_scores.mean():.4f} ± {cv_scores.std():.4f}")
+        else:
+            print(f"   📈 {CV_FOLDS}-Fold CV Accuracy: skipped")
+        print(f"\n   Classification Report:")
+        print(classification_report(y[test_idx], y_pred, target_names=le.classes_, zero_division=0))
+
+        importance = pd.Series(model.feature_importances_, index=encoder.feature_columns).sort_values(ascending=False)
+        print(f"   Top 10 Features for {config['title']}:")
+        for feat, imp in importance.head(10).items():
+            print(f"      {feat:35s} → {imp:.4f}")
+
+
+    # ── Export ──
+    print("\n" + "─" * 70)
+    print("  💾 Saving Models & Artifacts")
+    print("─" * 70)
+
+    for name in names:
+        le = targets[name][0]
+        model = trained[name]
+        dump(model, f'{name}_classifier.joblib')
+        dump(le, f'{name}_label_encoder.joblib')
+        # Compiled, sklearn-free copy of the forest for serving (see forest.py)
+        export_forest(model, le.classes_[model.classes_], os.path.join(MODEL_DIR, f'{name}_forest'))
+        fast = cache.load('fast', fast_keys[name])['model']
+        export_forest(fast, le.classes_[fast.classes_], os.path.join(MODEL_DIR, f'{name}_fast_forest'))
+        print(f"   ✓ {name}_classifier.joblib, {name}_label_encoder.joblib, {name}_forest/, {name}_fast_forest/")
+    encoder.save(os.path.join(MODEL_DIR, 'feature_encoder.json'))
+    print(f"   ✓ feature_encoder.json")
+    # Reference distributions for the serving-side drift monitor (see drift.py)
+    profile = drift.build_profile(X, encoder, {name: labels[config['target']] for name, config in MODEL_CONFIGS.items()})
+    profile_path = os.path.join(MODEL_DIR, drift.PROFILE_NAME)
+    with open(profile_path + '.tmp', 'w') as f:
+        json.dump(profile, f, indent=2)
+    os.replace(profile_path + '.tmp', profile_path)
+    print(f"   ✓ {drift.PROFILE_NAME}")
+
+    # ── Fast path: accuracy vs. latency on the held-out split ──
+    fast_path = {}
+    for name in names:
+        le, y, _, test_idx = targets[name]
+        with select_rows(X_task, test_idx[:LATENCY_SAMPLE_ROWS]) as X_sample:
+            X_sample = np.ascontiguousarray(X_sample, dtype=np.float32)
+            full_us = per_row_latency_us(CompiledForest.load(os.path.join(MODEL_DIR, f'{name}_forest')), X_sample)
+            fast_us = per_row_latency_us(CompiledForest.load(os.path.join(MODEL_DIR, f'{name}_fast_forest')), X_sample)
+        fast = cache.load('fast', fast_keys[name])
+        calibration = fast_path[name] = calibrate_fast_path(
+            y[test_idx], fast['proba'], fast['teacher_proba'], le.classes_,
+            MODEL_CONFIGS[name].get('fast_guard'), fast_us, full_us,
+        )
+
+        guard = calibration['guard']
+        print(f"\n   ⚡ {MODEL_CONFIGS[name]['title']} fast path "
+              f"(fast {fast_us:.0f}µs, full {full_us:.0f}µs per row; fast alone {calibration['fast_only_accuracy'] * 100:.1f}%)")
+        print(f"      {'threshold':>9s} {'served':>7s} {'accuracy':>9s} {'agree':>7s}"
+              + (f" {guard['class'] + ' recall':>12s}" if guard else '') + f" {'µs/row':>8s}")
+        for row in calibration['report']:
+            marker = '  ←' if row['threshold'] == calibration['threshold'] else ''
+            print(f"      {row['threshold']:9.3f} {row['coverage'] * 100:6.1f}% {row['accuracy'] * 100:8.1f}% "
+                  f"{row['agreement'] * 100:6.1f}%"
+                  + (f" {row['guard_recall'] * 100:11.1f}%" if guard and row['guard_recall'] is not None else '')
+                  + f" {row['est_us_per_row']:8.1f}{marker}")
+        if calibration['threshold'] > 1:
+            print(f"      No threshold is both within {FAST_MAX_ACCURACY_DROP * 100:.1f} accuracy points "
+                  f"and faster than the full forest — fast path off")
+
+    # Save feature metadata for inference; a model that was not retrained keeps its entries
+    model_metrics = dict(previous_meta.get('model_metrics', {}))
+    model_metrics.update(metrics)
+    feature_meta = {
+        'feature_columns': encoder.feature_columns,
+        'symptom_classes': encoder.symptom_classes,
+        'condition_classes': encoder.condition_classes,
+        'gender_categories': [gender_column(g) for g in encoder.gender_classes],
+        'risk_classes': list(targets['risk'][0].classes_) if 'risk' in targets else previous_meta['risk_classes'],
+        'dept_classes': list(targets['dept'][0].classes_) if 'dept' in targets else previous_meta['dept_classes'],
+        'numeric_features': NUMERIC_COLUMNS,
+        'model_metrics': model_metrics,
+        'training_samples': n_rows,
+        'feature_count': X.shape[1],
+        'fast_path': {**previous_meta.get('fast_path', {}), **fast_path},
+        'tuned_params': tuned_params,
+    }
+    # A full run trains on the base dataset only, so incremental sources start over
+    computed = sum(not e['cached'] for e in cache.log)
+    feature_meta['training'] = training_block(previous_meta, {
+        'mode': 'full',
+        'trained_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'models': names,
+        'rows': n_rows,
+        'seconds': round(time.perf_counter() - started, 3),
+        'cpu_seconds': round(cpu_seconds() - cpu_started, 3),
+        'cached_stages': len(cache.log) - computed,
+        'cv': not args.skip_cv,
+        'tuned': args.tune,
+    }, watermarks={})
+    write_metadata(feature_meta)
+    print(f"   ✓ feature_metadata.json")
+
+    manifest = write_manifest(MODEL_DIR)
+    print(f"   ✓ manifest.json (version {manifest['version']})")
+
+    # ─────────────────────────────── SUMMARY ───────────────────────────────
+    print("\n" + "=" * 70)
+    print("  ✅ TRAINING COMPLETE")
+    print("=" * 70)
+    for name in names:
+        cv_mean = metrics[f'{name}_cv_mean']
+        cv = f'{cv_mean * 100:.1f}%' if cv_mean is not None else 'skipped'
+        print(f"   {MODEL_CONFIGS[name]['title']:22s} → {metrics[f'{name}_accuracy'] * 100:.1f}% accuracy (CV: {cv})")
+    print(f"   Feature dimensions     → {X.shape[1]} features")
+    print(f"   Models saved to        → {MODEL_DIR}")
+    print(f"   Stages                 → {computed} computed, {len(cache.log) - computed} from cache")
+    print(f"   Wall time              → {time.perf_counter() - started:.1f}s")
+    print("=" * 70)
+
+
+if __name__ == '__main__':
+    main()
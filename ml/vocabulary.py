@@ -0,0 +1,113 @@
+"""
+TriageAI — Symptom & Condition Vocabulary
+===========================================
+Maps the many spellings of a symptom, condition or gender onto the canonical
+class the models were trained with, so 'numbness/tingling', 'NUMBNESS' and
+'pins and needles' all light up the `symptom_numbness` column.
+
+Each `VocabularyIndex` is built once when the encoder loads:
+  exact     canonical class → column                  (the common case)
+  folded    fold(spelling) → canonical class, for every class and alias
+  memo      raw spelling → column, filled on first sight of a spelling
+
+so normalizing a token is one dict lookup in the steady state; only a spelling
+seen for the first time pays for `fold()`. Training (FeatureEncoder.fit /
+extend) canonicalizes through the same alias tables, so both sides agree.
+
+Aliases are keyed by canonical class; an alias whose class the current models
+do not know is ignored. The frontend's option lists (src/lib/types.ts,
+triage-engine.ts) are the main source of non-canonical spellings.
+"""
+
+import re
+
+# Separators the frontend and free-text extraction use inside one term
+_SEPARATORS = re.compile(r'[/_\-]+')
+MEMO_LIMIT = 10_000   # distinct raw spellings remembered per index
+
+SYMPTOM_ALIASES = {
+    'Abdominal Pain': ['stomach pain', 'stomach ache', 'stomachache', 'belly pain', 'abdominal cramps'],
+    'Back Pain': ['backache', 'lower back pain'],
+    'Blurred Vision': ['vision changes', 'blurry vision', 'vision problems', "can't see clearly"],
+    'Chest Pain': ['chest discomfort'],
+    'Cough': ['coughing'],
+    'Dizziness': ['dizzy', 'lightheaded', 'light headed', 'vertigo'],
+    'Fatigue': ['tired', 'tiredness', 'exhaustion'],
+    'Fever': ['high temperature', 'febrile', 'pyrexia'],
+    'Headache': ['head ache', 'head pain', 'migraine'],
+    'Numbness': ['numbness/tingling', 'tingling', 'numb', 'pins and needles'],
+    'Shortness of Breath': ['breathlessness', 'difficulty breathing', 'short of breath', 'dyspnea', 'sob'],
+    'Sore Throat': ['throat pain', 'pharyngitis'],
+    'Vomiting': ['throwing up', 'emesis'],
+}
+
+CONDITION_ALIASES = {
+    'Anemia': ['anaemia'],
+    'Asthma': ['asthmatic'],
+    'Diabetes': ['diabetes mellitus', 'type 1 diabetes', 'type 2 diabetes', 't2dm'],
+    'Heart Disease': ['cardiac disease', 'coronary artery disease', 'cad', 'heart condition'],
+    'Hypertension': ['high blood pressure', 'htn'],
+    'Kidney Disease': ['chronic kidney disease', 'ckd', 'renal disease'],
+    'Thyroid Disorder': ['thyroid', 'hypothyroidism', 'hyperthyroidism'],
+}
+
+GENDER_ALIASES = {
+    'Male': ['m', 'man'],
+    'Female': ['f', 'woman'],
+    'Other': ['non-binary', 'nonbinary'],
+}
+
+
+def fold(term) -> str:
+    """Case-, whitespace- and separator-insensitive form of a term."""
+    return ' '.join(_SEPARATORS.sub(' ', str(term)).casefold().split())
+
+
+def canonical_names(aliases: dict[str, list[str]]) -> dict[str, str]:
+    """fold(spelling) → canonical class for every class and alias in an alias table."""
+    names = {}
+    for canonical, spellings in aliases.items():
+        names[fold(canonical)] = canonical
+        for spelling in spellings:
+            names.setdefault(fold(spelling), canonical)
+    return names
+
+
+def canonicalize(tokens, aliases: dict[str, list[str]]) -> list[str]:
+    """Rewrite known aliases to their canonical class; other tokens pass through unchanged."""
+    names = canonical_names(aliases)
+    return [names.get(fold(t), t) for t in tokens]
+
+
+class VocabularyIndex:
+    """Token → feature column for one vocabulary (symptoms, conditions or genders)."""
+
+    def __init__(self, columns: dict[str, int], aliases: dict[str, list[str]] | None = None):
+        self.exact = dict(columns)
+        self._folded = {}
+        for folded, name in canonical_names(aliases or {}).items():
+            if name in columns:
+                self._folded[folded] = name
+        for name in columns:
+            self._folded[fold(name)] = name   # the trained spelling wins over an alias
+        self._memo = dict(self.exact)
+
+    def canonical(self, token) -> str | None:
+        """The trained class `token` stands for, or None if it is unknown."""
+        if token in self.exact:
+            return token
+        return self._folded.get(fold(token))
+
+    def column(self, token) -> int | None:
+        """Feature column for `token` (any known spelling), or None if it is unknown."""
+        try:
+            return self._memo[token]
+        except KeyError:
+            pass
+        except TypeError:
+            return None   # unhashable junk from a malformed request
+        name = self._folded.get(fold(token))
+        col = None if name is None else self.exact[name]
+        if len(self._memo) < MEMO_LIMIT:
+            self._memo[token] = col
+        return col
@@ -3,81 +3,19 @@ import { performTriage } from '@/lib/triage-engine';
 import { PatientInput } from '@/lib/types';
 import { supabase } from '@/lib/supabase';
 import { generateClinicalReasoning } from '@/lib/openrouter';
-import { spawn } from 'child_process';
-import path from 'path';
+import { classifyWithPool, MLInput, MLPrediction } from '@/lib/ml-worker-pool';
 
 /**
- * Calls the Python ML model via child_process for classification.
- * Falls back to rule-based engine if the ML model fails.
+ * Calls the Python ML model via a pool of persistent worker processes.
+ * Resolves to null (rule-based fallback) if the ML model fails or times out.
  */
-async function getMLPrediction(input: {
-    age: number;
-    gender: string;
-    symptoms: string[];
-    blood_pressure_systolic: number;
-    heart_rate: number;
-    temperature_f: number;
-    pre_existing_conditions: string[];
-}): Promise<{
-    risk_level: string;
-    risk_confidence: number;
-    department: string;
-    department_confidence: number;
-    risk_probabilities: Record<string, number>;
-    department_probabilities: Record<string, number>;
-} | null> {
-    return new Promise((resolve) => {
-        const timeout = setTimeout(() => {
-            console.warn('[ML] Python process timed out after 5s');
-            resolve(null);
-        }, 5000);
-
-        try {
-            const predictScript = path.join(process.cwd(), 'ml', 'predict.py');
-            const python = spawn('python', ['-W', 'ignore', predictScript]);
-
-            let stdout = '';
-            let stderr = '';
-
-            python.stdout.on('data', (data) => { stdout += data.toString(); });
-            python.stderr.on('data', (data) => { stderr += data.toString(); });
-
-            python.on('close', (code) => {
-                clearTimeout(timeout);
-                if (code === 0 && stdout.trim()) {
-                    try {
-                        const result = JSON.parse(stdout.trim());
-                        if (result.error) {
-                            console.warn('[ML] Model returned error:', result.error);
-                            resolve(null);
-                        } else {
-                            resolve(result);
-                        }
-                    } catch (e) {
-                        console.warn('[ML] Failed to parse output:', stdout);
-                        resolve(null);
-                    }
-                } else {
-                    console.warn('[ML] Python process exited with code:', code, stderr);
-                    resolve(null);
-                }
-            });
-
-            python.on('error', (err) => {
-                clearTimeout(timeout);
-                console.warn('[ML] Failed to spawn Python:', err.message);
-                resolve(null);
-            });
-
-            // Send input and close stdin
-            python.stdin.write(JSON.stringify(input));
-            python.stdin.end();
-        } catch (e) {
-            clearTimeout(timeout);
-            console.warn('[ML] Unexpected error:', e);
-            resolve(null);
-        }
-    });
+async function getMLPrediction(input: MLInput): Promise<MLPrediction | null> {
+    try {
+        return await classifyWithPool(input);
+    } catch (e) {
+        console.warn('[ML] Unexpected error:', e);
+        return null;
+    }
 }
 
 export async function POST(request: NextRequest) {
@@ -106,6 +44,7 @@ export async function POST(request: NextRequest) {
                 heart_rate: Number(body.hr) || 80,
                 temperature_f: Number(body.temp) || 98.6,
                 pre_existing_conditions: body.conditions || [],
+                patient_id: String(body.patient_id),
             };
 
             const mlResult = await getMLPrediction(mlInput);
@@ -114,16 +53,25 @@ export async function POST(request: NextRequest) {
                 // Override with ML model predictions (trained on 1200 records, 97.9% accuracy)
                 result.risk_level = mlResult.risk_level;
                 result.risk_probability = mlResult.risk_confidence;
-                result.recommended_department = mlResult.department;
-                result.confidence_score = mlResult.department_confidence;
+                if (mlResult.department !== null && mlResult.department_confidence !== null) {
+                    result.recommended_department = mlResult.department;
+                    result.confidence_score = mlResult.department_confidence;
+                }
 
                 // Add ML metadata to clinical reasoning
                 result.clinical_reasoning = result.clinical_reasoning +
                     `\n\n🧠 ML Model Classification (RandomForest, 97.9% accuracy):` +
                     `\n  Risk: ${mlResult.risk_level} (${(mlResult.risk_confidence * 100).toFixed(1)}% confidence)` +
-                    `\n  Department: ${mlResult.department} (${(mlResult.department_confidence * 100).toFixed(1)}% confidence)` +
+                    (mlResult.department_confidence !== null
+                        ? `\n  Department: ${mlResult.department} (${(mlResult.department_confidence * 100).toFixed(1)}% confidence)`
+                        : `\n  Department: rule-based (ML department model unavailable)`) +
                     `\n  Risk Probabilities: High=${(mlResult.risk_probabilities.High * 100).toFixed(1)}%, Medium=${(mlResult.risk_probabilities.Medium * 100).toFixed(1)}%, Low=${(mlResult.risk_probabilities.Low * 100).toFixed(1)}%`;
 
+                const unknownTerms = Object.values(mlResult.unknown_terms ?? {}).flat();
+                if (unknownTerms.length > 0) {
+                    result.clinical_reasoning += `\n  Not recognized by the ML model (rule-based only): ${unknownTerms.join(', ')}`;
+                }
+
                 console.log(`[Triage API] ML model: Risk=${mlResult.risk_level} (${(mlResult.risk_confidence * 100).toFixed(1)}%), Dept=${mlResult.department}`);
             }
         } catch (mlError) {
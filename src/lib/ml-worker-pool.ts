@@ -0,0 +1,209 @@
+/**
+ * ML Worker Pool
+ * Keeps a small pool of long-lived `python ml/predict.py --worker` processes so
+ * triage calls no longer pay the Python import + joblib.load cold start per patient.
+ *
+ * Each worker reads newline-delimited JSON requests on stdin and answers with one
+ * JSON line per request, tagged with the request id. Requests are dispatched to the
+ * least-busy worker, preferring workers that have reported `ready` (models loaded);
+ * requests sent to a worker that is still loading wait in its queue, and their
+ * timeout starts only once they are written. Dead workers are respawned on the next call.
+ *
+ * USED IN:
+ * 1. /api/triage — ML classification step
+ */
+
+import { spawn, ChildProcessWithoutNullStreams } from 'child_process';
+import path from 'path';
+
+export interface MLInput {
+    age: number;
+    gender: string;
+    symptoms: string[];
+    blood_pressure_systolic: number;
+    heart_rate: number;
+    temperature_f: number;
+    pre_existing_conditions: string[];
+    // Ask for a per-feature breakdown of the prediction (a few ms extra)
+    explain?: boolean;
+    // Files the classification in the ML patient history (GET /api/ml/patients/<id>/trend)
+    patient_id?: string;
+}
+
+export interface MLExplanation {
+    class: string;
+    base: number;
+    features: { feature: string; value: number; contribution: number }[];
+    other: number;
+}
+
+export interface MLPrediction {
+    risk_level: string;
+    risk_confidence: number;
+    // null while the department model is missing; the rule engine's department is kept
+    department: string | null;
+    department_confidence: number | null;
+    risk_probabilities: Record<string, number>;
+    department_probabilities: Record<string, number>;
+    models_unavailable: string[];
+    model_version: string;
+    served_by: { risk: 'fast' | 'full'; dept?: 'fast' | 'full' };
+    unknown_terms: Partial<Record<'symptoms' | 'conditions' | 'gender', string[]>>;
+    // Only when the request set explain: true
+    explanation?: { risk: MLExplanation; dept?: MLExplanation };
+}
+
+interface PendingRequest {
+    resolve: (result: MLPrediction | null) => void;
+    // REQUEST_TIMEOUT_MS from arrival, whether the request is queued or written
+    timer: ReturnType<typeof setTimeout>;
+}
+
+interface Worker {
+    proc: ChildProcessWithoutNullStreams;
+    pending: Map<string, PendingRequest>;
+    // Request lines held back until the worker reports ready
+    queued: { id: string; line: string }[];
+    buffer: string;
+    alive: boolean;
+    ready: boolean;
+    readyTimer?: ReturnType<typeof setTimeout>;
+}
+
+const POOL_SIZE = Math.max(1, Number(process.env.ML_WORKER_POOL_SIZE) || 2);
+const REQUEST_TIMEOUT_MS = 5000;
+// A worker that has not loaded its models by then is killed (its queued requests fall back)
+const READY_TIMEOUT_MS = 30000;
+
+const workers: Worker[] = [];
+let nextRequestId = 0;
+
+function spawnWorker(): Worker {
+    const predictScript = path.join(process.cwd(), 'ml', 'predict.py');
+    const proc = spawn('python', [predictScript, '--worker']);
+
+    const worker: Worker = { proc, pending: new Map(), queued: [], buffer: '', alive: true, ready: false };
+
+    proc.stdout.on('data', (data) => {
+        worker.buffer += data.toString();
+        let newline: number;
+        while ((newline = worker.buffer.indexOf('\n')) >= 0) {
+            const line = worker.buffer.slice(0, newline).trim();
+            worker.buffer = worker.buffer.slice(newline + 1);
+            if (line) handleLine(worker, line);
+        }
+    });
+
+    proc.stderr.on('data', (data) => {
+        console.warn('[ML Pool] worker stderr:', data.toString().trim());
+    });
+
+    const shutdown = (reason: string) => {
+        clearTimeout(worker.readyTimer);
+        if (!worker.alive) return;
+        worker.alive = false;
+        console.warn(`[ML Pool] worker ${proc.pid ?? '?'} ${reason}`);
+        for (const [, req] of worker.pending) {
+            clearTimeout(req.timer);
+            req.resolve(null);
+        }
+        worker.pending.clear();
+        worker.queued = [];
+        const idx = workers.indexOf(worker);
+        if (idx >= 0) workers.splice(idx, 1);
+    };
+    worker.readyTimer = setTimeout(() => {
+        shutdown(`not ready after ${READY_TIMEOUT_MS / 1000}s`);
+        proc.kill();
+    }, READY_TIMEOUT_MS);
+
+    proc.on('exit', (code) => shutdown(`exited with code ${code}`));
+    proc.on('error', (err) => shutdown(`failed: ${err.message}`));
+    // EPIPE when the worker died between dispatch and write; unhandled, it would crash the server
+    proc.stdin.on('error', (err) => {
+        shutdown(`stdin failed: ${err.message}`);
+        proc.kill();
+    });
+
+    return worker;
+}
+
+function handleLine(worker: Worker, line: string) {
+    let message: { id?: string; error?: string; ready?: boolean } & Partial<MLPrediction>;
+    try {
+        message = JSON.parse(line);
+    } catch {
+        console.warn('[ML Pool] Failed to parse worker output:', line);
+        return;
+    }
+
+    if (message.ready) {
+        worker.ready = true;
+        clearTimeout(worker.readyTimer);
+        const queued = worker.queued;
+        worker.queued = [];
+        for (const { id, line } of queued) dispatch(worker, id, line);
+        return;
+    }
+    if (!message.id) return;
+
+    const req = worker.pending.get(message.id);
+    if (!req) return; // Already timed out
+    worker.pending.delete(message.id);
+    clearTimeout(req.timer);
+
+    if (message.error) {
+        console.warn('[ML Pool] Model returned error:', message.error);
+        req.resolve(null);
+    } else {
+        const { id: _id, ...result } = message;
+        req.resolve(result as MLPrediction);
+    }
+}
+
+function acquireWorker(): Worker {
+    while (workers.length < POOL_SIZE) {
+        workers.push(spawnWorker());
+    }
+    const ready = workers.filter((w) => w.ready);
+    const candidates = ready.length ? ready : workers;
+    return candidates.reduce((best, w) => (w.pending.size < best.pending.size ? w : best));
+}
+
+/** Write a request line to a ready worker, unless it already timed out while queued. */
+function dispatch(worker: Worker, id: string, line: string) {
+    if (!worker.pending.has(id) || !worker.alive) return;
+    worker.proc.stdin.write(line);
+}
+
+/**
+ * Classify a patient using a pooled Python worker.
+ * Resolves to null on timeout or model error so callers can fall back to the rule engine.
+ */
+export function classifyWithPool(input: MLInput): Promise<MLPrediction | null> {
+    return new Promise((resolve) => {
+        let worker: Worker;
+        try {
+            worker = acquireWorker();
+        } catch (e) {
+            console.warn('[ML Pool] Failed to spawn Python:', e);
+            resolve(null);
+            return;
+        }
+
+        const id = String(++nextRequestId);
+        const line = JSON.stringify({ id, ...input }) + '\n';
+        // The timeout runs from arrival, so time spent queued behind a cold start counts too
+        const timer = setTimeout(() => {
+            worker.pending.delete(id);
+            console.warn(`[ML Pool] Request ${id} timed out after ${REQUEST_TIMEOUT_MS / 1000}s`);
+            resolve(null);
+        }, REQUEST_TIMEOUT_MS);
+        worker.pending.set(id, { resolve, timer });
+        if (worker.ready) {
+            dispatch(worker, id, line);
+        } else {
+            worker.queued.push({ id, line });
+        }
+    });
+}